@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Asynchronous search module.
+
+Transition searches for new volumes are run by a pool of worker processes
+while the KMC loop carries on with the events already known. The main
+process writes the initial lattice and the lattice after each hop to
+Temp/Async and works out the final hashkeys; a worker minimises them and
+runs the NEBs (as autoNEB does) and the barriers are added to the catalog
+when the KMC loop next collects finished searches.
+
+While a search is pending the rates of its hops are bounded from above,
+by the surrogate model if there is one and by asyncMinBarrier otherwise.
+The KMC loop only steps past a pending search while the bounds of all
+pending searches are below asyncRateFrac of the total rate, otherwise it
+waits for them. A snapshot of the run is kept from the first step that
+ignored a search, and if its barriers turn out faster than the bound the
+run is rolled back to that step.
+
+"""
+
+import os
+import copy
+import multiprocessing
+from LKMC import NEB, Lattice, Minimise, Input, Vectors
+
+# LKMC parameters of a worker process
+workerParams = None
+
+def initWorker(lkmcInput):
+    global workerParams
+    workerParams = Input.getLKMCParams(1, "", lkmcInput)
+    Input.readGlobals(lkmcInput)
+
+# minimise the initial lattice once, then each final lattice and run the NEBs.
+# Returns a status (0 ok, 1 initial minimisation failed, 2 initial moved too far)
+# and (direction, barrier, reverseBarrier) for each hop, "None" if it failed
+def searchVolume(job):
+    iniPath, hops, cellDims, maxMoveCriteria = job
+    minimiser = Minimise.getMinimiser(workerParams)
+
+    ini = Lattice.readLattice(iniPath)
+    iniMin = copy.deepcopy(ini)
+    if minimiser.run(iniMin):
+        return 1, []
+    Index, maxMove, avgMove, Sep = Vectors.maxMovement(ini.pos, iniMin.pos, cellDims)
+    if maxMove >= maxMoveCriteria:
+        return 2, []
+
+    results = []
+    for direction, finPath in hops:
+        fin = Lattice.readLattice(finPath)
+        finMin = copy.deepcopy(fin)
+        if minimiser.run(finMin):
+            results.append((direction, "None", "None"))
+            continue
+
+        # initial and final are the same state or the final is not on the lattice
+        Index, maxMove, avgMove, Sep = Vectors.maxMovement(iniMin.pos, finMin.pos, cellDims)
+        if maxMove < 0.4:
+            results.append((direction, "None", "None"))
+            continue
+        Index, maxMove, avgMove, Sep = Vectors.maxMovement(fin.pos, finMin.pos, cellDims)
+        if maxMove >= maxMoveCriteria:
+            results.append((direction, "None", "None"))
+            continue
+
+        neb = NEB.NEB(workerParams)
+        if neb.run(iniMin, finMin):
+            results.append((direction, "None", "None"))
+            continue
+        barrier = round(neb.barrier, 6)
+        reverseBarrier = round((iniMin.totalEnergy - finMin.totalEnergy) + neb.barrier, 6)
+        results.append((direction, barrier, reverseBarrier))
+    return 0, results
+
+# pool workers (eg. Ensemble.py replicas) cannot start their own workers
+def available():
+    return not multiprocessing.current_process().daemon
+
+class pendingSearch(object):
+    def __init__(self, number, job, directions, finalKeys, bound, result):
+        self.number = number
+        self.job = job
+        # all directions tried (added to the volume when the search finishes)
+        self.directions = directions
+        # final hashkey of each hop sent to the worker
+        self.finalKeys = finalKeys
+        # upper bound of the summed rate of the hops
+        self.bound = bound
+        self.result = result
+        # first step that went ahead without the results (None = not ignored yet)
+        self.ignoredSince = None
+
+class asyncSearches(object):
+    def __init__(self, numProcesses, lkmcInput):
+        if numProcesses < 1:
+            numProcesses = multiprocessing.cpu_count()
+        self.pool = multiprocessing.Pool(numProcesses, initWorker, (lkmcInput,))
+        self.pending = {}
+        self.numSubmitted = 0
+        self.numRollbacks = 0
+        self.stepsRolledBack = 0
+
+    def submit(self, hashkey, job, directions, finalKeys, bound):
+        self.numSubmitted += 1
+        result = self.pool.apply_async(searchVolume, (job,))
+        self.pending[hashkey] = pendingSearch(self.numSubmitted, job, directions, finalKeys, bound, result)
+
+    # finished searches, or all pending searches in the list if wait
+    def finished(self, wait=False, hashkeys=None):
+        if hashkeys is None:
+            hashkeys = self.pending.keys()
+        done = []
+        for hashkey in hashkeys:
+            search = self.pending[hashkey]
+            if wait:
+                search.result.wait()
+            if search.result.ready():
+                done.append(hashkey)
+        return done
+
+    # remove a finished search and its lattice files and return it with its status and results
+    def pop(self, hashkey):
+        search = self.pending.pop(hashkey)
+        status, results = search.result.get()
+        iniPath, hops = search.job[0], search.job[1]
+        for path in [iniPath] + [hop[1] for hop in hops]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return search, status, results
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Benchmark suite for KMC.py
+# runs KMC.py on synthetic ZnO(0001) lattices of increasing size and adatom
+# coverage using the stub LKMC package in Benchmarks/stub (bond counting
+# energies, deterministic hashkeys) so no real NEB or force field is needed.
+# Reports steps/second, per-phase times (from Stats/Timing.json) and peak memory.
+#
+# usage: python Benchmarks/bench.py [--sizes 12x8,24x16] [--coverages 0.02,0.05] [--steps 100]
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(bench_dir)
+stub_dir = os.path.join(bench_dir, 'stub')
+
+# for (0001) ZnO only
+x_grid_dist = 0.9497411251
+z_grid_dist = 1.6449999809
+surface_height = 4.0
+
+# phases reported for each part of a step
+phaseGroups = [
+    ['createEventsList', ['createEventsList']],
+    ['selection', ['selectEvent']],
+    ['I/O', ['writeLattice', 'writeLatticeLKMC', 'writeVolumes', 'statsOutput']],
+]
+
+# make a synthetic ZnO(0001) surface of nx * nz grid points
+# surface sites are 3-coloured: O on top, and two types of hollow site
+# (above Zn or O in a lower layer) that adatoms can hop between
+def makeSurface(nx, nz):
+    if nx % 6 or nz % 2:
+        sys.exit("x grid points must be a multiple of 6 and z grid points a multiple of 2")
+    atoms = []
+    for ix in xrange(nx):
+        for iz in xrange(nz):
+            if (ix + iz) % 2:
+                continue
+            x = ix * x_grid_dist
+            z = iz * z_grid_dist
+            site = ((ix - 3 * iz) // 2) % 3
+            if site == 0:
+                atoms.append(['O_', x, surface_height, z])
+            elif site == 1:
+                atoms.append(['Zn', x, surface_height - 0.6, z])
+            else:
+                atoms.append(['O_', x, surface_height - 0.6, z])
+            atoms.append(['Zn', x, surface_height - 2.6, z])
+    return atoms
+
+def writeSurface(path, nx, nz):
+    atoms = makeSurface(nx, nz)
+    outfile = open(path, 'w')
+    outfile.write(str(len(atoms)) + '\n')
+    outfile.write(str(nx * x_grid_dist) + '  ' + str(30) + '  ' + str(nz * z_grid_dist) + '\n')
+    for atom in atoms:
+        outfile.write('%s   %f    %f   %f  0\n' % (atom[0], atom[1], atom[2], atom[3]))
+    outfile.close()
+    return len(atoms)
+
+# write input.IN using the repository input file as a template
+def writeInput(path, overrides):
+    template = open(os.path.join(repo_dir, 'input.IN'), 'r')
+    lines = template.readlines()
+    template.close()
+
+    outfile = open(path, 'w')
+    setNext = None
+    for line in lines:
+        line = line.rstrip('\n')
+        if setNext is not None:
+            line = str(overrides.pop(setNext))
+            setNext = None
+        elif line.startswith('%') and line[1:] in overrides:
+            setNext = line[1:]
+        outfile.write(line + '\n')
+    for name in sorted(overrides):
+        outfile.write('%' + name + '\n' + str(overrides[name]) + '\n')
+    outfile.close()
+
+# sum phase times of the final timing record
+def phaseTimes(timingFile):
+    record = None
+    if os.path.isfile(timingFile):
+        for line in open(timingFile, 'r'):
+            if line.strip():
+                record = json.loads(line)
+    times = {}
+    if record is None:
+        return times, {}
+    for group, names in phaseGroups:
+        times[group] = 0.0
+        for name in names:
+            if name in record['phases']:
+                times[group] += record['phases'][name]['time']
+    return times, record['counters']
+
+# run one benchmark case in a temporary directory
+def runCase(args, nx, nz, coverage):
+    runDir = tempfile.mkdtemp(prefix='kmcbench_')
+    sites = nx * nz // 6
+    numberDepos = max(1, int(round(coverage * sites)))
+
+    writeSurface(os.path.join(runDir, 'lattice.dat'), nx, nz)
+    open(os.path.join(runDir, 'lkmcInput.IN'), 'w').write('! stub LKMC input\n')
+    writeInput(os.path.join(runDir, 'input.IN'), {
+        'jobStatus': 'BEGIN',
+        'numberDepos': numberDepos,
+        'total_steps': numberDepos + args.steps,
+        'latticeOutEvery': args.outEvery,
+        'volumesOutEvery': args.outEvery,
+        'statsOut': 1,
+        'timingOutEvery': args.steps,
+        'timingFormat': 'json',
+        # stub surface has more neighbours within bondDist than ZnO
+        'maxCoordNum': 16,
+        'randomSeed': args.seed,
+    })
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([stub_dir, repo_dir] + ([env['PYTHONPATH']] if 'PYTHONPATH' in env else []))
+    log = open(os.path.join(runDir, 'log.txt'), 'w')
+    start = time.time()
+    proc = subprocess.Popen([args.python, os.path.join(repo_dir, 'KMC.py')], cwd=runDir, env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+    _, status, usage = os.wait4(proc.pid, 0)
+    wall = time.time() - start
+    log.close()
+
+    times, counters = phaseTimes(os.path.join(runDir, 'Stats', 'Timing.json'))
+    result = {
+        'size': '%dx%d' % (nx, nz),
+        'coverage': coverage,
+        'adatoms': numberDepos,
+        'steps': args.steps,
+        'status': status,
+        'wall': wall,
+        'stepsPerSecond': args.steps / wall if wall > 0 else 0.0,
+        # ru_maxrss is in kilobytes on linux
+        'maxRSS_MB': usage.ru_maxrss / 1024.0,
+        'times': times,
+        'counters': counters,
+        'runDir': runDir,
+    }
+    if not args.keep and status == 0:
+        shutil.rmtree(runDir)
+    return result
+
+def gitRevision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo_dir).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark KMC.py with a stub LKMC backend")
+    parser.add_argument('--sizes', default='12x8,24x16,36x24', help="grid sizes nx x nz (nx multiple of 6, nz of 2)")
+    parser.add_argument('--coverages', default='0.02,0.05', help="initial adatom coverage (fraction of adsorption sites)")
+    parser.add_argument('--steps', type=int, default=100, help="KMC steps after the initial depositions")
+    parser.add_argument('--outEvery', type=int, default=10, help="lattice/volumes output frequency")
+    parser.add_argument('--seed', type=int, default=1, help="random seed used for every case")
+    parser.add_argument('--python', default=sys.executable, help="python interpreter used to run KMC.py")
+    parser.add_argument('--output', default='benchResults.csv', help="results are appended to this file")
+    parser.add_argument('--keep', action='store_true', help="keep run directories")
+    args = parser.parse_args()
+
+    revision = gitRevision()
+    stamp = time.strftime('%Y-%m-%d %H:%M:%S')
+    newFile = not os.path.isfile(args.output)
+    out = open(args.output, 'a')
+    if newFile:
+        out.write('date,revision,size,coverage,adatoms,steps,status,wall,stepsPerSecond,maxRSS_MB')
+        for group, _ in phaseGroups:
+            out.write(',' + group)
+        out.write(',volumeHit,volumeMiss,transitionHit,transitionMiss\n')
+
+    print "%-8s %8s %7s %10s %10s %10s" % ("size", "coverage", "adatoms", "steps/s", "wall (s)", "RSS (MB)"),
+    print ''.join(["%17s" % group for group, _ in phaseGroups])
+    for size in args.sizes.split(','):
+        nx, nz = [int(n) for n in size.lower().split('x')]
+        for coverage in args.coverages.split(','):
+            result = runCase(args, nx, nz, float(coverage))
+
+            print "%-8s %8s %7d %10.3f %10.2f %10.1f" % (result['size'], coverage, result['adatoms'],
+                                                       result['stepsPerSecond'], result['wall'], result['maxRSS_MB']),
+            print ''.join(["%17.3f" % result['times'].get(group, 0.0) for group, _ in phaseGroups])
+            if result['status']:
+                print "  WARNING: KMC.py failed, see", os.path.join(result['runDir'], 'log.txt')
+
+            out.write('%s,%s,%s,%s,%d,%d,%d,%f,%f,%f' % (stamp, revision, result['size'], coverage, result['adatoms'],
+                                                       result['steps'], result['status'], result['wall'],
+                                                       result['stepsPerSecond'], result['maxRSS_MB']))
+            for group, _ in phaseGroups:
+                out.write(',%f' % result['times'].get(group, 0.0))
+            for name in ['volumeHit', 'volumeMiss', 'transitionHit', 'transitionMiss']:
+                out.write(',%d' % result['counters'].get(name, 0))
+            out.write('\n')
+            out.flush()
+    out.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Graphs module (stub).
+
+The hashkey is an md5 digest of the sorted list of species pairs and
+rounded separations inside the volume, so it is deterministic and
+invariant to translation and atom ordering.
+
+"""
+
+import hashlib
+import numpy as np
+
+def getHashKeyForAVolume(params, volumeAtoms, lattice):
+    pos = np.asarray(lattice.pos, np.float64).reshape(-1, 3)[volumeAtoms]
+    specie = np.asarray(lattice.specie)[volumeAtoms]
+    dims = np.asarray([lattice.cellDims[0], lattice.cellDims[4], lattice.cellDims[8]], np.float64)
+    sep = pos[:, None, :] - pos[None, :, :]
+    for k in (0, 2):
+        sep[:, :, k] -= dims[k] * np.round(sep[:, :, k] / dims[k])
+    dist = np.round(np.sqrt((sep * sep).sum(axis=2)), 2)
+    pairs = specie[:, None] * 3 + specie[None, :]
+    iu = np.triu_indices(len(specie), 1)
+    records = np.rec.fromarrays([pairs[iu], dist[iu]])
+    records.sort()
+    digest = hashlib.md5()
+    digest.update(np.sort(specie).tostring())
+    digest.update(records.tostring())
+    return digest.hexdigest()
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""
+Input module (stub).
+
+"""
+
+class LKMCParams(object):
+    def __init__(self):
+        self.graphRadius = 5.9
+        self.bondEnergy = 0.25     # energy per Ag bond (eV)
+        self.surfaceEnergy = 0.05  # energy per Ag-surface bond (eV)
+        self.bondDist = 3.4        # bond distance used for energies (A)
+        self.baseBarrier = 0.2     # minimum hop barrier (eV)
+
+def getLKMCParams(index, prefix, inputFile):
+    return LKMCParams()
+
+def readGlobals(inputFile):
+    return
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Lattice module (stub).
+
+Energies are computed by counting Ag-Ag and Ag-surface bonds.
+
+"""
+
+import numpy as np
+
+SPECIES = ['O_', 'Zn', 'Ag']
+
+class Lattice(object):
+    def __init__(self):
+        self.NAtoms = 0
+        self.pos = np.zeros(0, np.float64)
+        self.specie = np.zeros(0, np.int32)
+        self.specieList = np.asarray(SPECIES)
+        self.charge = np.zeros(0, np.float64)
+        self.cellDims = np.zeros(9, np.float64)
+        self.totalEnergy = 0.0
+
+    def calcForce(self, correctTE=1):
+        self.totalEnergy = bondEnergy(self)
+        return 0
+
+    def writeLattice(self, filename):
+        f = open(filename, 'w')
+        f.write("%d\n" % self.NAtoms)
+        f.write("%f  %f  %f\n" % (self.cellDims[0], self.cellDims[4], self.cellDims[8]))
+        for i in xrange(self.NAtoms):
+            f.write("%s   %f    %f   %f  %f\n" % (self.specieList[self.specie[i]], self.pos[3*i],
+                                                  self.pos[3*i+1], self.pos[3*i+2], self.charge[i]))
+        f.close()
+
+def readLattice(filename):
+    f = open(filename, 'r')
+    NAtoms = int(f.readline().split()[0])
+    dims = f.readline().split()
+    lattice = Lattice()
+    lattice.NAtoms = NAtoms
+    lattice.cellDims = np.asarray([float(dims[0]), 0, 0, 0, float(dims[1]), 0, 0, 0, float(dims[2])], np.float64)
+    pos = []
+    specie = []
+    charge = []
+    for line in f:
+        line = line.split()
+        if len(line) < 4:
+            break
+        specie.append(SPECIES.index(line[0]))
+        pos.extend([float(line[1]), float(line[2]), float(line[3])])
+        charge.append(float(line[4]) if len(line) > 4 else 0.0)
+    f.close()
+    lattice.NAtoms = len(specie)
+    lattice.pos = np.asarray(pos, np.float64)
+    lattice.specie = np.asarray(specie, np.int32)
+    lattice.charge = np.asarray(charge, np.float64)
+    return lattice
+
+# number of bonds of each Ag atom, split into Ag-Ag and Ag-surface
+def bondCounts(lattice, bondDist=3.4):
+    pos = lattice.pos.reshape(-1, 3)
+    ag = np.where(lattice.specie == 2)[0]
+    agBonds = np.zeros(len(ag), np.int32)
+    surfBonds = np.zeros(len(ag), np.int32)
+    if not len(ag):
+        return ag, agBonds, surfBonds
+    dims = np.asarray([lattice.cellDims[0], lattice.cellDims[4], lattice.cellDims[8]])
+    for n, i in enumerate(ag):
+        sep = pos - pos[i]
+        for k in (0, 2):
+            sep[:, k] -= dims[k] * np.round(sep[:, k] / dims[k])
+        dist = np.sqrt((sep * sep).sum(axis=1))
+        close = (dist < bondDist) & (dist > 0.01)
+        agBonds[n] = np.count_nonzero(close & (lattice.specie == 2))
+        surfBonds[n] = np.count_nonzero(close & (lattice.specie != 2))
+    return ag, agBonds, surfBonds
+
+def bondEnergy(lattice, bondEnergy=0.25, surfaceEnergy=0.05):
+    _, agBonds, surfBonds = bondCounts(lattice)
+    return - bondEnergy * 0.5 * float(agBonds.sum()) - surfaceEnergy * float(surfBonds.sum())
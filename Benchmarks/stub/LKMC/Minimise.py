@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""
+Minimise module (stub).
+
+Lattice positions are already minima of the bond-counting energy, so the
+minimiser only evaluates the energy.
+
+"""
+
+class Minimiser(object):
+    def __init__(self, params):
+        self.params = params
+
+    def run(self, lattice):
+        lattice.calcForce(correctTE=1)
+        return 0
+
+def getMinimiser(params):
+    return Minimiser(params)
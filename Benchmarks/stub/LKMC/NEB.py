@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+NEB module (stub).
+
+The barrier is a base value plus the energy of the bonds broken by the
+hopping atom, which keeps detailed balance with the bond-counting energy.
+
+"""
+
+import numpy as np
+from LKMC import Lattice, Vectors
+
+class NEB(object):
+    def __init__(self, params):
+        self.params = params
+        self.barrier = None
+
+    def run(self, ini, fin):
+        index, maxMove, _, _ = Vectors.maxMovement(ini.pos, fin.pos, ini.cellDims)
+        ag, agBonds, _ = Lattice.bondCounts(ini)
+        bonds = 0
+        where = np.where(ag == index)[0]
+        if len(where):
+            bonds = agBonds[where[0]]
+        base = getattr(self.params, "baseBarrier", 0.2)
+        dE = fin.totalEnergy - ini.totalEnergy
+        self.barrier = base + 0.05 * bonds + max(0.0, dE)
+        return 0
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+"""
+Utilities module (stub).
+
+"""
+
+def convertStrToType(paramValueStr, paramType):
+    paramValueStr = paramValueStr.strip()
+    if paramType == 'int':
+        return int(paramValueStr)
+    elif paramType == 'float':
+        return float(paramValueStr)
+    elif paramType == 'bool':
+        return bool(int(paramValueStr))
+    return paramValueStr
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+Vectors module (stub).
+
+"""
+
+import numpy as np
+
+# separation vector from pos1 to pos2 using PBC in x and z
+def separationVector(pos1, pos2, cellDims):
+    sep = np.asarray(pos2, dtype=np.float64) - np.asarray(pos1, dtype=np.float64)
+    dims = np.asarray([cellDims[0], cellDims[4], cellDims[8]], dtype=np.float64)
+    for k in (0, 2):
+        sep[k::3] -= dims[k] * np.round(sep[k::3] / dims[k])
+    return sep
+
+def magnitude(vector):
+    return float(np.sqrt(np.dot(vector, vector)))
+
+# return index, max and average displacement between two position arrays
+def maxMovement(pos1, pos2, cellDims):
+    sep = separationVector(pos1, pos2, cellDims).reshape(-1, 3)
+    moves = np.sqrt((sep * sep).sum(axis=1))
+    if not len(moves):
+        return 0, 0.0, 0.0, moves
+    index = int(np.argmax(moves))
+    return index, float(moves[index]), float(moves.mean()), moves
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""
+Stand-in for the LKMC package used by the benchmark suite.
+
+Provides bond-counting energies, a deterministic volume hashkey and
+trivial minimiser/NEB drivers so that KMC.py can run without the real
+force field or NEB code.
+
+"""
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Shared catalog module.
+
+Lets several KMC runs on a node share their transitions. Each run appends
+new volume directions and transitions to a journal file in catalogDir
+(with an exclusive file lock so lines are never interleaved) and reads
+lines appended by the other runs. A run that starts the searches for a
+new volume creates a claim file first, so other runs meeting the same
+volume wait for its results instead of repeating the NEBs.
+
+"""
+
+import os
+import time
+import errno
+import fcntl
+
+# convert a journal value back to the type used in the volumes
+def toValue(text):
+    if text == "None":
+        return "None"
+    return float(text)
+
+class sharedCatalog(object):
+    def __init__(self, catalogDir, volumeClass, keyClass, rateFunc, pollTime=1.0, claimTimeout=3600):
+        self.catalogDir = catalogDir
+        self.journalPath = os.path.join(catalogDir, "Catalog.journal")
+        self.claimDir = os.path.join(catalogDir, "Claims")
+        self.volumeClass = volumeClass
+        self.keyClass = keyClass
+        # sets the rates of a list of transitions from their barriers
+        self.rateFunc = rateFunc
+        self.pollTime = pollTime
+        self.claimTimeout = claimTimeout
+        self.offset = 0
+        self.published = set()
+        self.claims = set()
+        self.numRead = 0
+        self.numWritten = 0
+
+        if not os.path.exists(self.claimDir):
+            try:
+                os.makedirs(self.claimDir)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+        if not os.path.isfile(self.journalPath):
+            open(self.journalPath, "a").close()
+
+    # read lines appended since the last sync and add them to volumes.
+    # Only barriers are stored in the journal, rates are set by rateFunc
+    def sync(self, volumes):
+        journal = open(self.journalPath, "r")
+        fcntl.flock(journal, fcntl.LOCK_SH)
+        try:
+            journal.seek(self.offset)
+            text = journal.read()
+        finally:
+            fcntl.flock(journal, fcntl.LOCK_UN)
+            journal.close()
+
+        # only use complete lines
+        end = text.rfind("\n") + 1
+        self.offset += end
+        newKeys = []
+        for line in text[:end].splitlines():
+            line = line.split("\t")
+            if line[0] == "D" and len(line) == 5:
+                self.published.add(("D", line[1], line[2], line[3], line[4]))
+                vol = self.getVolume(volumes, line[1])
+                vol.addDirection([int(line[2]), int(line[3]), int(line[4])])
+            elif line[0] == "T" and len(line) == 5:
+                self.published.add(("T", line[1], line[2]))
+                vol = self.getVolume(volumes, line[1])
+                if line[2] not in vol.finalKeys:
+                    newKey = self.keyClass()
+                    newKey.barrier = toValue(line[3])
+                    newKey.rate = 0.0
+                    newKey.reverseBarrier = toValue(line[4])
+                    vol.finalKeys[line[2]] = newKey
+                    newKeys.append(newKey)
+                    self.numRead += 1
+        self.rateFunc(newKeys)
+        return len(newKeys)
+
+    def getVolume(self, volumes, hashkey):
+        if hashkey not in volumes:
+            volumes[hashkey] = self.volumeClass()
+        return volumes[hashkey]
+
+    # append directions and transitions of a volume not already in the journal
+    def publish(self, hashkey, vol):
+        lines = []
+        for direc in vol.directions:
+            entry = ("D", hashkey, str(direc[0]), str(direc[1]), str(direc[2]))
+            if entry not in self.published:
+                self.published.add(entry)
+                lines.append("\t".join(entry) + "\n")
+        for finalKey in vol.finalKeys:
+            entry = ("T", hashkey, finalKey)
+            if entry not in self.published:
+                self.published.add(entry)
+                trans = vol.finalKeys[finalKey]
+                lines.append("\t".join(["T", hashkey, finalKey, str(trans.barrier), str(trans.reverseBarrier)]) + "\n")
+        if not lines:
+            return 0
+
+        journal = open(self.journalPath, "a")
+        fcntl.flock(journal, fcntl.LOCK_EX)
+        try:
+            journal.write("".join(lines))
+            journal.flush()
+            os.fsync(journal.fileno())
+        finally:
+            fcntl.flock(journal, fcntl.LOCK_UN)
+            journal.close()
+        self.numWritten += len(lines)
+        return len(lines)
+
+    # publish every volume, eg. the ones read from Volumes.txt
+    def publishAll(self, volumes):
+        num = 0
+        for hashkey in volumes:
+            num += self.publish(hashkey, volumes[hashkey])
+        return num
+
+    def claimPath(self, hashkey):
+        return os.path.join(self.claimDir, str(hashkey))
+
+    # claim the searches for a volume. Returns True if this run should do the
+    # searches and False if another run published the volume while we waited
+    def claim(self, hashkey, volumes):
+        path = self.claimPath(hashkey)
+        waited = False
+        while 1:
+            self.sync(volumes)
+            if hashkey in volumes and len(volumes[hashkey].directions):
+                return False
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, "%s %d\n" % (os.uname()[1], os.getpid()))
+                os.close(fd)
+                self.claims.add(hashkey)
+                return True
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+
+            # claims left behind by a run that died are removed after claimTimeout
+            try:
+                if time.time() - os.path.getmtime(path) > self.claimTimeout:
+                    print "Removing stale catalog claim for ", hashkey
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue
+            if not waited:
+                print "Volume ", hashkey, " is being searched by another run, waiting ..."
+                waited = True
+            time.sleep(self.pollTime)
+
+    def release(self, hashkey):
+        if hashkey in self.claims:
+            self.claims.discard(hashkey)
+            try:
+                os.remove(self.claimPath(hashkey))
+            except OSError:
+                pass
+
+    # remove all claims held by this run (eg. when it exits early)
+    def releaseAll(self):
+        for hashkey in list(self.claims):
+            self.release(hashkey)
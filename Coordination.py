@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Coordination module.
+
+Coordination number of every adatom (atoms within bondDist, counted as in
+findVolumeAtoms: surface atoms, adatoms and the atom itself) and the set of
+active adatoms with coordination <= maxCoordNum. Transitions are only
+searched for active adatoms. The adatom positions are compared with the
+last ones at each sync and only the atoms that moved, were added or were
+removed update the counts of their neighbours, so adatoms become active
+again when a neighbour leaves.
+
+"""
+
+import numpy as np
+
+class coordinationTracker(object):
+    def __init__(self, surface_positions, params, box_x, box_z):
+        self.bondDist = params.bondDist
+        self.maxCoordNum = params.maxCoordNum
+        self.cell = np.asarray([box_x, params.maxHeight, box_z], dtype=np.float64)
+        self.surface = np.asarray(surface_positions, dtype=np.float64).reshape(-1, 3)
+
+        # surface neighbours of each lattice site seen
+        self.surfaceCoord = {}
+        self.positions = []
+        self.pos = np.zeros((0, 3), dtype=np.float64)
+        self.present = np.zeros(0, dtype=bool)
+        self.coord = np.zeros(0, dtype=np.int64)
+        self.active = set()
+
+    # minimum image distances of points from a position
+    def distances(self, points, centre):
+        sep = points - centre
+        sep -= self.cell * np.round(sep / self.cell)
+        return np.sqrt(np.einsum('ij,ij->i', sep, sep))
+
+    def surfaceCount(self, position):
+        try:
+            return self.surfaceCoord[position]
+        except KeyError:
+            count = int(np.count_nonzero(self.distances(self.surface, np.asarray(position, dtype=np.float64)) < self.bondDist))
+            self.surfaceCoord[position] = count
+            return count
+
+    # adatoms (other than i) within bondDist of a position
+    def neighbours(self, i, position):
+        near = self.present & (self.distances(self.pos, np.asarray(position, dtype=np.float64)) < self.bondDist)
+        near[i] = False
+        return np.nonzero(near)[0]
+
+    # update the counts of atoms that moved, were added or removed since the last call
+    def sync(self, full_depo_list):
+        positions = [(float(atom[1]), float(atom[2]), float(atom[3])) for atom in full_depo_list]
+        num = max(len(positions), len(self.positions))
+        if len(self.present) < num:
+            extra = num - len(self.present)
+            self.pos = np.vstack((self.pos, np.zeros((extra, 3), dtype=np.float64)))
+            self.present = np.concatenate((self.present, np.zeros(extra, dtype=bool)))
+            self.coord = np.concatenate((self.coord, np.zeros(extra, dtype=np.int64)))
+
+        touched = set()
+        for i in xrange(num):
+            old = self.positions[i] if i < len(self.positions) else None
+            new = positions[i] if i < len(positions) else None
+            if old == new:
+                continue
+            if old is not None:
+                near = self.neighbours(i, old)
+                self.coord[near] -= 1
+                touched.update(near)
+                self.present[i] = False
+            if new is not None:
+                near = self.neighbours(i, new)
+                self.coord[near] += 1
+                touched.update(near)
+                self.pos[i] = new
+                self.present[i] = True
+                self.coord[i] = self.surfaceCount(new) + len(near) + 1
+            touched.add(i)
+        self.positions = positions
+
+        for i in touched:
+            if self.present[i] and self.coord[i] <= self.maxCoordNum:
+                self.active.add(i)
+            else:
+                self.active.discard(i)
+        return len(touched)
+
+    def isActive(self, i):
+        return i in self.active
+
+    def numFull(self):
+        return len(self.positions) - len(self.active)
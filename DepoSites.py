@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Deposition site module.
+
+Keeps the height and species of the top atom of every grid column and the
+set of columns a new atom can be deposited on (the same checks as
+deposition(): no Ag on the column or its 6 neighbours and not on top of
+surface O, unless it lands on top of exactly 3 Ag atoms). The adatom
+positions are compared with the last ones before each deposition so only
+columns around atoms that moved are updated, and deposition picks a valid
+column directly instead of drawing random columns until one is accepted.
+
+"""
+
+# grid offsets of the 6 surrounding columns, in the order used by findNeighbours
+neighbourOffsets = [(2,0), (1,-1), (-1,-1), (-2,0), (-1,1), (1,1)]
+
+class depositionSites(object):
+    def __init__(self, surface_lattice, params, x_grid_points, z_grid_points, box_x, box_z):
+        self.x_grid_dist = params.x_grid_dist
+        self.z_grid_dist = params.z_grid_dist
+        self.nx = int(x_grid_points)
+        self.nz = int(z_grid_points)
+        self.box_x = box_x
+        self.box_z = box_z
+
+        # top of each column of the surface (height, species)
+        self.surfaceTop = {}
+        for atom in surface_lattice:
+            col = self.column(atom[1], atom[3])
+            if col not in self.surfaceTop or float(atom[2]) > self.surfaceTop[col][0]:
+                self.surfaceTop[col] = (float(atom[2]), str(atom[0]))
+
+        # adatom heights and species in each column
+        self.adatomColumns = {}
+        self.positions = []
+        self.top = dict(self.surfaceTop)
+
+        # columns deposition_xz can pick: z grid index has the parity of the x grid index
+        self.candidates = set()
+        for ix in xrange(self.nx):
+            for iz in xrange(ix % 2, self.nz, 2):
+                self.candidates.add((ix, iz))
+
+        # valid columns as a list for O(1) sampling and the position of each in it
+        self.valid = []
+        self.validIndex = {}
+        for col in self.candidates:
+            self.setValid(col, self.checkSite(col))
+
+    def column(self, x, z):
+        return (int(round(float(x) / self.x_grid_dist)) % self.nx, int(round(float(z) / self.z_grid_dist)) % self.nz)
+
+    # columns of the stencil of a site (the site first)
+    def stencil(self, col):
+        cols = [col]
+        for dx, dz in neighbourOffsets:
+            cols.append(((col[0] + dx) % self.nx, (col[1] + dz) % self.nz))
+        return cols
+
+    # height the new atom lands on, species and heights of the stencil (as deposition_y)
+    def siteInfo(self, col):
+        species = []
+        heights = []
+        for c in self.stencil(col):
+            height, specie = self.top.get(c, (0.0, None))
+            species.append(specie)
+            heights.append(round(height, 6))
+        return round(max(heights), 6), species, heights
+
+    # same rules as deposition()
+    def checkSite(self, col):
+        y_coord, nlist, hlist = self.siteInfo(col)
+        if nlist[0] != 'Ag':
+            numAg = 0
+            for i in xrange(len(nlist)):
+                if nlist[i] == 'Ag' and hlist[i] == y_coord:
+                    numAg += 1
+            if numAg == 3:
+                return True
+        if 'Ag' in nlist:
+            return False
+        if nlist[0] == 'O_':
+            return False
+        return True
+
+    def setValid(self, col, valid):
+        if valid and col not in self.validIndex:
+            self.validIndex[col] = len(self.valid)
+            self.valid.append(col)
+        elif not valid and col in self.validIndex:
+            # swap with the last valid column
+            i = self.validIndex.pop(col)
+            last = self.valid.pop()
+            if last != col:
+                self.valid[i] = last
+                self.validIndex[last] = i
+
+    # update columns of adatoms that moved, were added or removed since the last call
+    def sync(self, full_depo_list):
+        positions = [(atom[0], float(atom[1]), float(atom[2]), float(atom[3])) for atom in full_depo_list]
+        touched = set()
+        for i in xrange(max(len(positions), len(self.positions))):
+            old = self.positions[i] if i < len(self.positions) else None
+            new = positions[i] if i < len(positions) else None
+            if old == new:
+                continue
+            if old is not None:
+                col = self.column(old[1], old[3])
+                self.adatomColumns[col].remove((old[2], old[0]))
+                touched.add(col)
+            if new is not None:
+                col = self.column(new[1], new[3])
+                self.adatomColumns.setdefault(col, []).append((new[2], new[0]))
+                touched.add(col)
+        self.positions = positions
+
+        for col in touched:
+            top = self.surfaceTop.get(col, (0.0, None))
+            for height, specie in self.adatomColumns.get(col, []):
+                if height > top[0]:
+                    top = (height, specie)
+            self.top[col] = top
+
+        # a column changes the validity of every site whose stencil contains it
+        sites = set()
+        for col in touched:
+            sites.update(self.stencil(col))
+        for col in sites:
+            if col in self.candidates:
+                self.setValid(col, self.checkSite(col))
+        return len(touched)
+
+    # random valid column (x, z), None if there are none
+    def sample(self, rng):
+        if not self.valid:
+            return None
+        col = self.valid[int(rng.random() * len(self.valid))]
+        x = (col[0] * self.x_grid_dist) % self.box_x
+        z = (col[1] * self.z_grid_dist) % self.box_z
+        return x, z, col
+
+    def __len__(self):
+        return len(self.valid)
@@ -0,0 +1,3289 @@
+# -*- coding: utf-8 -*-
+"""
+KMC engine module.
+
+The Simulation object owns the state of a lattice KMC run (parameters,
+lattice, adatoms, basins and the event catalog) so runs can be created,
+stepped and inspected without side effects at import time.
+
+"""
+
+# Runs KMC on a hexagonal ZnO(0001) surface
+# TODO: make more general for any hexagonal surface
+# Assumes PBC in x and z directions and deposition in y
+# grid positions start at (0,0,0)
+
+
+# copyright Adam Lloyd 2016
+import time
+import sys
+import os
+import shutil
+import random
+import math
+import copy
+from decimal import Decimal
+import numpy as np
+from LKMC import Graphs, NEB, Lattice, Minimise, Input, Vectors
+import Parameters
+import Flicker
+import Timing
+import Profiling
+import Catalog
+import Schedule
+import Environment
+import StateCache
+import Surrogate
+import AsyncNEB
+import IslandTable
+import DepoSites
+import Coordination
+import Islands
+import Events
+import RunningStats
+
+# Defined some useful functions
+
+# classes used in hashkey calculation from LKMC
+class lattice(object):
+    def __init__(self, cellDims):
+        self.pos = []
+        self.specie = []
+        self.cellDims = cellDims
+        self.specieList = ['O_','Zn','Ag']
+        self.NAtoms = 0
+        self.charge = 0
+
+class volume(object):
+    def __init__(self):
+        self.hashkey = None
+        self.directions = []
+        self.finalKeys = {}
+        self.pos = []
+        self.specie = []
+        self.volumeAtoms = []
+
+    def addTrans(self, direction, finalKey, barrier, rate, reverseBarrier):
+        if direction not in self.directions:
+            self.directions.append(direction)
+
+        if finalKey not in self.finalKeys:
+            newKey = key()
+            newKey.barrier = barrier
+            newKey.rate = rate
+            newKey.reverseBarrier = reverseBarrier
+            # newKey.hashkey = finalKey
+            self.finalKeys[finalKey] = newKey
+
+    def addDirection(self, direction):
+        if direction not in self.directions:
+            self.directions.append(direction)
+
+    # store new volume atoms in memory
+    def addVolumeAtoms(self, volumeAtoms,lattice_positions,specie_list):
+        if len(self.volumeAtoms) < 1:
+            for i in xrange(len(lattice_positions)):
+                self.pos.append(lattice_positions[i])
+            for i in xrange(len(specie_list)):
+                self.specie.append(specie_list[i])
+            for i in xrange(len(volumeAtoms)):
+                self.volumeAtoms.append(volumeAtoms)
+
+class key(object):
+    def __init__(self):
+        self.barrier = None
+        self.rate = None
+        self.reverseBarrier = None
+        # self.hashkey = None
+
+# transition object for the basin
+class basinTransition(object):
+    def __init__(self,finPos,rate,barrier,reverseBarrier):
+        self.finPos = finPos
+        self.rate = rate
+        self.barrier = barrier
+        self.reverseBarrier = reverseBarrier
+        self.finRef = None
+
+# basinPosition object for basinPos list (similar to basin DV in LAKMC)
+class basinPosition(object):
+    def __init__(self):
+        self.transitionList = []
+        self.explored = 0
+        self.iniPos = None
+        self.hashkey = None
+
+# basin type object
+class basin(object):
+    def __init__(self, sim):
+        self.sim = sim
+        self.timers = sim.timers
+        self.atomNum = None
+        self.currentPos = None
+        self.positions = []
+        self.basinPos = []
+        self.exploredList = []
+        # self.transitionList = []
+        self.connectivity = None
+
+    # check if two basin states are the same position
+    def samePos(self, pos1, pos2):
+        return self.sim.PBCdistance(pos1[0],pos1[1],pos1[2],pos2[0],pos2[1],pos2[2]) < self.sim.params.basinDistTol
+
+    # create an event for a transition in the basin
+    def makeEvent(self, rate, atomNum, trans):
+        return [rate,atomNum,trans.finPos,trans.barrier]
+
+    # name used in basin reports
+    def label(self):
+        return str(self.atomNum)
+
+    # add transition to basin
+    def addTransition(self,iniPos,finPos,rate,barrier,reverseBarrier):
+        # is this an internal event or escaping?
+        if barrier < self.sim.params.basinBarrierSubTol and reverseBarrier < self.sim.params.basinBarrierSubTol:
+            if barrier < self.sim.params.basinBarrierTol or reverseBarrier < self.sim.params.basinBarrierTol:
+                flag = 0
+            else:
+                flag = 1
+        else:
+            flag = 1
+
+        # if self.samePos(iniPos,finPos):
+        #     return
+
+        createFlagF = 1
+        i=0
+        # check if initial position exists in the basin
+        for i in range(len(self.basinPos)):
+            pos = self.basinPos[i].iniPos
+            if self.samePos(iniPos,pos):
+                createFlagF = 0
+                break
+        # if does not exist, add
+        if createFlagF:
+            i = len(self.basinPos)
+            newTrans = basinTransition(finPos,rate,barrier,reverseBarrier)
+            newTrans.finRef = None
+            newPos = basinPosition()
+            newPos.explored = 1
+            newPos.iniPos = iniPos
+            newPos.transitionList.append(newTrans)
+            self.basinPos.append(newPos)
+        else:
+            # check if this transition already exists in the basin
+            createFlagF = 1
+            for trans in self.basinPos[i].transitionList:
+                if self.samePos(finPos,trans.finPos):
+                    createFlagF = 0
+            # if not, add transition
+            if createFlagF:
+                newTrans = basinTransition(finPos,rate,barrier,reverseBarrier)
+                newTrans.finRef = None
+                self.basinPos[i].transitionList.append(newTrans)
+                self.basinPos[i].explored = 1
+
+
+        j=0
+        createFlag = 1
+        finalInBasin = 0
+        # check final position exists in the basin
+        for j in range(len(self.basinPos)):
+            pos = self.basinPos[j].iniPos
+            if self.samePos(finPos,pos):
+                createFlag = 0
+                finalInBasin = 1
+                break
+
+        # if does not exist, add
+        if createFlag and not flag:
+            j = len(self.basinPos)
+            revRate = self.sim.calcRate(reverseBarrier)
+            newTransR = basinTransition(iniPos,revRate,reverseBarrier,barrier)
+            newTransR.finRef = i
+            newPosR = basinPosition()
+            newPosR.explored = 0
+            newPosR.iniPos = finPos
+            newPosR.transitionList.append(newTransR)
+            self.basinPos.append(newPosR)
+            finalInBasin = 1
+
+        elif not createFlag and not flag:
+            # check transition exists in the basin
+            createFlag = 1
+            for trans in self.basinPos[j].transitionList:
+                if self.samePos(iniPos,trans.finPos):
+                    createFlag = 0
+            # add transition if not
+            if createFlag:
+                newTransR = basinTransition(iniPos,rate,reverseBarrier,barrier)
+                newTransR.finRef = i
+                self.basinPos[j].transitionList.append(newTransR)
+
+        elif not createFlag and flag:
+            createFlag = 1
+            for trans in self.basinPos[j].transitionList:
+                if self.samePos(iniPos,trans.finPos):
+                    createFlag = 0
+            # add transition if not
+            if createFlag:
+                newTransR = basinTransition(iniPos,rate,reverseBarrier,barrier)
+                newTransR.finRef = i
+                self.basinPos[j].transitionList.append(newTransR)
+
+        # assign ref to positions
+        if createFlagF and finalInBasin:
+            self.basinPos[i].transitionList[-1].finRef = j
+            # print "Adding transition: ",i,j
+
+            # change previously found escaping transitions to internal
+            for basPos in self.basinPos:
+                for trans in basPos.transitionList:
+                    tPos = trans.finPos
+                    if trans.finRef is None:
+                        if self.samePos(tPos,finPos):
+                            trans.finRef = j
+                            rate = self.sim.calcRate(trans.reverseBarrier)
+                            newTransM = basinTransition(basPos.iniPos,rate,trans.reverseBarrier,trans.barrier)
+                            print "MATCH MADE WITH FINAL POS"
+
+    # build connectivity matrix. All elements are transition numbers
+    def buildConnectivity(self):
+        N = len(self.basinPos)
+        self.connectivity = [[[] for i in range(N)] for j in range(N)]
+
+        # create connectivity matrix
+        for i in range(len(self.basinPos)):
+            pos = self.basinPos[i]
+            cPos = self.currentPos
+            if self.samePos(pos.iniPos,cPos):
+                cDV = i
+            for j in range(len(pos.transitionList)):
+                trans = pos.transitionList[j]
+                # if trans.barrier is not None and trans.barrier != 'None':
+                # print trans.barrier, pos.iniPos, trans.finRef
+                # if trans.finRef is not None:
+                #     print self.basinPos[trans.finRef].explored
+                if trans.finRef is not None:
+                    if len(self.connectivity[i][trans.finRef]) == 0:
+                        self.connectivity[i][trans.finRef].append(j)
+                    else:
+                        print "Warning! Two same transitions! State: ", i, "Transitions: ", j, self.connectivity[i][trans.finRef][0]
+                        self.basinReport("Faulty")
+                        sys.exit()
+
+        # check symmetry of matrix
+        for i in range(len(self.connectivity)):
+            for j in range(len(self.connectivity)):
+                if j != i:
+                    if len(self.connectivity[i][j]) != len(self.connectivity[j][i]):
+                        print "Warning! Basin is non-symmetric"
+                        return False
+
+        # print connectivty matrix
+        if len(self.connectivity) > 1:
+            print "Connectivity matrix for atom %s:" % self.label()
+            for i in range(N):
+                text = '['
+                for j in range(N):
+                    text += str(len(self.connectivity[i][j])) + ' '
+                text += ']'
+                print text
+                # print self.connectivity[i]
+
+        return True
+        # print "Current DV explored: ", self.basinPos[cDV].explored
+        # explor = []
+        # for i in range(N):
+        #     explor.append(self.basinPos[i].explored)
+        # print "Explored states: ", explor
+
+
+    # check if position is in this basin
+    def thisBasin(self, pos, step):
+        # cPos = self.currentPos
+        # if self.samePos(cPos,pos):
+        #     return True
+
+        for basPos in self.basinPos:
+            bPos = basPos.iniPos
+            if self.samePos(bPos,pos):
+                # self.basinReport(step)
+                basPos.explored = 1
+                return True
+
+        # for basPos in self.basinPos:
+        #     for trans in basPos.transitionList:
+        #         tPos = trans.finPos
+        #         if self.samePos(tPos,pos):
+        #             # print "pos: ", pos, "CurrentPos: ", self.currentPos
+        #             print "MATCH MADE WITH FINAL POS"
+        #             # self.basinReport(step)
+
+        return False
+
+    # calculate mean rates within the basin
+    @Timing.timedMethod('basinSolve')
+    def meanRate(self):
+        result = []
+        barriers = []
+        stateNum = 0
+        stateMapping = []
+
+        # find all fully explored basin states
+        for i in range(len(self.basinPos)):
+            if self.basinPos[i].explored:
+                stateNum +=1
+                stateMapping.append(i)
+
+        if stateNum == 1:
+            return result
+
+        transMatrix = np.zeros([stateNum, stateNum])
+        tao1 = np.zeros(stateNum, np.float64)
+        transNum = np.zeros(stateNum,dtype=np.int)
+
+        # find tao for each state
+        for j in range(stateNum):
+            transNum[j] = len(self.basinPos[stateMapping[j]].transitionList)
+            sum = 0.0
+            for i in range(transNum[j]):
+                sum += self.basinPos[stateMapping[j]].transitionList[i].rate
+                barriers.append(self.basinPos[stateMapping[j]].transitionList[i].barrier)
+            if sum == 0.0:
+                print "Error: Sum of rates for State %d (%d trans) is zero!"%(j, transNum[j])
+                return result
+            tao1[j] = 1 / sum
+
+        # find all trans matrix entries
+        for i in range(stateNum):
+            for j in range(stateNum):
+                for k in self.connectivity[stateMapping[i]][stateMapping[j]]:
+                    transMatrix[j][i] += tao1[i] * self.basinPos[stateMapping[i]].transitionList[k].rate
+
+        occupVect0 = np.zeros(stateNum)
+
+        # set original entry point of basin as initial state
+        occupVect0[0] = 1.0
+
+        matrix2bInv = np.matrix(np.identity(stateNum)) - transMatrix
+
+        # invert matrix
+        try:
+            occupVect = np.linalg.inv(matrix2bInv)
+        except np.linalg.LinAlgError:
+            print "Error: Transition Matrix not invertible."
+            return None
+        occupVect = np.inner(occupVect, occupVect0)
+        occupVect = np.squeeze(np.asarray(occupVect))
+
+        tao = np.zeros(stateNum, np.float64)
+        taoSum = 0.0
+        for j in range(stateNum):
+            tao[j] = tao1[j] * occupVect[j]
+            taoSum += tao[j]
+
+
+        negRate = False
+        # find new rates
+        for i in range(stateNum):
+            for j in range(transNum[i]):
+                finalDV = self.basinPos[stateMapping[i]].transitionList[j].finRef
+                if finalDV is not None:
+                    if self.basinPos[finalDV].explored:
+                        result.append(0.0)
+                    else:
+                        localRate = tao[i]/taoSum*self.basinPos[stateMapping[i]].transitionList[j].rate
+                        result.append(localRate)
+                else:
+                    localRate = tao[i]/taoSum*self.basinPos[stateMapping[i]].transitionList[j].rate
+                    result.append(localRate)
+                    if localRate < 0.0:
+                        print "WARNING: got a negative mean rate!! %r"%localRate
+                        negRate = True
+
+        # print "Mean rate results: ", result
+        # print "barriers: ", barriers
+
+        if not negRate:
+            return result
+        else:
+            return None
+
+    # if basin is being deleted, create normal event list
+    def addUnchangedEvents(self,atomNum):
+        event_list = []
+        # barriers = []
+        if len(self.basinPos):
+            for trans in self.basinPos[0].transitionList:
+                event = self.makeEvent(trans.rate,atomNum,trans)
+                event_list.append(event)
+                # barriers.append(trans.barrier)
+        # print barriers
+        return event_list
+
+    # update rates within the basin and create new events
+    def addChangedEvents(self,atomNum):
+        event_list = []
+        result = self.meanRate()
+        keepBasin = True
+
+        if result is not None:
+            if len(result):
+                k=0
+                for i in range(len(self.basinPos)):
+                    if self.basinPos[i].explored:
+                        for j in range(len(self.basinPos[i].transitionList)):
+                            trans = self.basinPos[i].transitionList[j]
+                            newRate = result[k]
+                            event = self.makeEvent(newRate,atomNum,trans)
+                            event_list.append(event)
+                            k += 1
+                    # else:
+                    #     for j in range(len(self.basinPos[i].transitionList)):
+                    #         trans = self.basinPos[i].transitionList[j]
+                    #         event = [trans.rate,atomNum,trans.finPos,trans.barrier]
+                    #         event_list.append(event)
+                if len(result) > k:
+                    print "WARNING, not all mean rates are assigned!", len(result), k
+            else:
+                for i in range(len(self.basinPos)):
+                    if self.basinPos[i].explored:
+                        for j in range(len(self.basinPos[i].transitionList)):
+                            trans = self.basinPos[i].transitionList[j]
+                            event = self.makeEvent(trans.rate,atomNum,trans)
+                            event_list.append(event)
+        else:
+            keepBasin = False
+            for i in range(len(self.basinPos)):
+                if self.basinPos[i].explored:
+                    for j in range(len(self.basinPos[i].transitionList)):
+                        trans = self.basinPos[i].transitionList[j]
+                        event = self.makeEvent(trans.rate,atomNum,trans)
+                        event_list.append(event)
+        return event_list, keepBasin
+
+    # optional report output for debugging
+    def basinReport(self,index):
+
+        # create a report file
+        report = self.sim.basin_dir + "/BasinAtom"+self.label()+"Step"+str(index) + '.txt'
+        outf = open(report, 'w')
+        outf.write("Number of states in basin: "+str(len(self.basinPos))+"\n\n")
+
+        # write out connectivity matrix
+        for i in range(len(self.connectivity)):
+            outf.write(str(self.connectivity[i])+"\n")
+        outf.write("\n")
+
+        # write all states and transitions
+        for i in range(len(self.basinPos)):
+            outf.write("State " + str(i)+  "\t position " + str(self.basinPos[i].iniPos) + "\t Explored " + str(self.basinPos[i].explored)+ "\n")
+            for j in range(len(self.basinPos[i].transitionList)):
+                trans = self.basinPos[i].transitionList[j]
+                outf.write("\t Trans " + str(j) + "\t Barrier " + str(trans.barrier)+"\t RevBarrier " + str(trans.reverseBarrier)+ "\t final position " + str(trans.finPos)+"\t finalState "+str(trans.finRef)+ "\n")
+            outf.write("\n")
+        outf.close()
+
+# superbasin object. States are configurations of a small cluster of adatoms
+# (one position per atom) so correlated flickers of neighbouring atoms are
+# absorbed by the same mean rate calculation as single atom basins
+class superBasin(basin):
+    def __init__(self, sim, atoms):
+        basin.__init__(self, sim)
+        self.atoms = tuple(atoms)
+        self.atomNum = self.atoms
+        self.currentKey = None
+        self.keep = False
+
+    # states are the same if every atom in the cluster is in the same position
+    def samePos(self, config1, config2):
+        for k in range(len(config1)):
+            if not basin.samePos(self, config1[k], config2[k]):
+                return False
+        return True
+
+    # superbasin events move every atom in the cluster to its final position
+    def makeEvent(self, rate, atomNum, trans):
+        return [rate,self.atoms,[list(pos) for pos in trans.finPos],trans.barrier]
+
+    def label(self):
+        return '-'.join([str(atom) for atom in self.atoms])
+
+    # check if configuration is in this basin. Combined hashkeys are compared
+    # first as states with different keys cannot have the same configuration
+    def thisBasin(self, config, step, hashkey=None):
+        for basPos in self.basinPos:
+            if hashkey is not None and basPos.hashkey is not None and basPos.hashkey != hashkey:
+                continue
+            if self.samePos(basPos.iniPos, config):
+                basPos.explored = 1
+                basPos.hashkey = hashkey
+                return True
+        return False
+
+    # store combined hashkey of the current configuration
+    def markCurrent(self):
+        for basPos in self.basinPos:
+            if basPos.hashkey is None and self.samePos(basPos.iniPos, self.currentPos):
+                basPos.hashkey = self.currentKey
+
+# passes single atom transitions of a cluster member on to its superbasin
+class superBasinMember(object):
+    def __init__(self, sbas, atomNum):
+        self.sbas = sbas
+        self.atomNum = atomNum
+
+    def addTransition(self,iniPos,finPos,rate,barrier,reverseBarrier):
+        iniConfig = self.sbas.currentPos
+        finConfig = list(iniConfig)
+        finConfig[self.sbas.atoms.index(self.atomNum)] = finPos
+        self.sbas.addTransition(iniConfig,tuple(finConfig),rate,barrier,reverseBarrier)
+
+# read lattice header at input filename
+def readLatticeHeader(input_lattice_path):
+    file = open(input_lattice_path, 'r')
+    latline = file.readline()
+    line = latline.split()
+    atoms = int(line[0])
+    latline = file.readline()
+    line = latline.split()
+    box_x = float(line[0])
+    box_y = float(line[1])
+    box_z = float(line[2])
+    file.close()
+    return atoms,box_x,box_y,box_z
+
+# read in lattice file
+def readLattice(lattice,m):
+    if (os.path.isfile(lattice)):
+        input_file = open(lattice, 'r')
+        for i in range(0,m):
+            line = input_file.readline()
+        latticeLines = []
+        while 1:
+            latline = input_file.readline()
+            line = latline.split()
+            if len(line) < 5:
+                break
+            latticeLines.append([str(line[0]),float(line[1]),float(line[2]),float(line[3]),float(line[4])])
+            #latticeLines.append(line)
+        input_file.close()
+        return latticeLines
+    else:
+        print "Cannot read lattice"
+        print lattice
+        sys.exit()
+    input_file.close()
+
+# function reads of lattice, and finds the maximum y-coordinate
+def findMaxHeight(input_lattice_path):
+    max_height = 0.0
+    if (os.path.isfile(input_lattice_path)):
+        input_file = open(input_lattice_path, 'r')
+        for i in range(0,2):
+            line = input_file.readline()
+            #print i, line
+        while 1:
+            line = input_file.readline()
+            if not line: break
+            #print line
+            line = line.split()
+            if(float(line[2]) > max_height):
+                max_height = float(line[2])
+        input_file.close()
+        return max_height
+    else:
+        print " Input file not found in findMaxHeight(input_filename) function"
+        print input_lattice_path
+        sys.exit()
+
+# find PBC position in one direction
+def PBCpos(x,box_x):
+    x = round(x,6)
+    box_x = round(box_x,6)
+    if x >= box_x:
+        while x >= box_x:
+            x = x - box_x
+    if x < 0:
+        while x < 0:
+            x = x + box_x
+    return x
+
+# LKMC lattice with some atoms held at fixed positions. Every force call puts
+# them back and zeroes their forces, so the minimiser (and NEB images copied
+# from the lattice) can not move them
+class frozenLattice(Lattice.Lattice):
+    def calcForce(self, *args, **kwargs):
+        self.pos.reshape(-1, 3)[self.fixed] = self.fixedPos
+        status = Lattice.Lattice.calcForce(self, *args, **kwargs)
+        force = getattr(self, 'force', None)
+        if force is not None:
+            force.reshape(-1, 3)[self.fixed] = 0.0
+        return status
+
+# hold the given atoms of a lattice at their current (or given) positions
+def freezeAtoms(lattice, fixed, fixedPos=None):
+    try:
+        lattice.__class__ = frozenLattice
+    except TypeError:
+        print "ERROR: LKMC lattices can not hold atoms fixed (needed by relaxShell and nebClusterShell)"
+        sys.exit()
+    lattice.fixed = np.asarray(fixed, dtype=np.int64)
+    if fixedPos is None:
+        fixedPos = np.asarray(lattice.pos, dtype=np.float64).reshape(-1, 3)[lattice.fixed]
+    lattice.fixedPos = np.array(fixedPos, dtype=np.float64)
+    return lattice
+
+class Simulation(object):
+    def __init__(self, params=None, workDir=None, volumes=None):
+        # directory holding lattice.dat, input.IN and lkmcInput.IN. All output is written here
+        if workDir is None:
+            workDir = os.getcwd()
+        self.initial_dir = os.path.abspath(workDir)
+
+        # params are read from input.IN and volumes from Volumes.txt in setup() if not given
+        self.params = params
+        self.volumes = volumes
+
+        self.rng = random.Random()
+        self.timers = Timing.phaseTimers()
+        self.catalog = None
+        self.environment = None
+        self.stateCache = None
+        self.surrogate = None
+        self.lastTotalRate = 0.0
+        self.asyncNEB = None
+        self.asyncFailed = set()
+        self.pendingMet = []
+        self.snapshots = {}
+        self.islandTable = None
+        self.surfaceColumns = None
+        self.depoSites = None
+        self.depoBatchStop = False
+        self.surfaceArray = None
+        self.clusterNEBCount = 0
+        self.clusterNEBOff = False
+
+        # set initial values
+        self.Time = 0
+        self.full_depo_list = []
+        self.surface_specie= []
+        self.surface_positions = []
+        self.surface_lattice = []
+        self.basinList = []
+        self.coordination = None
+        self.islands = None
+        self.runningStats = None
+        self.event_list = []
+        self.CurrentStep = 0
+        self.index = 0
+        self.natoms = 0
+        self.startTimeSub = None
+        self.started = False
+        self.finished = False
+
+        # directory setup
+        self.output_dir_name_prefac = self.initial_dir + '/Output'
+        self.Trans_dir = self.initial_dir + '/Transitions'
+        self.Volumes_dir = self.initial_dir + '/Volumes'
+        self.NEB_dir_name_prefac = self.initial_dir + '/Temp'
+        self.Stats_dir = self.initial_dir + '/Stats'
+        self.basin_dir = self.initial_dir + '/Basin'
+        self.profile_dir = self.initial_dir + '/Profile'
+        self.input_lattice_path = self.initial_dir + '/lattice.dat'
+
+    # event catalog: hashkey -> volume (directions and final keys with barriers)
+    def eventCatalog(self):
+        return self.volumes
+
+    # known transitions of a volume as (final key, barrier, rate, reverse barrier)
+    def getTransitions(self, hashkey):
+        transitions = []
+        vol = self.volumes.get(hashkey)
+        if vol is None:
+            return transitions
+        for finalKey in vol.finalKeys:
+            trans = vol.finalKeys[finalKey]
+            transitions.append((finalKey, trans.barrier, trans.rate, trans.reverseBarrier))
+        return transitions
+
+    # number of volumes and transitions in the catalog
+    def catalogSize(self):
+        numTrans = 0
+        for vol in self.volumes.itervalues():
+            numTrans += len(vol.finalKeys)
+        return len(self.volumes), numTrans
+
+    # calculate the rate of an event given barrier height (Arrhenius eq.)
+    def calcRate(self, barrier):
+        rate = self.params.prefactor * math.exp(- barrier / (self.params.boltzmann * self.params.temperature))
+        return rate
+
+    # rates of many barriers at once (Arrhenius eq.)
+    def rateTable(self, barriers):
+        return self.params.prefactor * np.exp(- np.asarray(barriers, dtype=np.float64) / (self.params.boltzmann * self.params.temperature))
+
+    # set the rate of transitions from their barriers at the current temperature.
+    # Transitions without a barrier keep a rate of 0
+    def evaluateRates(self, keys):
+        keys = [k for k in keys if k.barrier is not None and k.barrier != 'None']
+        if not keys:
+            return
+        rates = self.rateTable([k.barrier for k in keys])
+        for k, rate in zip(keys, rates.tolist()):
+            k.rate = rate
+
+    # change the temperature. All catalog rates are re-evaluated and basins
+    # are removed as they hold rates at the old temperature
+    def setTemperature(self, temperature):
+        self.params.temperature = temperature
+        self.evaluateRates(self.catalogKeys(self.volumes))
+        self.basinList = []
+        print "Temperature set to ", temperature, " K"
+        if self.params.statsOut:
+            outfile = open(self.Stats_dir + '/Temperature.txt', 'a')
+            outfile.write(str(self.CurrentStep)+','+str(self.Time)+','+str(temperature)+'\n')
+            outfile.close()
+
+    # all transitions in the catalog
+    def catalogKeys(self, volumes):
+        keys = []
+        for vol in volumes.itervalues():
+            keys.extend(vol.finalKeys.itervalues())
+        return keys
+
+    # find barrier height given rate
+    def findBarrierHeight(self, rate):
+        barrier = round(- math.log(rate / self.params.prefactor) * (self.params.boltzmann * self.params.temperature),6)
+        return barrier
+
+    # find max height and species of max atom at a point in the x,z plane
+    def findMaxHeightAtPoints(self, surface_lattice, full_depo_index, x, z):
+        max_height = 0.0
+        max_height_atom = None
+        full_lattice = surface_lattice + full_depo_index
+
+        # check each x value in lattice against given x
+        for i in xrange(len(full_lattice)):
+            line = full_lattice[i]
+            new_x = round(PBCpos(float(line[1])-x,self.box_x),2)
+            if new_x == 0 or new_x == round(self.box_x,2):
+                new_z = round(PBCpos(float(line[3])-z,self.box_z),2)
+
+                # if x value is the same, check z value
+                if new_z == 0 or new_z == round(self.box_z,2):
+                    if(float(line[2]) > max_height):
+                        max_height = float(line[2])
+                        max_height_atom = str(line[0])
+
+        del full_lattice
+        return max_height, max_height_atom
+
+    # find how many grid points in each direction
+    def gridSize(self, box_x,box_y,box_z):
+        #assuming first atom starts at 0,0,0
+        x_grid_points = round(box_x/self.params.x_grid_dist)
+        y_grid_points = round(box_y/self.params.y_grid_dist)
+        z_grid_points = round(box_z/self.params.z_grid_dist)
+
+        box_x = x_grid_points * self.params.x_grid_dist
+        box_z = z_grid_points * self.params.z_grid_dist
+
+        return x_grid_points,y_grid_points,z_grid_points, box_x, box_z
+
+    # find random position in x,z plane to deposit
+    def deposition_xz(self, box_x,box_z,x_grid_dist,z_grid_dist):
+        x_random = self.rng.random()
+        z_random = self.rng.random()
+
+        # check if row is even or odd
+        x_coordinate = round((x_random * box_x)/x_grid_dist)
+        even = x_coordinate % 2
+
+        # case where deposit on far edge
+        if x_coordinate == self.x_grid_points:
+            even = 0
+
+        x_2 = x_coordinate * x_grid_dist
+        x_coordinate = PBCpos(x_coordinate * x_grid_dist, box_x)
+
+
+        z_coordinate = round((z_random * box_z * 0.5)/z_grid_dist)
+        z_coordinate = PBCpos(z_coordinate * z_grid_dist * 2 + even * z_grid_dist, box_z)
+
+        return x_coordinate ,z_coordinate
+
+    # returns height of and species of neighbour atoms
+    def deposition_y(self, full_depo_index,x_coord,z_coord):
+        # max height at single point
+        #y_max_0, atom_below = findMaxHeight_at_point(lattice_path,x_coord,z_coord)
+        y_max_0, atom_below = self.findMaxHeightAtPoints(self.surface_lattice, full_depo_index,x_coord, z_coord)
+
+        # check height at surrounding points
+        neighbour_pos, neighbour_species = self.findNeighbours(x_coord,z_coord,atom_below,y_max_0,full_depo_index)
+        neighbour_heights = []
+
+        i = 0
+        while i < 7:
+            neighbour_heights.append(round(neighbour_pos[i*3+1],6))
+            i += 1
+    #     print neighbour_heights
+
+
+        # find max height of local points
+        y_max = max(neighbour_heights)
+
+        # add y dist to max height found
+        y_coordinate = round(y_max,6)
+        return y_coordinate, neighbour_species, neighbour_heights
+
+    # do deposition
+    def deposition(self, box_x,box_z,x_grid_dist,z_grid_dist,full_depo_index,natoms):
+        # pick from the valid sites (only columns around moved atoms are updated)
+        if self.depoSites is not None:
+            self.depoSites.sync(full_depo_index)
+            site = self.depoSites.sample(self.rng)
+            if site is None:
+                print "ERROR: no valid deposition sites left"
+                sys.exit()
+            x_coord, z_coord, col = site
+            y_coord, nlist, hlist = self.depoSites.siteInfo(col)
+            self.timers.count('depoSiteMap')
+        else:
+            x_coord, z_coord = self.deposition_xz(box_x,box_z,x_grid_dist,z_grid_dist)
+            y_coord, nlist, hlist = self.deposition_y(full_depo_index,x_coord,z_coord)
+
+        # Potential Deposition erros for ZnO-Ag system
+        maxAg = []
+        nAg = nlist.count('Ag')
+        nH = hlist.count(y_coord)
+        if nlist[0] != 'Ag':
+            for i in xrange(len(nlist)):
+                if nlist[i] == 'Ag' and hlist[i] == y_coord:
+                    maxAg.append(i)
+                    if len(maxAg) == 3:
+                        print "landed on top of 3 Ag atoms"
+
+        # check if y_coord is at least surface height
+        if (y_coord < self.initial_surface_height):
+            print "ERROR: y height is less than initial surface height", y_coord
+            sys.exit()
+            return
+
+        # if y_coord is initial surface height
+        if round(y_coord - self.initial_surface_height,2) == 0:
+            y_coord += self.params.y_grid_dist
+
+        # if y_coord > initial surface height
+        else:
+            y_coord += self.params.y_grid_dist2
+
+
+        # print "Trying to deposit %s atom at %f, %f, %f" % (params.atom_species, x_coord, y_coord, z_coord)
+        #print nlist
+        if len(maxAg) != 3:
+            for x in nlist:
+                if x == 'Ag':
+                    # print "deposited near Ag, redo deposition"
+                    return None
+            if nlist[0] == 'O_':
+                # print "deposited on top of surface Oxygen: unstable position"
+                return None
+            # if nlist[0] == 'Zn':
+            # 	# print "deposited on top of surface Zinc: unstable position"
+            # 	return None
+
+
+        natoms += 1
+
+        print "SUCCESS: Number of atoms: ", natoms
+
+        deposition_list = [self.params.atom_species, x_coord, y_coord, z_coord, natoms]
+        return deposition_list
+
+    # allign minimised lattice back to lattice positions
+    def setToLattice(self, full_depo_index):
+        for i in range(len(full_depo_index)):
+            atom = full_depo_index[i]
+            try:
+                new_x = round(atom[1]/self.params.x_grid_dist)*self.params.x_grid_dist
+            except TypeError:
+                print "full_depo_list[i]: ", atom
+            new_z = round(atom[3]/self.params.z_grid_dist)*self.params.z_grid_dist
+            y_compare = self.initial_surface_height + self.params.y_grid_dist
+            new_y = round((atom[2]-y_compare)/self.params.y_grid_dist2)
+            new_y = new_y*self.params.y_grid_dist2 + y_compare
+
+            full_depo_index[i][1] = new_x
+            full_depo_index[i][2] = new_y
+            full_depo_index[i][3] = new_z
+
+        return full_depo_index
+
+    # find distance between 2 points inlcuding PBC
+    def PBCdistance(self, x1,y1,z1,x2,y2,z2):
+
+        pos1 = np.empty(3, np.float64)
+        pos1[0] = x1
+        pos1[1] = y1
+        pos1[2] = z1
+
+        pos2 = np.empty(3, np.float64)
+        pos2[0] = x2
+        pos2[1] = y2
+        pos2[2] = z2
+
+        cellDims = np.asarray([self.box_x,0,0,0,self.params.maxHeight,0,0,0,self.box_z],dtype=np.float64)
+        sepVec = Vectors.separationVector(pos1,pos2,cellDims)
+        mag = Vectors.magnitude(sepVec)
+
+        return mag
+
+    # find x and z of the 6 positions surrounding points (1-6)
+    def findNeighbours(self, x,z,atom_below,y_max_0,full_depo_index):
+        n_x = PBCpos(x + 2 * self.params.x_grid_dist,self.box_x)
+        n_z = z
+
+        nw_x = PBCpos(x + 1 * self.params.x_grid_dist,self.box_x)
+        nw_z = PBCpos(z - 1 * self.params.z_grid_dist,self.box_z)
+
+        sw_x = PBCpos(x - 1 * self.params.x_grid_dist,self.box_x)
+        sw_z = PBCpos(z - 1 * self.params.z_grid_dist,self.box_z)
+
+        s_x = PBCpos(x - 2 * self.params.x_grid_dist,self.box_x)
+        s_z = z
+
+        se_x = PBCpos(x - 1 * self.params.x_grid_dist,self.box_x)
+        se_z = PBCpos(z + 1 * self.params.z_grid_dist,self.box_z)
+
+        ne_x = PBCpos(x + 1 * self.params.x_grid_dist,self.box_x)
+        ne_z = PBCpos(z + 1 * self.params.z_grid_dist,self.box_z)
+
+        n_y, n = self.findMaxHeightAtPoints(self.surface_lattice,full_depo_index,n_x,n_z)
+        nw_y, nw = self.findMaxHeightAtPoints(self.surface_lattice,full_depo_index,nw_x,nw_z)
+        sw_y, sw = self.findMaxHeightAtPoints(self.surface_lattice,full_depo_index,sw_x,sw_z)
+        s_y, s = self.findMaxHeightAtPoints(self.surface_lattice,full_depo_index,s_x,s_z)
+        se_y, se = self.findMaxHeightAtPoints(self.surface_lattice,full_depo_index,se_x,se_z)
+        ne_y, ne = self.findMaxHeightAtPoints(self.surface_lattice,full_depo_index,ne_x,ne_z)
+
+        # same order as the positions so species and heights pair up
+        neighbour_species = [atom_below,n,nw,sw,s,se,ne]
+        #print neighbour_species
+        neighbour_pos = [x,y_max_0,z,n_x,n_y,n_z,nw_x,nw_y,nw_z,sw_x,sw_y,sw_z,s_x,s_y,s_z,se_x,se_y,se_z,ne_x,ne_y,ne_z]
+
+        return neighbour_pos, neighbour_species
+
+    # find list of second neighbours (1-12)
+    # returns coordinates and species
+    def findSecondNeighbours(self, x,z,full_depo_index):
+        nb2 = []
+        nb2_species = []
+
+        # find x and z coordinates
+        nx = PBCpos(x + 4 * self.params.x_grid_dist,self.box_x)
+        nz = z
+        nb2.append([nx, nz])
+        nx = PBCpos(x + 3 * self.params.x_grid_dist,self.box_x)
+        nz = PBCpos(z - 1 * self.params.z_grid_dist,self.box_z)
+        nb2.append([nx, nz])
+        nx = PBCpos(x + 2 * self.params.x_grid_dist,self.box_x)
+        nz = PBCpos(z - 2 * self.params.z_grid_dist,self.box_z)
+        nb2.append([nx, nz])
+        nx = x
+        nz = PBCpos(z - 2 * self.params.z_grid_dist,self.box_z)
+        nb2.append([nx, nz])
+        nx = PBCpos(x - 2 * self.params.x_grid_dist,self.box_x)
+        nz = PBCpos(z - 2 * self.params.z_grid_dist,self.box_z)
+        nb2.append([nx, nz])
+        nx = PBCpos(x - 3 * self.params.x_grid_dist,self.box_x)
+        nz = PBCpos(z - 1 * self.params.z_grid_dist,self.box_z)
+        nb2.append([nx, nz])
+
+        nx = PBCpos(x - 4 * self.params.x_grid_dist,self.box_x)
+        nz = z
+        nb2.append([nx, nz])
+        nx = PBCpos(x - 3 * self.params.x_grid_dist,self.box_x)
+        nz = PBCpos(z + 1 * self.params.z_grid_dist,self.box_z)
+        nb2.append([nx, nz])
+        nx = PBCpos(x - 2 * self.params.x_grid_dist,self.box_x)
+        nz = PBCpos(z + 2 * self.params.z_grid_dist,self.box_z)
+        nb2.append([nx, nz])
+        nx = x
+        nz = PBCpos(z + 2 * self.params.z_grid_dist,self.box_z)
+        nb2.append([nx, nz])
+        nx = PBCpos(x + 2 * self.params.x_grid_dist,self.box_x)
+        nz = PBCpos(z + 2 * self.params.z_grid_dist,self.box_z)
+        nb2.append([nx, nz])
+        nx = PBCpos(x + 3 * self.params.x_grid_dist,self.box_x)
+        nz = PBCpos(z + 1 * self.params.z_grid_dist,self.box_z)
+        nb2.append([nx, nz])
+
+        # find y and species
+        for k in xrange(len(nb2)):
+            nx, nz = nb2[k]
+            ny, species = self.findMaxHeightAtPoints(self.surface_lattice,full_depo_index,nx,nz)
+            nb2[k] = [nx, ny, nz]
+            nb2_species.append(species)
+
+        return nb2, nb2_species
+
+    # write out new lattice
+    @Timing.timedMethod('writeLattice')
+    def writeLattice(self, index,full_depo_index,surface_lattice,natoms,time,barrier):
+        new_lattice = self.output_dir_name_prefac + '/KMC' + str(index) + '.dat'
+        outfile = open(new_lattice, 'w')
+        line = str(natoms)
+        outfile.write(line + '\n')
+        line = str(time)
+        outfile.write(line + '\n')
+        line = str(barrier)
+        outfile.write(line + '\n')
+
+        outfile.write(str(self.box_x)+'  '+str(self.box_y)+'  '+str(self.box_z)+'  ' + '\n')
+
+        # write surface lattice first (does not change)
+        for j in xrange(len(surface_lattice)):
+            #outfile.write(str(latticeLines[x]))
+            outfile.write(str(surface_lattice[j][0]) + '   ' + str(surface_lattice[j][1])+ '    '+str(surface_lattice[j][2])+ '   '+ str(surface_lattice[j][3])+'  '+str(surface_lattice[j][4])+'\n')
+
+        # write all deposited atom positions
+        for i in xrange(len(full_depo_index)):
+            line = full_depo_index[i]
+            outfile.write(str(self.params.atom_species) + '	' + str(line[1]) + '   ' + str(line[2])+ '    '+ str(line[3]) + '   ' +  '0' + '\n')
+        outfile.close
+
+        return
+
+    # write temp lattice.dat file
+    @Timing.timedMethod('writeLatticeLKMC')
+    def writeLatticeLKMC(self, index,full_depo_index,surface_lattice,natoms):
+        new_lattice = self.NEB_dir_name_prefac + str(index) + '.dat'
+        outfile = open(new_lattice, 'w')
+        line = str(natoms)
+        outfile.write(line + '\n')
+        outfile.write(str(self.box_x)+'  '+str(30)+'  '+str(self.box_z)+'  ' + '\n')
+
+        # write surface lattice first (does not change)
+        for j in xrange(len(surface_lattice)):
+            #outfile.write(str(latticeLines[x]))
+            outfile.write(str(surface_lattice[j][0]) + '   ' + str(surface_lattice[j][1])+ '    '+str(surface_lattice[j][2])+ '   '+ str(surface_lattice[j][3])+'  '+str(surface_lattice[j][4])+'\n')
+
+        # write all deposited atom positions
+        for i in xrange(len(full_depo_index)):
+            line = full_depo_index[i]
+            outfile.write(str(self.params.atom_species) + '	' + str(line[1]) + '   ' + str(line[2])+ '    '+ str(line[3]) + '   ' +  '0' + '\n')
+        outfile.close
+
+        return
+
+    # move event
+    def moveAtom(self, depo_list, dir_vector ,full_depo_index):
+        moved_list = None
+        x = depo_list[1]
+        y = depo_list[2]
+        z = depo_list[3]
+
+        x = round(PBCpos(x+dir_vector[0]*self.params.x_grid_dist,self.box_x),6)
+        y = round(y+dir_vector[1]*self.params.y_grid_dist2,6)
+        z = round(PBCpos(z+dir_vector[2]*self.params.z_grid_dist,self.box_z),6)
+
+        y2, neighbour_species, neighbour_heights = self.deposition_y(full_depo_index,x,z)
+        #print neighbour_species
+
+        # check if large up/down move has taken place. Then check for tripod of atoms
+        if (np.abs(dir_vector[0])+np.abs(dir_vector[1])+np.abs(dir_vector[2])) > 3:
+            if round(y-y2,2) > (self.params.y_grid_dist2*1.1):
+                nH = neighbour_heights.count(round(y2,6))
+                if nH < 3:
+                    #print "Moved to 'floating' unstable position", nH
+                    return None
+        else:
+            nH = neighbour_heights.count(round(y-self.params.y_grid_dist2,6))
+            if nH < 3:
+                nH = neighbour_heights.count(round(y-self.params.y_grid_dist,6))
+                if nH < 3:
+                    #print "Moved to 'floating' unstable position", nH
+                    return None
+
+
+
+        # check for move fails
+        if round(y-self.params.y_grid_dist-neighbour_heights[0],2) == 0:
+            #print "Moved to unstable position", neighbour_species[0]
+            # print x,y,z
+            return None
+        if round(y-self.params.y_grid_dist2-neighbour_heights[0],2) == 0:
+            #print "Moved to unstable position", neighbour_species[0]
+            # print x,y,z
+            return None
+
+        if round(y-neighbour_heights[0],2) == 0:
+            #print "Moved into existing atom!"
+            # print x,y,z
+            return None
+
+        AdNeighbours = 0
+        for i in xrange(len(neighbour_species)):
+                if round(neighbour_heights[0]-y,2) == 0:
+                    AdNeighbours += 1
+
+        # if near neighbours exist in plane fail move
+        if dir_vector[1] == 0:
+            # will always be at least 1 as it includes self pre-move
+            if AdNeighbours > 1:
+                #print "Moved too close to existing atoms"
+                # print x,y,z
+                return None
+        else:
+            if AdNeighbours > 0:
+                #print "Moved too close to existing atoms"
+                # print x,y,z
+                return None
+
+        new_full_list = copy.deepcopy(self.full_depo_list)
+        new_full_list.pop((depo_list[4]-len(self.surface_lattice)-1))
+
+
+        for atom in new_full_list:
+            x2 = atom[1]
+            y2 = atom[2]
+            z2 = atom[3]
+            if y > self.initial_surface_height:
+                if self.PBCdistance(x,y,z,x2,y2,z2) < self.params.checkMoveDist:
+                    del new_full_list
+                    return None
+
+        #print "Moved atom"
+        del new_full_list
+        moved_list = [self.params.atom_species,x,y,z,depo_list[4]]
+
+        return moved_list
+
+    # pick an event from an event store
+    @Timing.timedMethod('selectEvent')
+    def selectEvent(self, events,Time,timeRate=None):
+        # choose event from the cumulative rates of the valid events
+        u = self.rng.random()
+        i, TotalRate = events.select(u)
+        event = events[i]
+        chosenRate = events.rate[i]
+        chosenEvent = event[2]
+        chosenAtom = event[1]
+        chosenBarrier = event[3]
+        print "Chosen event:",chosenEvent,"on atom:",chosenAtom
+        print "Rate:", chosenRate
+
+        # increase time (timeRate: total rate when some events can not be chosen)
+        if timeRate is not None:
+            TotalRate = timeRate
+        u = self.rng.random()
+        Time += (np.log(1/u)/TotalRate)*1E15
+
+        print "Number of events to choose from: ", events.numValid()
+        return chosenRate, chosenEvent, chosenAtom, Time, chosenBarrier, i
+
+    # check that chosen move is reasonable
+    def checkMove(self, events, i, full_depo_list):
+        # superbasin events move every atom in a cluster
+        chosenAtom = events[i][1]
+        if isinstance(chosenAtom, tuple):
+            movedAtoms = list(chosenAtom)
+            finalPositions = np.asarray(events[i][2], dtype=np.float64)
+        else:
+            movedAtoms = [chosenAtom]
+            finalPositions = events.finalPos[i:i+1]
+
+        # adatoms above the surface that stay where they are
+        adatoms = np.asarray([atom[1:4] for atom in full_depo_list], dtype=np.float64).reshape(-1, 3)
+        others = adatoms[:,1] > self.initial_surface_height
+        others[movedAtoms] = False
+        adatoms = adatoms[others]
+
+        cell = np.asarray([self.box_x, self.params.maxHeight, self.box_z], dtype=np.float64)
+        for pos in finalPositions:
+            sep = adatoms - pos
+            sep -= cell * np.round(sep / cell)
+            if (np.sqrt(np.einsum('ij,ij->i', sep, sep)) < self.params.checkMoveDist).any():
+                return False
+
+        return True
+
+    # calcuate list of atoms with graph radius of defect
+    @Timing.timedMethod('findVolumeAtoms')
+    def findVolumeAtoms(self, lattice_pos,x,y,z):
+        volume_atoms = []
+        countBonds = 0
+
+        for i in xrange(len(lattice_pos)/3):
+            # find distance squared between 2 atoms
+            dist = self.PBCdistance(lattice_pos[3*i],lattice_pos[3*i+1],lattice_pos[3*i+2],x,y,z)
+            if dist < self.params.graphRad:
+                volume_atoms.append(i)
+                if dist < self.params.bondDist:
+                    countBonds += 1
+        if countBonds > self.params.maxCoordNum:
+            return volume_atoms, True
+        else:
+            return volume_atoms, False
+
+    # group neighbouring adatoms into small clusters for the superbasin method
+    def findBasinClusters(self, full_depo_index):
+        clusterOf = {}
+        rad2 = self.params.superBasinRad * self.params.superBasinRad
+        for j in xrange(len(full_depo_index)):
+            if j in clusterOf or not self.coordination.isActive(j):
+                continue
+            cluster = [j]
+            pos = full_depo_index[j]
+            for k in xrange(j+1, len(full_depo_index)):
+                if len(cluster) >= self.params.superBasinMaxAtoms:
+                    break
+                if k in clusterOf or not self.coordination.isActive(k):
+                    continue
+                nb = full_depo_index[k]
+
+                # minimum image separation in x and z
+                dx = abs(nb[1] - pos[1]) % self.box_x
+                dx = min(dx, self.box_x - dx)
+                dy = nb[2] - pos[2]
+                dz = abs(nb[3] - pos[3]) % self.box_z
+                dz = min(dz, self.box_z - dz)
+                if dx*dx + dy*dy + dz*dz < rad2:
+                    cluster.append(k)
+
+            if len(cluster) > 1:
+                cluster = tuple(cluster)
+                for k in cluster:
+                    clusterOf[k] = cluster
+        return clusterOf
+
+    # calculate hashkey for a defect
+    @Timing.timedMethod('hashkey')
+    def hashkey(self, lattice_positions,specie_list,volumeAtoms):
+        # set up parameters for hashkey calculation
+
+        #lattice.pos = np.asarray(lattice_positions,dtype=np.float64)
+        Lattice1 = lattice([self.box_x,0,0,0,self.box_y,0,0,0,self.box_z])
+        Lattice1.pos = []
+        species = []
+        for i in volumeAtoms:
+            Lattice1.pos.append(lattice_positions[3*i])
+            Lattice1.pos.append(lattice_positions[3*i+1])
+            Lattice1.pos.append(lattice_positions[3*i+2])
+            species.append(specie_list[i])
+        Lattice1.pos = np.asarray(Lattice1.pos,dtype=np.float64)
+
+        for i in xrange(len(species)):
+            if species[i] == 'O_':
+                species[i] = 0
+            elif species[i] == 'Zn':
+                species[i] = 1
+            elif species[i] == 'Ag':
+                species[i] = 2
+
+        for i in xrange(len(specie_list)):
+            if specie_list[i] == 'O_':
+                specie_list[i] = 0
+            elif specie_list[i] == 'Zn':
+                specie_list[i] = 1
+            elif specie_list[i] == 'Ag':
+                specie_list[i] = 2
+            # else:
+            #     specie_list[i] = 3
+
+        # set lattice object values for hashkey
+        Lattice1.specie = np.asarray(species,np.int32)
+        Lattice1.cellDims = np.asarray([self.box_x,0,0,0,self.params.maxHeight,0,0,0,self.box_z],dtype=np.float64)
+        Lattice1.specieList = np.asarray(['O_','Zn','Ag'],dtype=np.character)
+        Lattice1.pos = np.around(Lattice1.pos,decimals = 5)
+
+        volumeAtoms = np.arange(len(volumeAtoms),dtype=np.int32)
+
+        self.LKMCParams.graphRadius = self.params.graphRad
+
+        # get hashkey
+        hashkey = Graphs.getHashKeyForAVolume(self.LKMCParams,volumeAtoms,Lattice1)
+
+        del Lattice1
+        return hashkey
+
+    # save defect volume to compare against
+    # - stores lattice + volume atom indices
+    def SaveVolume(self, hashkey,volumeAtoms,lattice_positions,specie_list):
+        VolumeFile = self.Volumes_dir + '/'+str(hashkey)+'.txt'
+
+        # check if file already exist for hashkey
+        if (os.path.isfile(VolumeFile)):
+            return
+
+        else:
+            outfile = open(VolumeFile, 'w')
+            outfile.write(str(len(specie_list))+'\n')
+            for i in xrange(len(specie_list)):
+                outfile.write(str(specie_list[i]) + '   ' + str(lattice_positions[3*i])+ '    '+str(lattice_positions[3*i+1])+ '   '+ str(lattice_positions[3*i+2])+'\n')
+            # print "length of volume atoms is", len(volumeAtoms)
+            for j in xrange(len(volumeAtoms)):
+                outfile.write(str(volumeAtoms[j]) +'\n')
+            outfile.close()
+            return
+
+    # find the final hashkey for a given defect and transition
+    @Timing.timedMethod('findFinal')
+    def findFinal(self, dir_vector,atom_index,full_depo_index,surface_positions):
+        adatom_positions = []
+        adatom_specie = []
+        full_depo = copy.deepcopy(full_depo_index)
+        depo_list = full_depo[atom_index]
+
+        # move atom to final position
+        moved_list = self.moveAtom(depo_list, dir_vector ,full_depo)
+
+        if moved_list:
+            full_depo[atom_index] = moved_list
+            depo_list = full_depo[atom_index]
+
+            for i in xrange(len(full_depo)):
+                adatom_specie.append(full_depo[i][0])
+                adatom_positions.append(full_depo[i][1])
+                adatom_positions.append(full_depo[i][2])
+                adatom_positions.append(full_depo[i][3])
+            lattice_positions = surface_positions + adatom_positions
+            specie_list = self.surface_specie + adatom_specie
+
+            # find atoms in defect volume
+            volumeAtoms, _ = self.findVolumeAtoms(lattice_positions,depo_list[1],depo_list[2],depo_list[3])
+
+            # create hashkey
+            final_key = self.hashkey(lattice_positions,specie_list,volumeAtoms)
+
+            #writeLattice(1000,full_depo_index,surface_lattice,401,0,0)
+            del full_depo
+            return final_key, [float(depo_list[1]),float(depo_list[2]),float(depo_list[3])]
+        else:
+            return None, None
+
+    # findFinal with the fast mode lookup of hops already done in the same
+    # environment. The final position only depends on the hop
+    def findFinalFast(self, dir_vector,atom_index,full_depo_index,sig):
+        if sig is None:
+            return self.findFinal(dir_vector,atom_index,full_depo_index,self.surface_positions)
+
+        hop = (sig, tuple(dir_vector))
+        found, final_key = self.environment.lookup(self.environment.finals, hop)
+        if found:
+            self.timers.count('finalHit')
+            if final_key is None:
+                return None, None
+            depo_list = full_depo_index[atom_index]
+            x = round(PBCpos(depo_list[1]+dir_vector[0]*self.params.x_grid_dist,self.box_x),6)
+            y = round(depo_list[2]+dir_vector[1]*self.params.y_grid_dist2,6)
+            z = round(PBCpos(depo_list[3]+dir_vector[2]*self.params.z_grid_dist,self.box_z),6)
+            return final_key, [float(x),float(y),float(z)]
+
+        self.timers.count('finalMiss')
+        final_key, final_pos = self.findFinal(dir_vector,atom_index,full_depo_index,self.surface_positions)
+        if self.environment.store(self.environment.finals, hop, final_key):
+            self.timers.count('environmentConflict')
+        return final_key, final_pos
+
+    # environment signature of an adatom in the current lattice
+    def adatomSignature(self, atom_index):
+        lattice_positions = list(self.surface_positions)
+        specie_list = self.surface_specie + [atom[0] for atom in self.full_depo_list]
+        for atom in self.full_depo_list:
+            lattice_positions.extend([atom[1],atom[2],atom[3]])
+        self.environment.build(lattice_positions, specie_list)
+        atom = self.full_depo_list[atom_index]
+        return self.environment.signature(atom[1],atom[2],atom[3])
+
+    # distances in the x,z plane (with PBC) from a point to the given adatoms
+    def planeDistances(self, adatoms, pos, index):
+        sep = adatoms[index] - pos
+        sep[:,0] -= self.box_x * np.round(sep[:,0] / self.box_x)
+        sep[:,2] -= self.box_z * np.round(sep[:,2] / self.box_z)
+        return np.sqrt(sep[:,0]**2 + sep[:,2]**2)
+
+    # adatoms of the island directly below an adatom (empty if it is not on an island)
+    def islandBelow(self, adatoms, atom_index):
+        pos = adatoms[atom_index]
+        layer = np.where(np.abs(adatoms[:,1] - (pos[1] - self.params.y_grid_dist2)) < 0.1)[0]
+        if not len(layer):
+            return []
+        island = set(layer[self.planeDistances(adatoms, pos, layer) < self.params.bondDist])
+        queue = list(island)
+        while queue:
+            k = queue.pop()
+            for n in layer[self.planeDistances(adatoms, adatoms[k], layer) < self.params.bondDist]:
+                if n not in island:
+                    island.add(n)
+                    queue.append(n)
+        return sorted(island)
+
+    # escape rate of an adatom alone on top of an island in the island table (None otherwise)
+    def islandEscapeRate(self, adatoms, atom_index):
+        island = self.islandBelow(adatoms, atom_index)
+        if not island:
+            return None
+        rate = self.islandTable.rate(len(island))
+        if rate is None:
+            return None
+
+        # no other adatoms on top of the island
+        top = np.where(np.abs(adatoms[:,1] - adatoms[atom_index][1]) < 0.1)[0]
+        top = top[top != atom_index]
+        if len(top):
+            for i in island:
+                if np.any(self.planeDistances(adatoms, adatoms[i], top) < self.params.bondDist):
+                    return None
+        return rate
+
+    # species of the top surface atom of the grid column of a point (None if there is none)
+    def surfaceColumnSpecie(self, x, z):
+        nx = int(round(self.box_x / self.params.x_grid_dist))
+        nz = int(round(self.box_z / self.params.z_grid_dist))
+        if self.surfaceColumns is None:
+            self.surfaceColumns = {}
+            for atom in self.surface_lattice:
+                col = (int(round(atom[1] / self.params.x_grid_dist)) % nx, int(round(atom[3] / self.params.z_grid_dist)) % nz)
+                if col not in self.surfaceColumns or atom[2] > self.surfaceColumns[col][0]:
+                    self.surfaceColumns[col] = (atom[2], atom[0])
+        col = (int(round(x / self.params.x_grid_dist)) % nx, int(round(z / self.params.z_grid_dist)) % nz)
+        return self.surfaceColumns.get(col, (None, None))[1]
+
+    # grid position one hop away (the position moveAtom moves to)
+    def gridStep(self, site, hop):
+        x = round(PBCpos(site[0]+hop[0]*self.params.x_grid_dist,self.box_x),6)
+        y = round(site[1]+hop[1]*self.params.y_grid_dist2,6)
+        z = round(PBCpos(site[2]+hop[2]*self.params.z_grid_dist,self.box_z),6)
+        return (x, y, z)
+
+    # key of the island escape walk of an adatom: the adatoms that can take part in
+    # the walk and the surface column species under it, relative to the adatom
+    def islandEscapeKey(self, atom_index):
+        adatoms = np.asarray([[atom[1],atom[2],atom[3]] for atom in self.full_depo_list], dtype=np.float64)
+        pos = adatoms[atom_index]
+        island = np.asarray(self.islandBelow(adatoms, atom_index), dtype=np.int64)
+        radius = Environment.maxHopDistance(self.params) + self.params.graphRad
+        if len(island):
+            radius += self.planeDistances(adatoms, pos, island).max()
+
+        sep = adatoms - pos
+        sep[:,0] -= self.box_x * np.round(sep[:,0] / self.box_x)
+        sep[:,2] -= self.box_z * np.round(sep[:,2] / self.box_z)
+        near = np.sqrt(sep[:,0]**2 + sep[:,2]**2) < radius
+        grid = np.asarray([self.params.x_grid_dist, 0.01, self.params.z_grid_dist], dtype=np.float64)
+        cells = tuple(sorted(map(tuple, np.round(sep[near] / grid).astype(np.int64))))
+
+        self.surfaceColumnSpecie(pos[0], pos[2])
+        nx = int(round(self.box_x / self.params.x_grid_dist))
+        nz = int(round(self.box_z / self.params.z_grid_dist))
+        cx = int(round(pos[0] / self.params.x_grid_dist))
+        cz = int(round(pos[2] / self.params.z_grid_dist))
+        ni = int(radius / self.params.x_grid_dist) + 1
+        nj = int(radius / self.params.z_grid_dist) + 1
+        columns = tuple([self.surfaceColumns.get(((cx+i)%nx, (cz+j)%nz), (None, None))[1] for i in xrange(-ni, ni+1) for j in xrange(-nj, nj+1)])
+        return cells, columns
+
+    # walk of an adatom over the sites on top of its island: the in plane hops from
+    # the adatom to each site, the down steps from each site and the cumulative
+    # probability of leaving from each site (None if it can not leave)
+    def islandWalk(self, depo_list):
+        inPlane = [hop for hop in Environment.hopVectors if hop[1] == 0]
+        down = [hop for hop in Environment.hopVectors if hop[1] < 0]
+
+        start = (depo_list[1], depo_list[2], depo_list[3])
+        sites = [start]
+        siteIndex = {start: 0}
+        paths = [[]]
+        neighbours = []
+        exits = []
+        k = 0
+        while k < len(sites):
+            site = sites[k]
+            site_list = [depo_list[0], site[0], site[1], site[2], depo_list[4]]
+            steps = []
+            for hop in down:
+                if self.moveAtom(site_list, hop, self.full_depo_list):
+                    steps.append(hop)
+            exits.append(steps)
+            near = []
+            for hop in inPlane:
+                moved_list = self.moveAtom(site_list, hop, self.full_depo_list)
+                if moved_list:
+                    nextSite = (moved_list[1], moved_list[2], moved_list[3])
+                    if nextSite not in siteIndex:
+                        siteIndex[nextSite] = len(sites)
+                        sites.append(nextSite)
+                        paths.append(paths[k] + [hop])
+                    near.append(siteIndex[nextSite])
+            neighbours.append(near)
+            k += 1
+
+        isType1 = np.asarray([self.surfaceColumnSpecie(site[0], site[2]) == 'O_' for site in sites])
+        hopRate = np.where(isType1, self.islandTable.hopRates[0], self.islandTable.hopRates[1])
+        escape = np.where(isType1, self.islandTable.escapeRates[0], self.islandTable.escapeRates[1])
+        escape = np.where([len(steps) > 0 for steps in exits], escape, 0.0)
+        if not np.any(escape > 0):
+            return None
+        leave = IslandTable.exitDistribution(neighbours, hopRate, escape)
+        if leave is None:
+            return None
+        return paths, exits, np.cumsum(leave)
+
+    # final position of an island escape. The adatom walks over the sites on top of
+    # the island by in plane hops and leaves by a down step from a boundary site.
+    # Sites over surface O_ are type1 and the others type2 (as in Scripts/mean.py),
+    # with the hop and escape rates of the island table. The boundary site is
+    # picked with the probability the walk from the adatom leaves from it
+    # (expected visits times the escape probability per visit) and the down
+    # step from it uniformly. Walks are kept in the island table by the local
+    # environment of the adatom, so the sites are only found once per island shape
+    @Timing.timedMethod('islandEscapeTarget')
+    def islandEscapeTarget(self, atom_index):
+        depo_list = self.full_depo_list[atom_index]
+        key = self.islandEscapeKey(atom_index)
+        try:
+            walk = self.islandTable.walks[key]
+            self.timers.count('islandWalkHit')
+        except KeyError:
+            walk = self.islandWalk(depo_list)
+            self.islandTable.walks[key] = walk
+            self.timers.count('islandWalkMiss')
+        if walk is None:
+            return None
+
+        paths, exits, cumulative = walk
+        i = int(np.searchsorted(cumulative, self.rng.random() * cumulative[-1], side='right'))
+        leave = np.diff(np.concatenate(([0.0], cumulative)))
+        if i >= len(cumulative) or not leave[i] > 0:
+            i = int(np.nonzero(leave > 0)[0][-1])
+
+        # in plane hops from the adatom to the boundary site, then the down steps
+        site = (depo_list[1], depo_list[2], depo_list[3])
+        for hop in paths[i]:
+            site = self.gridStep(site, hop)
+        targets = sorted([self.gridStep(site, hop) for hop in exits[i]])
+        return list(self.rng.choice(targets))
+
+    # surrogate features of a hop: in plane adatom neighbours before and after and up/down step
+    def hopFeatures(self, full_depo_index, atom_index, final_pos):
+        adatoms = np.asarray([[atom[1],atom[2],atom[3]] for atom in full_depo_index], dtype=np.float64)
+        iniPos = adatoms[atom_index]
+        counts = []
+        for pos in (iniPos, np.asarray(final_pos, dtype=np.float64)):
+            sep = adatoms - pos
+            sep[:,0] -= self.box_x * np.round(sep[:,0] / self.box_x)
+            sep[:,2] -= self.box_z * np.round(sep[:,2] / self.box_z)
+            inPlane = (np.einsum('ij,ij->i', sep, sep) < self.params.bondDist**2) & (np.abs(sep[:,1]) < 0.1)
+            inPlane[atom_index] = False
+            counts.append(int(np.count_nonzero(inPlane)))
+        step = 1 if abs(final_pos[1] - iniPos[1]) > 0.1 else 0
+        return [1.0, counts[0], counts[1], step]
+
+    # hops with a negligible estimated rate compared to the last total rate are not searched yet
+    def deferHop(self, features):
+        if self.surrogate is None:
+            return False
+        rate = self.calcRate(self.surrogate.estimate(features))
+        if rate < self.params.surrogateRateFrac * self.lastTotalRate:
+            self.timers.count('nebDeferred')
+            return True
+        return False
+
+    # create the list of possible events
+    @Timing.timedMethod('createEventsList')
+    def createEventsList(self, full_depo_index,surface_lattice, volumes, failedCount=0):
+
+        event_list = []
+        adatom_positions = []
+        adatom_specie = []
+        initialMinimised = False
+        self.pendingMet = []
+
+        # move to global parameters
+        trans_dir = self.initial_dir + '/Transitions/'
+
+        # add transitions found by other runs
+        if self.catalog is not None:
+            self.catalog.sync(volumes)
+
+        # coordination of adatoms that moved and their neighbours
+        self.coordination.sync(self.full_depo_list)
+
+        # add all deposited atoms to list of positions + species
+        for i in xrange(len(self.full_depo_list)):
+            adatom_specie.append(self.full_depo_list[i][0])
+            adatom_positions.append(self.full_depo_list[i][1])
+            adatom_positions.append(self.full_depo_list[i][2])
+            adatom_positions.append(self.full_depo_list[i][3])
+        lattice_positions = self.surface_positions + adatom_positions
+        specie_list = self.surface_specie + adatom_specie
+
+        # in fast mode volumes and hops are looked up by local environment
+        env = None
+        if self.environment is not None and failedCount == 0:
+            env = self.environment
+            env.build(lattice_positions, specie_list)
+
+        # group neighbouring adatoms into superbasin clusters. Volumes of cluster
+        # members are found first as their combined hashkey identifies the state
+        clusterOf = {}
+        clusterVolumes = {}
+        superBasins = []
+        restarted = False
+        if self.params.useBasin and self.params.useSuperBasin:
+            clusterOf = self.findBasinClusters(self.full_depo_list)
+            for j in clusterOf:
+                depo_list = self.full_depo_list[j]
+                volumeAtoms, fullyCoord = self.findVolumeAtoms(lattice_positions,depo_list[1],depo_list[2],depo_list[3])
+                vol_key = None
+                if not fullyCoord:
+                    vol_key = self.hashkey(lattice_positions,specie_list,volumeAtoms)
+                clusterVolumes[j] = [volumeAtoms, fullyCoord, vol_key]
+
+        adatoms = None
+        if self.islandTable is not None:
+            adatoms = np.asarray([[atom[1],atom[2],atom[3]] for atom in self.full_depo_list], dtype=np.float64)
+
+        # find transitions for each adatom
+        for j in xrange(len(self.full_depo_list)):
+
+            if not self.coordination.isActive(j):
+                continue
+
+            # an adatom alone on top of a tabulated island gets one coarse grained escape event
+            if self.islandTable is not None and j not in clusterOf:
+                escapeRate = self.islandEscapeRate(adatoms, j)
+                if escapeRate is not None:
+                    self.timers.count('islandEscape')
+                    event_list.append([escapeRate,j,['Island'],self.findBarrierHeight(escapeRate)])
+                    continue
+
+            final_keys = []
+            directions = []
+            depo_list = self.full_depo_list[j]
+            hashkeyExists = []
+
+            sig = None
+            envVolume = None
+            if env is not None:
+                sig = env.signature(depo_list[1],depo_list[2],depo_list[3])
+                found, envVolume = env.lookup(env.volumes, sig)
+
+            # find atoms in volume
+            if j in clusterVolumes:
+                volumeAtoms, fullyCoord, vol_key = clusterVolumes[j]
+            elif envVolume is not None:
+                self.timers.count('environmentHit')
+                volumeAtoms = None
+                fullyCoord, vol_key = envVolume
+            else:
+                volumeAtoms, fullyCoord = self.findVolumeAtoms(lattice_positions,depo_list[1],depo_list[2],depo_list[3])
+                vol_key = None
+
+            if fullyCoord:
+                if sig is not None and envVolume is None:
+                    if env.store(env.volumes, sig, (True, None)):
+                        self.timers.count('environmentConflict')
+                continue
+
+            # create hashkey for each adatom + store volume
+            if vol_key is None:
+                vol_key = self.hashkey(lattice_positions,specie_list,volumeAtoms)
+            if sig is not None and envVolume is None:
+                self.timers.count('environmentMiss')
+                if env.store(env.volumes, sig, (False, vol_key)):
+                    self.timers.count('environmentConflict')
+            # print vol_key
+            try:
+                vol = volumes[vol_key]
+            except KeyError:
+                volumes[vol_key] = volume()
+                vol = volumes[vol_key]
+            if len(vol.directions) != 0:
+                self.timers.count('volumeHit')
+            else:
+                self.timers.count('volumeMiss')
+
+            if self.params.useBasin and j in clusterOf:
+                # transitions of cluster members are added to their superbasin
+                iniPos = [depo_list[1],depo_list[2],depo_list[3]]
+                sbas = self.findSuperBasin(clusterOf[j], clusterVolumes, superBasins)
+                bas = superBasinMember(sbas, j)
+                keepBasin = sbas.keep
+
+            elif self.params.useBasin:
+                basinExists = False
+                iniPos = [depo_list[1],depo_list[2],depo_list[3]]
+                # check if a basin exists for this state
+                for whichB in range(len(self.basinList)):
+                    basId = self.basinList[whichB]
+                    if basId.atomNum == j:
+                        if basId.thisBasin(iniPos,self.CurrentStep):
+                            bas = basId
+                            bas.currentPos = iniPos
+                            basinExists = True
+                            keepBasin = True
+                            break
+
+                if not basinExists:
+                    bas = basin(self)
+                    bas.atomNum = j
+                    bas.currentPos = iniPos
+                    self.basinList.append(bas)
+                    whichB = len(self.basinList)-1
+                    keepBasin = False
+
+            # volume is being searched in the background
+            pending = self.asyncNEB is not None and vol_key in self.asyncNEB.pending
+
+            # wait for volumes another run is already searching
+            if len(vol.directions) == 0 and self.catalog is not None and not pending:
+                if not self.catalog.claim(vol_key, volumes):
+                    self.timers.count('catalogShared')
+
+            if len(vol.directions) != 0:
+                vol = volumes[vol_key]
+                # vol.hashkey = vol_key
+                #print "Finding trans for atom ", j, vol_key
+                for direc in vol.directions:
+                    final_key, final_pos = self.findFinalFast(direc,j,full_depo_index,sig)
+                    if final_key is not None:
+                        try:
+                            trans = vol.finalKeys[final_key]
+                            self.timers.count('transitionHit')
+                            if self.params.useBasin:
+                                if trans.barrier is not None and trans.barrier != 'None':
+                                    bas.addTransition(iniPos,final_pos,trans.rate,trans.barrier,trans.reverseBarrier)
+                                    if trans.barrier < self.params.basinBarrierTol or trans.reverseBarrier < self.params.basinBarrierTol:
+                                        keepBasin = True
+                            else:
+                                trans.hashkey = final_key
+                                event_list.append([trans.rate,j,final_pos,trans.barrier,trans.reverseBarrier])
+                        except KeyError:
+                            self.timers.count('transitionMiss')
+                            features = None
+                            if self.surrogate is not None:
+                                features = self.hopFeatures(full_depo_index, j, final_pos)
+                                if self.deferHop(features):
+                                    continue
+                            result, vol = self.singleNEB(direc,full_depo_index,surface_lattice,j,vol_key,final_key,self.natoms,vol,initialMinimised,features)
+                            if self.catalog is not None:
+                                self.catalog.publish(vol_key, vol)
+                            if result == 1:
+                                if failedCount == 0:
+                                    # attempt to reset to lattice
+                                    print "Attempting to reset to lattice positions post minimisation. Restarting create events list."
+                                    new_full_depo = readLattice(self.NEB_dir_name_prefac+"/Reset.dat",len(surface_lattice)+2)
+                                    print new_full_depo[0]
+                                    newfulldepo = self.setToLattice(new_full_depo)
+                                    full_depo_index = []
+                                    for q in range(len(newfulldepo)):
+                                        nfp = newfulldepo[q]
+                                        full_depo_index.append([nfp[0],nfp[1],nfp[2],nfp[3],len(surface_lattice)+q])
+                                    print full_depo_index[0]
+                                    event_list, volumes, full_depo_index = self.createEventsList(full_depo_index, surface_lattice, volumes, failedCount=1)
+                                    restarted = True
+                                    break
+                                else:
+                                    sys.exit()
+                            if result:
+                                if result[2] != "None":
+                                    rate = self.calcRate(float(result[2]))
+                                    if self.params.useBasin:
+                                        bas.addTransition(iniPos,final_pos,rate,float(result[2]),vol.finalKeys[final_key].reverseBarrier)
+                                        if float(result[2]) < self.params.basinBarrierTol or vol.finalKeys[final_key].reverseBarrier < self.params.basinBarrierTol:
+                                            keepBasin = True
+                                    else:
+                                        event_list.append([rate,j,final_pos,float(result[2]),vol.finalKeys[final_key].reverseBarrier])
+
+
+            elif self.asyncNEB is not None and failedCount == 0 and vol_key not in self.asyncFailed:
+                # search in the background and carry on with the known events
+                if not pending:
+                    print "Cannot find volume transitions. Searching in the background ", vol_key
+                    self.submitSearch(full_depo_index, surface_lattice, j, vol_key)
+                self.pendingMet.append(vol_key)
+
+            else:
+                print "Cannot find volume transitions. Doing searches now ", vol_key
+                # do searches on volume and save to new trans file
+                if self.params.useBasin:
+                    status, result, vol, keepBasin, initialMinimised = self.autoNEB(full_depo_index,surface_lattice,j,vol_key,self.natoms,vol,bas)
+                else:
+                    status, result, vol, _, initialMinimised = self.autoNEB(full_depo_index,surface_lattice,j,vol_key,self.natoms,vol,None)
+                if self.catalog is not None:
+                    self.catalog.publish(vol_key, vol)
+                    self.catalog.release(vol_key)
+                if status:
+                    if failedCount == 0:
+                        # attempt to reset to lattice
+                        print "Attempting to reset to lattice positions post minimisation. Restarting create events list."
+                        new_full_depo = readLattice(self.NEB_dir_name_prefac+"/Reset.dat",len(surface_lattice)+2)
+                        newfulldepo = self.setToLattice(new_full_depo)
+                        full_depo_index = []
+                        for q in range(len(newfulldepo)):
+                            nfp = newfulldepo[q]
+                            full_depo_index.append([nfp[0],nfp[1],nfp[2],nfp[3],len(surface_lattice)+q])
+                        print full_depo_index[0]
+                        event_list, volumes, full_depo_index = self.createEventsList(full_depo_index, surface_lattice, volumes, failedCount=1)
+                        restarted = True
+                        break
+                    else:
+                        sys.exit()
+                else:
+                    event_list = event_list + result
+                    volumes[vol_key] = vol
+
+
+            del volumeAtoms
+
+            # add basin events to events list
+            if self.params.useBasin:
+                if j in clusterOf:
+                    # superbasin events are added once all cluster members are done
+                    bas.sbas.keep = bas.sbas.keep or keepBasin
+                else:
+                    events = self.basinEvents(bas, j, keepBasin)
+                    event_list = event_list + events
+
+        # add superbasin events to events list
+        if not restarted:
+            for sbas in superBasins:
+                sbas.markCurrent()
+                events = self.basinEvents(sbas, sbas.atoms, sbas.keep)
+                event_list = event_list + events
+
+        del initialMinimised
+        del lattice_positions
+        del adatom_positions
+
+        return event_list, volumes, full_depo_index
+
+    # create events for a basin and remove basins that are no longer needed
+    def basinEvents(self, bas, atomNum, keepBasin):
+        if not keepBasin:
+            events = bas.addUnchangedEvents(atomNum)
+            if bas in self.basinList:
+                self.basinList.remove(bas)
+        else:
+            basinGood = bas.buildConnectivity()
+            if basinGood:
+                events, keepBasin = bas.addChangedEvents(atomNum)
+
+                # remove small basins
+                if len(bas.basinPos) < 2 or not keepBasin:
+                    self.basinList.remove(bas)
+            else:
+                events = bas.addUnchangedEvents(atomNum)
+                self.basinList.remove(bas)
+        return events
+
+    # find the superbasin for a cluster of adatoms or create a new one
+    def findSuperBasin(self, atoms, clusterVolumes, superBasins):
+        for sbas in superBasins:
+            if sbas.atoms == atoms:
+                return sbas
+
+        config = tuple([[self.full_depo_list[a][1],self.full_depo_list[a][2],self.full_depo_list[a][3]] for a in atoms])
+        combinedKey = '_'.join([str(clusterVolumes[a][2]) for a in atoms])
+
+        # check if a superbasin exists for this configuration
+        for sbas in self.basinList:
+            if sbas.atomNum == atoms:
+                if sbas.thisBasin(config,self.CurrentStep,combinedKey):
+                    sbas.keep = True
+                    break
+        else:
+            sbas = superBasin(self, atoms)
+            self.basinList.append(sbas)
+
+        sbas.currentPos = config
+        sbas.currentKey = combinedKey
+        superBasins.append(sbas)
+        return sbas
+
+    # minimise a lattice
+    @Timing.timedMethod('minimise')
+    def minimiseLattice(self, lattice):
+        minimiser = Minimise.getMinimiser(self.LKMCParams)
+        return minimiser.run(lattice)
+
+    # minimised copy of a lattice. If the same lattice was minimised before
+    # the relaxed positions and energy are taken from the state cache.
+    # correctTE: calculate the forces with correctTE before minimising
+    def minimiseCached(self, lattice, correctTE=0):
+        latMin = copy.deepcopy(lattice)
+        if self.stateCache is None:
+            if correctTE:
+                latMin.calcForce(correctTE=1)
+            return latMin, self.minimiseLattice(latMin)
+
+        stateKey = StateCache.fingerprint(lattice)
+        state = self.stateCache.get(stateKey)
+        if state is not None:
+            self.timers.count('stateCacheHit')
+            latMin.pos[:] = state[0]
+            latMin.totalEnergy = state[1]
+            return latMin, 0
+
+        self.timers.count('stateCacheMiss')
+        if correctTE:
+            latMin.calcForce(correctTE=1)
+        status = self.minimiseLattice(latMin)
+        if not status:
+            self.stateCache.add(stateKey, latMin)
+        return latMin, status
+
+    # distance of every atom (surface then adatoms) from a point with PBC in x and z
+    def distancesFrom(self, centre):
+        if self.surfaceArray is None:
+            self.surfaceArray = np.asarray(self.surface_positions, dtype=np.float64).reshape(-1, 3)
+        adatoms = np.asarray([[atom[1],atom[2],atom[3]] for atom in self.full_depo_list], dtype=np.float64).reshape(-1, 3)
+        sep = np.vstack((self.surfaceArray, adatoms)) - np.asarray(centre, dtype=np.float64)
+        sep[:,0] -= self.box_x * np.round(sep[:,0] / self.box_x)
+        sep[:,2] -= self.box_z * np.round(sep[:,2] / self.box_z)
+        return np.sqrt(np.einsum('ij,ij->i', sep, sep))
+
+    # write the atoms with the given indices (surface then adatoms) to a lattice file
+    def writeRegionLattice(self, index, region):
+        numSurface = len(self.surface_lattice)
+        outfile = open(self.NEB_dir_name_prefac + str(index) + '.dat', 'w')
+        outfile.write(str(len(region)) + '\n')
+        outfile.write(str(self.box_x)+'  '+str(30)+'  '+str(self.box_z)+'  ' + '\n')
+        for i in region:
+            if i < numSurface:
+                atom = self.surface_lattice[i]
+                outfile.write(str(atom[0]) + '   ' + str(atom[1])+ '    '+str(atom[2])+ '   '+ str(atom[3])+'  '+str(atom[4])+'\n')
+            else:
+                atom = self.full_depo_list[i-numSurface]
+                outfile.write(str(self.params.atom_species) + '\t' + str(atom[1]) + '   ' + str(atom[2])+ '    '+ str(atom[3]) + '   ' +  '0' + '\n')
+        outfile.close()
+
+    # minimise only the region around a new deposit instead of the whole system.
+    # Atoms within relaxRadius are relaxed and checked for movement, the shell of
+    # relaxShell around them is held fixed at its positions in the full system
+    # so the cut faces of the region can not relax and drag the inner atoms.
+    # Returns the minimiser status and the max movement of the inner atoms
+    def relaxRegion(self, *centres):
+        dist = np.min([self.distancesFrom(centre) for centre in centres], axis=0)
+        region = np.where(dist < self.params.relaxRadius + self.params.relaxShell)[0]
+        inner = dist[region] < self.params.relaxRadius
+        self.timers.count('relaxRegionAtoms', len(region))
+
+        self.writeRegionLattice('/region', region)
+        ini = Lattice.readLattice(self.NEB_dir_name_prefac+"/region.dat")
+        iniMin = freezeAtoms(copy.deepcopy(ini), np.where(~inner)[0])
+        status = self.minimiseLattice(iniMin)
+        if status:
+            return status, None
+        # shell back in place (in case the last minimiser step moved it)
+        iniMin.calcForce(correctTE=1)
+
+        sep = (np.asarray(iniMin.pos, dtype=np.float64) - np.asarray(ini.pos, dtype=np.float64)).reshape(-1, 3)
+        sep[:,0] -= self.box_x * np.round(sep[:,0] / self.box_x)
+        sep[:,2] -= self.box_z * np.round(sep[:,2] / self.box_z)
+        moves = np.sqrt(np.einsum('ij,ij->i', sep, sep))[inner]
+        maxMove = float(moves.max()) if len(moves) else 0.0
+        return status, maxMove
+
+    # run NEB between initial and final lattices
+    @Timing.timedMethod('NEB')
+    def runNEB(self, ini, fin):
+        if self.params.nebClusterRadius > 0 and not self.clusterNEBOff:
+            return self.runClusterNEB(ini, fin)
+        neb = NEB.NEB(self.LKMCParams)
+        status = neb.run(ini, fin)
+        neb.iniEnergy = ini.totalEnergy
+        neb.finEnergy = fin.totalEnergy
+        return neb, status
+
+    # cut the atoms with the given indices out of a lattice (through a lattice file)
+    def cutLattice(self, lattice, region, name):
+        path = self.NEB_dir_name_prefac + '/' + name + '.dat'
+        lattice.writeLattice(path)
+        infile = open(path, 'r')
+        lines = infile.readlines()
+        infile.close()
+        outfile = open(path, 'w')
+        outfile.write(str(len(region)) + '\n')
+        outfile.write(lines[1])
+        for i in region:
+            outfile.write(lines[i+2])
+        outfile.close()
+        return Lattice.readLattice(path)
+
+    # NEB on a cluster cut out around the hopping atom: atoms within
+    # nebClusterRadius of its initial or final position are free, the shell
+    # of nebClusterShell around them is a frozen boundary held at its
+    # positions in the initial state (in both endpoints, the minimiser and
+    # every NEB image). The endpoints are the minimised clusters and the band
+    # energies (iniEnergy, finEnergy) are theirs. The barrier is checked
+    # against a full system NEB every nebClusterCheckEvery cluster NEBs (from
+    # the first) and full system NEBs are used for the rest of the run once
+    # the error is above nebClusterTol
+    def runClusterNEB(self, ini, fin):
+        startTime = time.time()
+        iniPos = np.asarray(ini.pos, dtype=np.float64).reshape(-1, 3)
+        finPos = np.asarray(fin.pos, dtype=np.float64).reshape(-1, 3)
+
+        # hopping atom moves furthest
+        sep = finPos - iniPos
+        sep[:,0] -= self.box_x * np.round(sep[:,0] / self.box_x)
+        sep[:,2] -= self.box_z * np.round(sep[:,2] / self.box_z)
+        hop = int(np.argmax(np.einsum('ij,ij->i', sep, sep)))
+
+        dist = None
+        for pos in (iniPos, finPos):
+            sep = pos - pos[hop]
+            sep[:,0] -= self.box_x * np.round(sep[:,0] / self.box_x)
+            sep[:,2] -= self.box_z * np.round(sep[:,2] / self.box_z)
+            d = np.sqrt(np.einsum('ij,ij->i', sep, sep))
+            dist = d if dist is None else np.minimum(dist, d)
+        region = np.where(dist < self.params.nebClusterRadius + self.params.nebClusterShell)[0]
+        shell = np.where(dist[region] >= self.params.nebClusterRadius)[0]
+        shellPos = iniPos[region][shell]
+        self.timers.count('clusterNEBAtoms', len(region))
+
+        neb = NEB.NEB(self.LKMCParams)
+        cluster = []
+        for lattice, name in ((ini, 'clusterIni'), (fin, 'clusterFin')):
+            cut = self.cutLattice(lattice, region, name)
+            cutMin = freezeAtoms(copy.deepcopy(cut), shell, shellPos)
+            status = self.minimiseLattice(cutMin)
+            if status:
+                return neb, status
+            # shell back in place (in case the last minimiser step moved it)
+            cutMin.calcForce(correctTE=1)
+            cluster.append(cutMin)
+
+        status = neb.run(cluster[0], cluster[1])
+        neb.iniEnergy = cluster[0].totalEnergy
+        neb.finEnergy = cluster[1].totalEnergy
+        clusterTime = time.time() - startTime
+        self.clusterNEBCount += 1
+
+        # compare with a full system NEB for calibration
+        if not status and self.params.nebClusterCheckEvery and (self.clusterNEBCount - 1) % self.params.nebClusterCheckEvery == 0:
+            startTime = time.time()
+            full = NEB.NEB(self.LKMCParams)
+            fullStatus = full.run(ini, fin)
+            full.iniEnergy = ini.totalEnergy
+            full.finEnergy = fin.totalEnergy
+            fullTime = time.time() - startTime
+            if not fullStatus:
+                error = neb.barrier - full.barrier
+                print "Cluster NEB barrier: ", neb.barrier, " full system: ", full.barrier, " error: ", error
+                if abs(error) > self.params.nebClusterTol:
+                    print "Warning: cluster NEB error above nebClusterTol, using full system NEBs from now on"
+                    self.clusterNEBOff = True
+                if self.params.statsOut:
+                    outfile = open(self.Stats_dir + '/ClusterNEB.txt', 'a')
+                    outfile.write(str(self.CurrentStep)+','+str(len(region))+','+str(len(iniPos))+','+str(neb.barrier)+','+str(full.barrier)+','+str(error)+','+str(clusterTime)+','+str(fullTime)+'\n')
+                    outfile.close()
+                return full, fullStatus
+        return neb, status
+
+    # directions searched for a new volume
+    def hopDirections(self, full_depo_index, atom_index):
+        # check 6 initial directions
+        dir_vector = []
+        dir_vector.append([2,0,0])
+        dir_vector.append([1,0,-1])
+        dir_vector.append([-1,0,-1])
+        dir_vector.append([1,0,1])
+        dir_vector.append([-1,0,1])
+        dir_vector.append([-2,0,0])
+
+        # include down transitions
+        if self.params.includeDownTrans:
+            # if atom if above first layer
+            atom_height = full_depo_index[atom_index][2]
+            if atom_height > (self.initial_surface_height + self.params.y_grid_dist*1.1):
+                print "Adding move down transitions"
+                dir_vector.append([4,-1,0])
+                dir_vector.append([2,-1,-2])
+                dir_vector.append([-2,-1,-2])
+                dir_vector.append([2,-1,2])
+                dir_vector.append([-2,-1,2])
+                dir_vector.append([-4,-1,0])
+
+        # include up transitions
+        if self.params.includeUpTrans:
+            #check if surrounds atom
+            AdNeighbours = 0
+            nb_pos, nb_species = self.findSecondNeighbours(full_depo_index[atom_index][1],full_depo_index[atom_index][3],full_depo_index)
+            for j in xrange(len(nb_pos)):
+                if round(nb_pos[j][1] - atom_height,2) == 0:
+                    if nb_species[j] == self.params.atom_species:
+                        AdNeighbours += 1
+
+            # if 2 or more atoms surround current atom, look at up moves
+            if AdNeighbours > 1:
+                print "Adding move up transitions"
+                dir_vector.append([4,1,0])
+                dir_vector.append([2,1,-2])
+                dir_vector.append([-2,1,-2])
+                dir_vector.append([2,1,2])
+                dir_vector.append([-2,1,2])
+                dir_vector.append([-4,1,0])
+        return dir_vector
+
+    # run NEB to find barriers that are not known
+    def autoNEB(self, full_depo_index,surface_lattice,atom_index,hashkey,natoms,vol,bas):
+        print "AUTO NEB", "="*60
+
+        barrier = []
+        final_keys = []
+        results = []
+
+        keepBasin = False
+
+        # create initial lattice
+        self.writeLatticeLKMC('/initial',full_depo_index,surface_lattice,natoms)
+        ini = Lattice.readLattice(self.NEB_dir_name_prefac+"/initial.dat")
+        iniMin = copy.deepcopy(ini)
+        iniMin.calcForce(correctTE=1)
+        iniMin.writeLattice(self.NEB_dir_name_prefac+"/Reset.dat")
+        # print "ini energy:", iniMin.totalEnergy
+
+        # create cell dimensions
+        cellDims = np.asarray([self.box_x,0,0,0,self.params.maxHeight,0,0,0,self.box_z],dtype=np.float64)
+
+        # minimise lattice
+        iniMin, status = self.minimiseCached(ini)
+        if status:
+            print " Warning: failed to minimise initial lattice"
+            sys.exit()
+
+        # check max movement
+        Index, maxMove, avgMove, Sep = Vectors.maxMovement(ini.pos, iniMin.pos, cellDims)
+
+        if maxMove < self.params.maxMoveCriteria:
+            #ini.writeLattice("initialMin.dat")
+            full_depo = copy.deepcopy(full_depo_index)
+            depo_list = full_depo[atom_index]
+
+            dir_vector = self.hopDirections(full_depo_index, atom_index)
+
+
+            # move atom
+            moved = [self.moveAtom(depo_list, direc, full_depo_index) for direc in dir_vector]
+
+            # search directions with the lowest estimated barriers first
+            order = range(len(dir_vector))
+            features = [None] * len(dir_vector)
+            if self.surrogate is not None:
+                estimates = []
+                for i in order:
+                    if moved[i]:
+                        features[i] = self.hopFeatures(full_depo_index, atom_index, moved[i][1:4])
+                        estimates.append(self.surrogate.estimate(features[i]))
+                    else:
+                        estimates.append(float('inf'))
+                order.sort(key=lambda i: estimates[i])
+
+            deferred = 0
+            for i in order:
+                moved_list = moved[i]
+                print "Trying direction: ", dir_vector[i]
+                vol.addDirection(dir_vector[i])
+
+                if moved_list and features[i] is not None and self.deferHop(features[i]):
+                    print "Deferred, estimated barrier: ", self.surrogate.estimate(features[i])
+                    deferred += 1
+                    continue
+
+                if moved_list:
+                    full_depo[atom_index] = moved_list
+
+                    # create initial lattice and Minimise
+                    self.writeLatticeLKMC('/'+str(i),full_depo,surface_lattice,natoms)
+                    fin = Lattice.readLattice(self.NEB_dir_name_prefac+"/" + str(i) +".dat")
+
+                    # minimise lattice
+                    finMin, status = self.minimiseCached(fin, correctTE=1)
+                    if status:
+                        continue
+
+                    final_key, final_pos = self.findFinal(dir_vector[i],atom_index,full_depo_index,self.surface_positions)
+
+                    # check that initial and final are different
+                    Index, maxMove, avgMove, Sep = Vectors.maxMovement(iniMin.pos, finMin.pos, cellDims)
+                    if maxMove < 0.4:
+                        print " difference between ini and fin is too small:", maxMove
+                        barrier = str("None")
+                        results.append([0,atom_index, final_pos, barrier])
+                        vol.addTrans(dir_vector[i], final_key, barrier, 0, str("None"))
+                        continue
+
+                    # check max movement
+                    Index, maxMove, avgMove, Sep = Vectors.maxMovement(fin.pos, finMin.pos, cellDims)
+                    if maxMove < self.params.maxMoveCriteria:
+                        # run NEB on initial and final lattices
+                        neb, status = self.runNEB(iniMin, finMin)
+
+                        if status:
+                            print "WARNING: NEB failed to converge"
+                            print "Try changing parameters in lkmcInput.IN"
+                            barrier = str("None")
+
+                            results.append([0,atom_index, final_pos, barrier])
+                            vol.addTrans(dir_vector[i], final_key, barrier, str("None"),str("None"))
+                            continue
+
+                        neb.barrier = round(neb.barrier,6)
+                        reverseBarrier = round((neb.iniEnergy-neb.finEnergy)+neb.barrier,6)
+                        print "Reverse barrier: ", reverseBarrier
+
+                        # reverse barrier is too small, transition would immediately come back
+                        if self.params.reverseBarrierTol is not None:
+                            if reverseBarrier < self.params.reverseBarrierTol:
+                                barrier = str("None")
+                                results.append([0,atom_index, final_pos, barrier])
+                                vol.addTrans(dir_vector[i], final_key, barrier, str("None"),str("None"))
+                                continue
+
+                        # do not allow any negative barriers
+                        if neb.barrier < 0 or reverseBarrier < 0:
+                            barrier = str("None")
+                            results.append([0,atom_index, final_pos, barrier])
+                            vol.addTrans(dir_vector[i], final_key, barrier, str("None"),str("None"))
+                            continue
+
+                        # find final hashkey
+                        final_key, final_pos = self.findFinal(dir_vector[i],atom_index,full_depo_index,self.surface_positions)
+                        rate = self.calcRate(neb.barrier)
+                        results.append([rate, atom_index, final_pos, neb.barrier])
+                        vol.addTrans(dir_vector[i], final_key, neb.barrier, rate, reverseBarrier)
+                        if features[i] is not None:
+                            self.surrogate.observe(features[i], neb.barrier)
+
+                        # add result to basin
+                        if self.params.useBasin:
+                            iniPos = copy.copy(full_depo_index[atom_index])
+                            iniPos.pop(0)
+                            iniPos.pop()
+                            bas.addTransition(iniPos,final_pos,rate,neb.barrier,reverseBarrier)
+                            if neb.barrier < self.params.basinBarrierTol or reverseBarrier < self.params.basinBarrierTol :
+                                keepBasin = True
+
+                    else:
+                        print "WARNING: maxMove too large in final lattice:", maxMove
+                        barrier = str("None")
+                        results.append([0,atom_index, final_pos, barrier])
+                        vol.addTrans(dir_vector[i], final_key, barrier, 0, str("None"))
+
+                else:
+                    barrier = str("None")
+                    results.append([0,atom_index, str("None"), barrier])
+
+            if results or deferred:
+                print results
+                #write_trans_file(hashkey,results)
+                return 0, results, vol, keepBasin, iniMin
+        else:
+            print "WARNING: maxMove too large in initial lattice: ", maxMove
+            del ini, iniMin
+            #del fin, finMin
+            del Sep
+            return 2, results, vol, keepBasin, False;
+
+        del ini, iniMin
+        #del fin, finMin
+        del Sep
+
+        return 1, results, vol, keepBasin, False;
+
+    # do a single NEB and add transition to trans files
+    def singleNEB(self, direction,full_depo_index,surface_lattice,atom_index,hashkey,final_key,natoms,vol,initialMinimised,features=None):
+        print "SINGLE NEB", "="*60
+
+        barrier = []
+        final_keys = []
+        results = None
+
+        print natoms
+        # create initial lattice
+
+        if initialMinimised == False:
+            self.writeLatticeLKMC('/initial',full_depo_index,surface_lattice,natoms)
+            ini = Lattice.readLattice(self.NEB_dir_name_prefac+"/initial.dat")
+
+            # minimise lattice
+            iniMin, status = self.minimiseCached(ini)
+            if status:
+                print " WARNING! failed to minimise initial lattice"
+                iniMin.writeLattice(self.NEB_dir_name_prefac+"/Reset.dat")
+                return 1, vol
+        else:
+            iniMin = initialMinimised
+            ini = Lattice.readLattice(self.NEB_dir_name_prefac+"/initial.dat")
+
+        # create cell dimensions
+        cellDims = np.asarray([self.box_x,0,0,0,self.params.maxHeight,0,0,0,self.box_z],dtype=np.float64)
+
+        # check max movement
+        Index, maxMove, avgMove, Sep = Vectors.maxMovement(ini.pos, iniMin.pos, cellDims)
+
+        if maxMove < self.params.maxMoveCriteria:
+            #ini.writeLattice("initialMin.dat")
+            full_depo = copy.deepcopy(full_depo_index)
+            depo_list = full_depo[atom_index]
+
+            # move atom
+            moved_list = self.moveAtom(depo_list, direction ,full_depo_index)
+
+            if moved_list:
+                full_depo[atom_index] = moved_list
+
+                # create initial lattice and Minimise
+                self.writeLatticeLKMC('/6',full_depo,surface_lattice,natoms)
+                fin = Lattice.readLattice(self.NEB_dir_name_prefac+"/" + '6' +".dat")
+                finMin = copy.deepcopy(fin)
+                Index, maxMove, avgMove, Sep = Vectors.maxMovement(iniMin.pos, finMin.pos, cellDims)
+                if maxMove < 0.4:
+                    print " difference between ini and fin is too small", maxMove
+                    barrier = str("None")
+                    results = [direction, final_key, barrier]
+                    results[0] = map(int,results[0])
+                    del ini, iniMin
+                    del fin, finMin
+                    vol.addTrans(results[0], final_key, barrier, 0, str("None"))
+                    # add_to_trans_file(hashkey,results)
+                    return results, vol
+
+                # minimise final lattice
+                finMin, status = self.minimiseCached(fin)
+                if status:
+                    print " Failed to minimise final"
+                    barrier = str("None")
+                    results = [direction, final_key, barrier]
+                    results[0] = map(int,results[0])
+                    del ini, iniMin
+                    del fin, finMin
+                    vol.addTrans(results[0], final_key, barrier, 0, str("None"))
+                    # add_to_trans_file(hashkey,results)
+                    return results, vol
+
+                # check max movement
+                Index, maxMove, avgMove, Sep = Vectors.maxMovement(fin.pos, finMin.pos, cellDims)
+                if maxMove < self.params.maxMoveCriteria:
+                    # run NEB on initial and final lattices
+                    neb, status = self.runNEB(iniMin, finMin)
+
+                    if status:
+                        print "WARNING: NEB failed to converge"
+                        print "Try changing parameters in lkmcInput.IN"
+                        barrier = str("None")
+                        results = [direction, final_key, barrier]
+                        results[0] = map(int,results[0])
+                        del ini, iniMin
+                        del fin, finMin
+                        vol.addTrans(results[0], final_key, barrier, 0, str("None"))
+                        #add_to_trans_file(hashkey,results)
+                        return results, vol
+
+                    print neb.barrier
+                    barrier = round(neb.barrier,6)
+                    reverseBarrier = round((neb.iniEnergy-neb.finEnergy)+neb.barrier,6)
+                    print "Reverse barrier: ", reverseBarrier
+
+                    # do not allow transitions with tiny reverse barriers
+                    if self.params.reverseBarrierTol is not None:
+                        if reverseBarrier < self.params.reverseBarrierTol:
+                            barrier = str("None")
+                            results = [direction, final_key, barrier]
+                            results[0] = map(int,results[0])
+                            vol.addTrans(results[0], final_key, barrier, str("None"),str("None"))
+                            return results, vol
+
+                    # do not allow any negative barriers
+                    if neb.barrier < 0 or reverseBarrier < 0:
+                        barrier = str("None")
+                        results = [direction, final_key, barrier]
+                        results[0] = map(int,results[0])
+                        vol.addTrans(results[0], final_key, barrier, str("None"),str("None"))
+                        return results, vol
+
+
+                    results = [direction, final_key, barrier]
+                    results[0] = map(int,results[0])
+                    rate = self.calcRate(barrier)
+                    vol.addTrans(results[0], final_key, barrier, rate, reverseBarrier)
+                    if features is not None:
+                        self.surrogate.observe(features, barrier)
+                    print direction
+                else:
+                    print "WARNING: maxMove too large in final lattice"
+                    barrier = str("None")
+                    results = [direction, final_key, barrier]
+                    results[0] = map(int,results[0])
+                    del ini, iniMin
+                    del fin, finMin
+                    vol.addTrans(results[0], final_key, barrier, 0, str("None"))
+                    #add_to_trans_file(hashkey,results)
+                    return results, vol
+            else:
+                print "WARNING: move atom failed"
+                barrier = str("None")
+                results = [direction, final_key, barrier]
+                results[0] = map(int,results[0])
+                del ini, iniMin
+                vol.addTrans(results[0], final_key, barrier, 0 , str("None"))
+                #add_to_trans_file(hashkey,results)
+                return results, vol
+
+            # if results:
+            #     add_to_trans_file(hashkey,results)
+        else:
+            print "WARNING: maxMove too large in initial lattice ", maxMove
+            print " WARNING! failed to minimise initial lattice"
+            iniMin.writeLattice(self.NEB_dir_name_prefac+"/Reset.dat")
+            return 1, vol
+
+        del ini, iniMin
+        del Sep
+        print "Finished SINGlE NEB", "="*60
+        return results, vol
+
+    # send the searches of a new volume to the background workers. The rate
+    # of each hop is bounded by the surrogate estimate or asyncMinBarrier
+    def submitSearch(self, full_depo_index, surface_lattice, atom_index, hashkey):
+        number = self.asyncNEB.numSubmitted + 1
+        prefix = '/Async/' + str(number)
+        self.writeLatticeLKMC(prefix + '_ini',full_depo_index,surface_lattice,self.natoms)
+
+        full_depo = copy.deepcopy(full_depo_index)
+        depo_list = full_depo[atom_index]
+        directions = self.hopDirections(full_depo_index, atom_index)
+        hops = []
+        finalKeys = []
+        bound = 0.0
+        for i in xrange(len(directions)):
+            moved_list = self.moveAtom(depo_list, directions[i], full_depo_index)
+            if not moved_list:
+                continue
+            full_depo[atom_index] = moved_list
+            self.writeLatticeLKMC(prefix + '_' + str(i),full_depo,surface_lattice,self.natoms)
+            final_key, final_pos = self.findFinal(directions[i],atom_index,full_depo_index,self.surface_positions)
+            hops.append((directions[i], self.NEB_dir_name_prefac + prefix + '_' + str(i) + '.dat'))
+            finalKeys.append(final_key)
+            if self.surrogate is not None:
+                bound += self.calcRate(self.surrogate.estimate(self.hopFeatures(full_depo_index, atom_index, moved_list[1:4])))
+            else:
+                bound += self.calcRate(self.params.asyncMinBarrier)
+
+        cellDims = np.asarray([self.box_x,0,0,0,self.params.maxHeight,0,0,0,self.box_z],dtype=np.float64)
+        job = (self.NEB_dir_name_prefac + prefix + '_ini.dat', hops, cellDims, self.params.maxMoveCriteria)
+        self.asyncNEB.submit(hashkey, job, directions, finalKeys, bound)
+        self.timers.count('asyncSubmitted')
+
+    # add the results of finished background searches to the catalog. Returns the
+    # step to roll back to if a search that was ignored found rates above its bound
+    def collectSearches(self, wait=False, hashkeys=None):
+        rollbackStep = None
+        for hashkey in self.asyncNEB.finished(wait, hashkeys):
+            search, status, results = self.asyncNEB.pop(hashkey)
+            self.timers.count('asyncCollected')
+            if hashkey not in self.volumes:
+                self.volumes[hashkey] = volume()
+            vol = self.volumes[hashkey]
+            if status:
+                print "Background search failed for volume ", hashkey, ", searching again in the KMC loop"
+                self.asyncFailed.add(hashkey)
+                if self.catalog is not None:
+                    self.catalog.release(hashkey)
+                continue
+
+            for direc in search.directions:
+                vol.addDirection(direc)
+            rate = 0.0
+            for i in xrange(len(results)):
+                direction, barrier, reverseBarrier = results[i]
+                # same checks as autoNEB
+                if barrier != "None":
+                    if self.params.reverseBarrierTol is not None and reverseBarrier < self.params.reverseBarrierTol:
+                        barrier = "None"
+                    elif barrier < 0 or reverseBarrier < 0:
+                        barrier = "None"
+                if barrier == "None":
+                    vol.addTrans(direction, search.finalKeys[i], "None", 0, "None")
+                else:
+                    hopRate = self.calcRate(barrier)
+                    vol.addTrans(direction, search.finalKeys[i], barrier, hopRate, reverseBarrier)
+                    rate += hopRate
+            if self.catalog is not None:
+                self.catalog.publish(hashkey, vol)
+                self.catalog.release(hashkey)
+
+            if search.ignoredSince is not None and rate > search.bound:
+                print "Background search of volume ", hashkey, " found rate ", rate, " above its bound ", search.bound
+                if self.params.statsOut:
+                    outfile = open(self.Stats_dir + '/AsyncNEB.txt', 'a')
+                    outfile.write(str(self.CurrentStep)+','+str(search.ignoredSince)+','+str(hashkey)+','+str(search.bound)+','+str(rate)+'\n')
+                    outfile.close()
+                if rollbackStep is None or search.ignoredSince < rollbackStep:
+                    rollbackStep = search.ignoredSince
+        return rollbackStep
+
+    # state of the run at the start of a step
+    def takeSnapshot(self):
+        snapshot = {}
+        snapshot['CurrentStep'] = self.CurrentStep
+        snapshot['Time'] = self.Time
+        snapshot['index'] = self.index
+        snapshot['natoms'] = self.natoms
+        snapshot['full_depo_list'] = copy.deepcopy(self.full_depo_list)
+        snapshot['rng'] = self.rng.getstate()
+        snapshot['flicker'] = copy.deepcopy(self.flicker)
+        snapshot['temperature'] = self.params.temperature
+        snapshot['schedule'] = self.schedule.current
+        snapshot['lastTotalRate'] = self.lastTotalRate
+        snapshot['depoBatchStop'] = self.depoBatchStop
+        snapshot['runningStats'] = copy.deepcopy(self.runningStats)
+        snapshot['files'] = {}
+        if self.params.statsOut:
+            for path in [self.statsFile, self.flickerFile, self.islandsFile, self.islandMembersFile, self.runningStats.recordFile]:
+                if os.path.isfile(path):
+                    snapshot['files'][path] = os.path.getsize(path)
+        return snapshot
+
+    # go back to the start of an earlier step. Output written since is truncated
+    # or overwritten when the steps are done again
+    def rollback(self, step):
+        snapshot = self.snapshots[step]
+        print "Rolling back from step ", self.CurrentStep, " to step ", step
+        self.asyncNEB.numRollbacks += 1
+        self.asyncNEB.stepsRolledBack += self.CurrentStep - step
+
+        self.CurrentStep = snapshot['CurrentStep']
+        self.Time = snapshot['Time']
+        self.index = snapshot['index']
+        self.natoms = snapshot['natoms']
+        self.full_depo_list = copy.deepcopy(snapshot['full_depo_list'])
+        self.rng.setstate(snapshot['rng'])
+        self.flicker = copy.deepcopy(snapshot['flicker'])
+        if snapshot['temperature'] != self.params.temperature:
+            self.setTemperature(snapshot['temperature'])
+        self.schedule.current = snapshot['schedule']
+        self.lastTotalRate = snapshot['lastTotalRate']
+        self.depoBatchStop = snapshot['depoBatchStop']
+        self.runningStats = copy.deepcopy(snapshot['runningStats'])
+        self.basinList = []
+        for path in snapshot['files']:
+            outfile = open(path, 'r+')
+            outfile.truncate(snapshot['files'][path])
+            outfile.close()
+
+        # searches are ignored again from the steps they are met in
+        for search in self.asyncNEB.pending.values():
+            if search.ignoredSince is not None and search.ignoredSince >= step:
+                search.ignoredSince = None
+        for s in self.snapshots.keys():
+            if s >= step:
+                del self.snapshots[s]
+        print "Current Step: ", self.CurrentStep
+
+    # write out all volumes and transitions to a file
+    @Timing.timedMethod('writeVolumes')
+    def writeVolumes(self, volumes):
+        volfile = self.initial_dir + '/Volumes.txt'
+
+        out = open(volfile, 'w')
+        for i, vol in enumerate(volumes):
+            # print "vol:", vol
+            numDir = len(volumes[vol].directions)
+            numTrans = len(volumes[vol].finalKeys)
+            out.write(str(vol)+'\t'+str(numDir)+'\t'+str(numTrans)+'\n')
+            for j in range(numDir):
+                direc = volumes[vol].directions[j]
+                out.write(str(direc[0])+'\t'+str(direc[1])+'\t'+str(direc[2])+'\n')
+            for j, trans in enumerate(volumes[vol].finalKeys):
+                out.write(str(trans)+'\t'+str(volumes[vol].finalKeys[trans].barrier)+'\t'+str(volumes[vol].finalKeys[trans].reverseBarrier)+'\n')
+
+        # writeVolAtoms(volumes)
+        return
+
+    # write out volume atom positions to a file
+    def writeVolAtoms(self, volumes):
+        volfile = self.initial_dir + '/VolumeAtoms.txt'
+
+        out = open(volfile, 'w')
+        for i, vol in enumerate(volumes):
+            numAtoms = len(volumes[vol].volumeAtoms)
+            out.write(str(vol)+'\t'+str(numAtoms)+'\n')
+            cV = volumes[vol]
+            for j in range(numAtoms):
+                out.write(str(cV.specie[j]) + '   ' + str(cV.pos[3*j])+ '    '+str(cV.pos[3*j+1])+ '   '+ str(cV.pos[3*j+2])+'\n')
+        return
+
+    # read volumes from file. Rates are calculated from the barriers at the
+    # current temperature (rates stored by older versions are ignored)
+    def readVolumes(self, volumes):
+
+        # read in transitions
+        volPath = self.initial_dir + '/Volumes.txt'
+        if (os.path.isfile(volPath)):
+            input_file = open(volPath, 'r')
+            while 1:
+                latline = input_file.readline()
+                line = latline.split()
+                if len(line) < 3:
+                    break
+                key = str(line[0])
+                numDir = int(line[1])
+                numTrans = int(line[2])
+                vol = volume()
+                for i in range(numDir):
+                    latline = input_file.readline()
+                    line = latline.split()
+                    if len(line) < 3:
+                        break
+                    direc = [int(line[0]),int(line[1]),int(line[2])]
+                    vol.directions.append(direc)
+                for i in range(numTrans):
+                    latline = input_file.readline()
+                    line = latline.split()
+                    if len(line) < 3:
+                        break
+                    if line[1]!= "None":
+                        vol.addTrans(direc, str(line[0]), float(line[1]), None, float(line[-1]))
+                    else:
+                        vol.addTrans(direc, str(line[0]), str(line[1]), float(0.0), str(line[-1]))
+                volumes[key]=vol
+            input_file.close()
+
+        self.evaluateRates(self.catalogKeys(volumes))
+        return volumes
+
+    # write stats to a file
+    @Timing.timedMethod('statsOutput')
+    def statsOutput(self, events,CurrentStep,numAdatoms):
+        self.runningStats.addStep(events, numAdatoms, CurrentStep)
+        if self.params.statsFlushEvery <= 1 or CurrentStep%self.params.statsFlushEvery == 0:
+            self.runningStats.flush(CurrentStep)
+        return
+
+    # read input and lattice files and create output directories
+    def setup(self):
+        self.startTimeSub = time.time()
+
+        print "="*80
+        print "~~~~~~~~ Starting lattice KMC ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~"
+        print "~~~~~~~~ Copyright (c) Adam Lloyd 2016 ~~~~~~~~~~~~~~~~~~~~~~~"
+        print "="*80
+
+        print " Current directory           : ", self.initial_dir
+        print " Output directory params.prefactor  : ", self.output_dir_name_prefac
+
+        # determine if all input files are present
+        # check we have lattice.dat
+        if not (os.path.isfile(self.input_lattice_path)):
+            print "lattice.dat: ", self.input_lattice_path, " not found, exiting ..."
+            sys.exit()
+
+        # check if volumes and output directories exists, if not: creates them
+        if not os.path.exists(self.Volumes_dir):
+            os.makedirs(self.Volumes_dir)
+        if not os.path.exists(self.output_dir_name_prefac):
+            os.makedirs(self.output_dir_name_prefac)
+        if not os.path.exists(self.NEB_dir_name_prefac):
+            os.makedirs(self.NEB_dir_name_prefac)
+        if not os.path.exists(self.Trans_dir):
+            os.makedirs(self.Trans_dir)
+
+        # read lattice header
+        self.natoms,self.box_x,self.box_y,self.box_z = readLatticeHeader(self.input_lattice_path)
+        print "Initial atoms  : ",self.natoms
+        print "Lattice size: ",self.box_x,self.box_y,self.box_z, " Angstroms"
+        sys.stdout.flush()
+
+        # Y-height of initial lattice
+        self.initial_surface_height = findMaxHeight(self.input_lattice_path)
+        print "initial_surface_height: ", self.initial_surface_height
+
+        # store whole surface lattice first
+        self.surface_lattice = readLattice(self.input_lattice_path,2)
+        for i in xrange(len(self.surface_lattice)):
+            self.surface_specie.append(self.surface_lattice[i][0])
+            self.surface_positions.append(round(self.surface_lattice[i][1],6))
+            self.surface_positions.append(round(self.surface_lattice[i][2],6))
+            self.surface_positions.append(round(self.surface_lattice[i][3],6))
+
+        # set up temp initial and final lattices.dat
+        lkmcInput = os.path.join(self.initial_dir, "lkmcInput.IN")
+        self.LKMCParams = Input.getLKMCParams(1, "", lkmcInput)
+        Input.readGlobals(lkmcInput)
+        if self.params is None:
+            self.params = Parameters.getInput(os.path.join(self.initial_dir, "input.IN"))
+        if self.volumes is None:
+            self.volumes = self.readVolumes({})
+        else:
+            self.evaluateRates(self.catalogKeys(self.volumes))
+
+        # seed random numbers for reproducible runs
+        if self.params.randomSeed >= 0:
+            self.rng.seed(self.params.randomSeed)
+
+        # share transitions with other runs through the catalog journal
+        if self.params.catalogDir.lower() != 'none':
+            catalogDir = os.path.join(self.initial_dir, self.params.catalogDir)
+            self.catalog = Catalog.sharedCatalog(catalogDir, volume, key, self.evaluateRates, self.params.catalogPollTime, self.params.catalogClaimTimeout)
+            self.catalog.sync(self.volumes)
+            print "Shared catalog: ", catalogDir, " (%d transitions read, %d published)" % (self.catalog.numRead, self.catalog.publishAll(self.volumes))
+
+        if self.params.useBasin:
+            if not os.path.exists(self.basin_dir):
+                os.makedirs(self.basin_dir)
+        if self.params.statsOut:
+            if not os.path.exists(self.Stats_dir):
+                os.makedirs(self.Stats_dir)
+            self.statsFile = self.Stats_dir + '/Stats.txt'
+            outfile = open(self.statsFile, 'w')
+            outfile.write('Average Rate'+', Average Barrier'+', No. Events'+', No. Adatoms'+', Step'+'\n')
+            outfile.close()
+            self.runningStats = RunningStats.runningStats(self.statsFile, self.Stats_dir + '/RunningStats.json')
+            outfile = open(self.runningStats.recordFile, 'w')
+            outfile.close()
+            self.flickerFile = self.Stats_dir + '/Flicker.txt'
+            outfile = open(self.flickerFile, 'w')
+            outfile.write(Flicker.statsHeader())
+            outfile.close()
+            self.islandsFile = self.Stats_dir + '/Islands.txt'
+            outfile = open(self.islandsFile, 'w')
+            outfile.write(Islands.statsHeader())
+            outfile.close()
+            self.islandMembersFile = self.Stats_dir + '/IslandMembers.txt'
+            outfile = open(self.islandMembersFile, 'w')
+            outfile.write(Islands.membersHeader())
+            outfile.close()
+            if self.params.nebClusterRadius > 0 and self.params.nebClusterCheckEvery:
+                outfile = open(self.Stats_dir + '/ClusterNEB.txt', 'w')
+                outfile.write('Step'+', Cluster atoms'+', Full atoms'+', Cluster barrier'+', Full barrier'+', Error'+', Cluster time'+', Full time'+'\n')
+                outfile.close()
+        if self.params.timingOutEvery:
+            if not os.path.exists(self.Stats_dir):
+                os.makedirs(self.Stats_dir)
+            if self.params.timingFormat == 'csv':
+                self.timingFile = self.Stats_dir + '/Timing.csv'
+                outfile = open(self.timingFile, 'w')
+                outfile.write(Timing.csvHeader())
+                outfile.close()
+            else:
+                self.timingFile = self.Stats_dir + '/Timing.json'
+                outfile = open(self.timingFile, 'w')
+                outfile.close()
+        print "~"*80
+
+        # track revisits of recent states
+        self.flicker = Flicker.flickerDetector(self.params)
+
+        # profiling windows
+        self.profiles = Profiling.profileWindows(self.params, self.profile_dir)
+
+        # temperature schedule
+        self.schedule = Schedule.temperatureSchedule(self.params)
+        if self.schedule.active and self.params.statsOut:
+            outfile = open(self.Stats_dir + '/Temperature.txt', 'w')
+            outfile.write('Step'+', Time'+', Temperature'+'\n')
+            outfile.close()
+
+        # find size of gridSize
+        self.x_grid_points, self.y_grid_points, self.z_grid_points, self.box_x, self.box_z = self.gridSize(self.box_x,self.initial_surface_height,self.box_z)
+        print "grid size: %d * %d * %d" % (self.x_grid_points,self.y_grid_points,self.z_grid_points)
+        if (self.x_grid_points%6):
+            print " WARNING WARNING: x grid points must be a multiple of 6 for PBC to work"
+            sys.exit()
+        if (self.z_grid_points%2):
+            print " WARNING WARNING: z grid points must be a multiple of 2 for PBC to work"
+            sys.exit()
+        print "New lattice size: ",self.box_x,self.box_y,self.box_z, " Angstroms"
+        print "-" * 80
+
+        # lookup tables of the fast mode
+        if self.params.fastMode:
+            self.environment = Environment.environmentTable(self.params, self.box_x, self.box_z)
+
+        # relaxed states reused when the same lattice is minimised again
+        if self.params.stateCacheSize > 0:
+            self.stateCache = StateCache.stateCache(self.params.stateCacheSize)
+
+        # cheap barrier estimates to rank and defer NEBs
+        self.surrogate = Surrogate.getModel(self.params)
+        self.lastTotalRate = self.params.depoRate
+
+        # transition searches in background worker processes
+        if self.params.asyncNEB and self.params.nebClusterRadius > 0:
+            print "asyncNEB runs full system NEBs, it can not be used with nebClusterRadius, exiting ..."
+            sys.exit()
+        if self.params.asyncNEB:
+            if self.params.useBasin:
+                print "Warning: asyncNEB is not used with the basin method"
+            elif not AsyncNEB.available():
+                print "Warning: asyncNEB is not used in pool workers (eg. Ensemble.py replicas)"
+            else:
+                if not os.path.exists(self.NEB_dir_name_prefac + '/Async'):
+                    os.makedirs(self.NEB_dir_name_prefac + '/Async')
+                self.asyncNEB = AsyncNEB.asyncSearches(self.params.asyncProcesses, lkmcInput)
+                if self.params.statsOut:
+                    outfile = open(self.Stats_dir + '/AsyncNEB.txt', 'w')
+                    outfile.write('Step'+', Rolled back to'+', Volume'+', Rate bound'+', Rate'+'\n')
+                    outfile.close()
+
+        # escape rates of adatoms on top of islands (from Scripts/mean.py --sweep)
+        if self.params.islandTable != 'none':
+            if self.params.temperatureSchedule != 'none':
+                print "islandTable rates are for a single temperature, can not be used with temperatureSchedule, exiting ..."
+                sys.exit()
+            tablePath = os.path.join(self.initial_dir, self.params.islandTable)
+            if not os.path.isfile(tablePath):
+                print "islandTable: ", tablePath, " not found, exiting ..."
+                sys.exit()
+            self.islandTable = IslandTable.escapeTable(tablePath, self.params.islandSizeTol)
+            print "Island escape table: ", len(self.islandTable), " island sizes"
+
+        # coordination of the adatoms, updated as they move
+        self.coordination = Coordination.coordinationTracker(self.surface_positions, self.params, self.box_x, self.box_z)
+        self.islands = Islands.islandTracker(self.params, self.box_x, self.box_z)
+
+        # valid deposition sites, adatoms are added when the first deposition syncs the map
+        if self.params.depoSiteMap:
+            self.depoSites = DepoSites.depositionSites(self.surface_lattice, self.params, self.x_grid_points, self.z_grid_points, self.box_x, self.box_z)
+            print "Deposition site map: ", len(self.depoSites), " valid sites on the surface"
+
+        # check if continue or begin run
+        if self.params.jobStatus == 'CNTIN':
+            num = 0
+            orig_len = len(self.surface_lattice)
+            while 1:
+                kmcFile = self.output_dir_name_prefac + '/KMC' + str(num) + '.dat'
+
+                # read in last KMC file
+                if not os.path.exists(kmcFile):
+                    input_file = open(self.output_dir_name_prefac + '/KMC' + str(num-1) + '.dat', 'r')
+                    # skip first line
+                    latline = input_file.readline()
+                    latline = input_file.readline()
+                    self.Time = float(latline)
+                    input_file.close()
+
+                    self.full_depo_list = readLattice(self.output_dir_name_prefac + '/KMC' + str(num-1) + '.dat',orig_len+4)
+
+                    # add adatoms to full_depo_list
+                    for i in xrange(len(self.full_depo_list)):
+                        self.full_depo_list[i][4] = orig_len + 1 + i
+
+                    self.natoms += len(self.full_depo_list)
+                    self.full_depo_list = self.setToLattice(self.full_depo_list)
+                    self.CurrentStep = (num-1) * self.params.latticeOutEvery
+                    break
+                num += 1
+
+    # do initial consecutive depositions
+    def initialDepositions(self):
+        while self.CurrentStep < (self.params.numberDepos):
+            depo_list = []
+            depo_list = self.deposition(self.box_x,self.box_z,self.params.x_grid_dist,self.params.z_grid_dist,self.full_depo_list,self.natoms)
+            if depo_list:
+                print "Current Step: ", self.CurrentStep
+                self.natoms = depo_list[4]
+                self.full_depo_list.append(depo_list)
+                self.writeLattice(self.CurrentStep,self.full_depo_list,self.surface_lattice,self.natoms,0,0)
+                print "Writing lattice: KMC 0"
+                self.CurrentStep += 1
+
+        print "-" * 80
+        print "Number of initial adatoms: " , len(self.full_depo_list)
+        self.index = self.CurrentStep
+        self.started = True
+
+    # number of depositions in this step. While deposition is at least depoBatchMinFrac
+    # of the total rate the next events are drawn too: each is another deposition with
+    # probability depoRate / total rate. A draw of any other event ends the batch
+    # (stop) and that event is chosen among the others next step
+    def depoBatchCount(self, events):
+        if self.params.depoBatchSize <= 1:
+            return 1, False
+        frac = self.params.depoRate / events.total()
+        if frac < self.params.depoBatchMinFrac:
+            return 1, False
+        numDepos = 1
+        while numDepos < self.params.depoBatchSize:
+            if self.rng.random() >= frac:
+                return numDepos, True
+            numDepos += 1
+        return numDepos, False
+
+    # waiting times of depositions after the first one of a step
+    def depoBatchTime(self, numExtra, totalRate):
+        for k in xrange(numExtra):
+            u = self.rng.random()
+            self.Time += (np.log(1/u)/totalRate)*1E15
+
+    # deposit up to numDepos atoms more than graphRad apart, so their volumes do not
+    # overlap, and relax them together once. Returns the number of atoms placed
+    def depositBatch(self, numDepos):
+        full_depo_backup = copy.deepcopy(self.full_depo_list)
+        centres = []
+        attempts = 0
+        while len(centres) < numDepos and attempts < 100 * numDepos:
+            attempts += 1
+            depo_list = self.deposition(self.box_x,self.box_z,self.params.x_grid_dist,self.params.z_grid_dist,self.full_depo_list,self.natoms)
+            if not depo_list:
+                continue
+            if centres:
+                sep = np.asarray(centres, dtype=np.float64) - np.asarray(depo_list[1:4], dtype=np.float64)
+                sep[:,0] -= self.box_x * np.round(sep[:,0] / self.box_x)
+                sep[:,2] -= self.box_z * np.round(sep[:,2] / self.box_z)
+                if np.sqrt(np.einsum('ij,ij->i', sep, sep)).min() <= self.params.graphRad:
+                    self.timers.count('depoBatchTooClose')
+                    continue
+            self.natoms = depo_list[4]
+            self.full_depo_list.append(depo_list)
+            centres.append(depo_list[1:4])
+        if not centres:
+            return 0
+        print "Batch deposition: ", len(centres), " atoms"
+        self.timers.count('depoBatches')
+        self.timers.count('depoBatchAtoms', len(centres))
+        self.basinList = []
+
+        # fast mode: every deposit stayed on its lattice site in its environment before
+        depoSigs = []
+        if self.environment is not None:
+            first = len(self.full_depo_list) - len(centres)
+            depoSigs = [self.adatomSignature(j) for j in xrange(first, len(self.full_depo_list))]
+            if all([self.environment.lookup(self.environment.stableDepo, sig) == (True, True) for sig in depoSigs]):
+                self.timers.count('depoMinimiseSkipped')
+                self.index += 1
+                self.writeLatticeLKMC('/reset',self.full_depo_list,self.surface_lattice,self.natoms)
+                return len(centres)
+
+        # one minimisation for all the deposits
+        if self.params.relaxRadius > 0:
+            status, maxMove = self.relaxRegion(*centres)
+        else:
+            self.writeLatticeLKMC('/initial',self.full_depo_list,self.surface_lattice,self.natoms)
+            ini = Lattice.readLattice(self.NEB_dir_name_prefac+"/initial.dat")
+            cellDims = np.asarray([self.box_x,0,0,0,self.params.maxHeight,0,0,0,self.box_z],dtype=np.float64)
+            iniMin, status = self.minimiseCached(ini)
+            if not status:
+                Index, maxMove, avgMove, Sep = Vectors.maxMovement(ini.pos, iniMin.pos, cellDims)
+        if status:
+            print "Warning: failed to minimise initial lattice"
+            self.full_depo_list = full_depo_backup
+            sys.exit()
+
+        # a batch that moved can not tell which deposit did, all of them are marked as moved
+        stable = maxMove < self.params.maxMoveCriteria
+        for sig in depoSigs:
+            if self.environment.store(self.environment.stableDepo, sig, stable):
+                self.timers.count('environmentConflict')
+        if stable:
+            self.writeLatticeLKMC('/reset',self.full_depo_list,self.surface_lattice,self.natoms)
+        else:
+            self.full_depo_list = self.setToLattice(self.full_depo_list)
+            self.writeLatticeLKMC('/reset',self.full_depo_list,self.surface_lattice,self.natoms)
+        self.index += 1
+        return len(centres)
+
+    # do a single KMC step. Returns the chosen event
+    def step(self):
+        # TODO: include a verbosity level
+        print "Current Step: ", self.CurrentStep
+        self.profiles.update(self.CurrentStep)
+
+        # add finished background searches, roll back if one was needed earlier
+        if self.asyncNEB is not None:
+            rollbackStep = self.collectSearches()
+            if rollbackStep is not None:
+                self.rollback(rollbackStep)
+            snapshot = self.takeSnapshot()
+
+        # follow the temperature schedule
+        temperature = self.schedule.update(self.CurrentStep, self.Time)
+        if temperature is not None:
+            self.setTemperature(temperature)
+
+        # check if in same position as 2 steps ago
+        event_list, self.volumes, self.full_depo_list = self.createEventsList(self.full_depo_list,self.surface_lattice, self.volumes)
+        # events in arrays for selection and stats
+        events = Events.eventStore(event_list)
+
+        # only go ahead without pending searches while their rates are negligible
+        if self.asyncNEB is not None:
+            while self.pendingMet:
+                bound = sum([self.asyncNEB.pending[k].bound for k in self.pendingMet])
+                # rates of failed NEBs are "None" (NaN in the event store, not counted)
+                totalRate = events.total() + self.params.depoRate
+                if bound <= self.params.asyncRateFrac * totalRate:
+                    break
+                print "Waiting for background searches, rate bound ", bound, " total rate ", totalRate
+                self.timers.count('asyncWaits')
+                rollbackStep = self.collectSearches(wait=True, hashkeys=list(set(self.pendingMet)))
+                if rollbackStep is not None:
+                    self.rollback(rollbackStep)
+                    return self.step()
+                event_list, self.volumes, self.full_depo_list = self.createEventsList(self.full_depo_list,self.surface_lattice, self.volumes)
+                events = Events.eventStore(event_list)
+
+            # keep the state of this step while searches are ignored
+            for k in set(self.pendingMet):
+                search = self.asyncNEB.pending[k]
+                if search.ignoredSince is None:
+                    search.ignoredSince = self.CurrentStep
+                    self.snapshots[self.CurrentStep] = snapshot
+            used = set([search.ignoredSince for search in self.asyncNEB.pending.values()])
+            for s in self.snapshots.keys():
+                if s not in used:
+                    del self.snapshots[s]
+        self.event_list = event_list
+
+        # write out volumes file
+        if self.CurrentStep%self.params.volumesOutEvery == 0 or self.CurrentStep == self.params.total_steps:
+            self.writeVolumes(self.volumes)
+
+        # write out stats
+        if self.params.statsOut:
+            self.statsOutput(events,self.CurrentStep,len(self.full_depo_list))
+
+        bar = self.findBarrierHeight(self.params.depoRate )
+        events.append([self.params.depoRate ,0,['Depo'],bar])
+
+        # reference rate for deferring NEBs in the next step
+        if self.surrogate is not None:
+            self.lastTotalRate = events.total()
+
+        # the last deposition batch ended on a draw of another event, pick it among the others
+        timeRate = None
+        if self.depoBatchStop:
+            self.depoBatchStop = False
+            if events.numValid() > 1:
+                timeRate = events.total()
+                events.invalidate(len(events)-1)
+
+        # choose event
+        while 1:
+            chosenRate, chosenEvent, chosenAtom, self.Time, chosenBarrier, i = self.selectEvent(events, self.Time, timeRate)
+
+            if chosenEvent[0] == 'Depo':
+                break
+
+            # island escape, pick where the adatom leaves the island
+            if chosenEvent[0] == 'Island':
+                target = self.islandEscapeTarget(chosenAtom)
+                if target is not None:
+                    chosenEvent = target
+                    break
+                print "No way off the island for atom %d. Removing its events from list" % chosenAtom
+                events.invalidate(events.atomEvents(chosenAtom))
+                continue
+
+            # check final position of atom
+            status = self.checkMove(events,i,self.full_depo_list)
+            if status:
+                break
+            else:
+                print "Problem with chosen event %d. Removing event from list" %i
+                print events[i]
+                events.invalidate(i)
+
+        # do deposition
+        if chosenEvent[0] == 'Depo':
+            # deposition dominated: several far apart atoms in this step
+            numDepos, stop = self.depoBatchCount(events)
+            if numDepos > 1:
+                placed = self.depositBatch(numDepos)
+                # time only for the depositions that were placed, and the drawn other
+                # event is only next if the batch was not cut short
+                self.depoBatchTime(max(placed - 1, 0), events.total())
+                self.depoBatchStop = stop and placed == numDepos
+            while self.index < (self.CurrentStep+1):
+                depo_list = []
+                depo_list = self.deposition(self.box_x,self.box_z,self.params.x_grid_dist,self.params.z_grid_dist,self.full_depo_list,self.natoms)
+                if depo_list:
+                    self.natoms = depo_list[4]
+                    full_depo_backup = copy.deepcopy(self.full_depo_list)
+                    self.full_depo_list.append(depo_list)
+
+                    # fast mode: deposits in this environment stayed on their lattice site before
+                    depoSig = None
+                    if self.environment is not None:
+                        depoSig = self.adatomSignature(len(self.full_depo_list)-1)
+                        if self.environment.lookup(self.environment.stableDepo, depoSig) == (True, True):
+                            self.timers.count('depoMinimiseSkipped')
+                            self.index += 1
+                            self.basinList = []
+                            self.writeLatticeLKMC('/reset',self.full_depo_list,self.surface_lattice,self.natoms)
+                            continue
+
+                    # Minimise after each deposition
+                    if self.params.relaxRadius > 0:
+                        status, maxMove = self.relaxRegion([depo_list[1],depo_list[2],depo_list[3]])
+                    else:
+                        self.writeLatticeLKMC('/initial',self.full_depo_list,self.surface_lattice,self.natoms)
+                        ini = Lattice.readLattice(self.NEB_dir_name_prefac+"/initial.dat")
+                        # create cell dimensions
+                        cellDims = np.asarray([self.box_x,0,0,0,self.params.maxHeight,0,0,0,self.box_z],dtype=np.float64)
+                        # minimise lattice
+                        iniMin, status = self.minimiseCached(ini)
+                        if not status:
+                            # check max movement
+                            Index, maxMove, avgMove, Sep = Vectors.maxMovement(ini.pos, iniMin.pos, cellDims)
+                    if status:
+                        print "Warning: failed to minimise initial lattice"
+                        self.full_depo_list = full_depo_backup
+                        sys.exit()
+                    else:
+                        if depoSig is not None:
+                            if self.environment.store(self.environment.stableDepo, depoSig, maxMove < self.params.maxMoveCriteria):
+                                self.timers.count('environmentConflict')
+                        if maxMove < self.params.maxMoveCriteria:
+                            self.index += 1
+                            # delete basins if deposition occurs
+                            self.basinList = []
+                            self.writeLatticeLKMC('/reset',self.full_depo_list,self.surface_lattice,self.natoms)
+                        else:
+                            full_depo2 = self.setToLattice(self.full_depo_list)
+                            self.writeLatticeLKMC('/reset',full_depo2,self.surface_lattice,self.natoms)
+                            self.full_depo_list = full_depo2
+                            self.index += 1
+            self.CurrentStep += 1
+
+        # do move
+        else:
+            while self.index < (self.CurrentStep+1):
+                if isinstance(chosenAtom, tuple):
+                    # superbasin event, move all atoms in the cluster
+                    for k in xrange(len(chosenAtom)):
+                        atom = chosenAtom[k]
+                        pos = chosenEvent[k]
+                        self.full_depo_list[atom] = [self.full_depo_list[atom][0], pos[0],pos[1],pos[2],self.full_depo_list[atom][4]]
+                else:
+                    self.full_depo_list[chosenAtom] = [self.full_depo_list[chosenAtom][0], chosenEvent[0],chosenEvent[1],chosenEvent[2],self.full_depo_list[chosenAtom][4]]
+                self.index += 1
+            self.CurrentStep += 1
+
+        # check for flickering between recent states
+        if chosenEvent[0] == 'Depo':
+            self.flicker.recordStep([], [])
+        elif isinstance(chosenAtom, tuple):
+            self.flicker.recordStep(chosenAtom, chosenEvent)
+        else:
+            self.flicker.recordStep([chosenAtom], [chosenEvent])
+        print self.flicker.report()
+        if self.flicker.tune():
+            print "Flicker: raised basinBarrierTol to ", self.params.basinBarrierTol
+        if self.params.statsOut:
+            outfile = open(self.flickerFile, 'a')
+            outfile.write(self.flicker.statsLine(self.CurrentStep-1))
+            outfile.close()
+
+        # islands after this step (membership with the lattice output)
+        self.islands.sync(self.full_depo_list)
+        if self.params.statsOut:
+            outfile = open(self.islandsFile, 'a')
+            outfile.write(self.islands.statsLine(self.CurrentStep-1, self.Time))
+            outfile.close()
+            if (self.CurrentStep-1)%self.params.latticeOutEvery == 0:
+                outfile = open(self.islandMembersFile, 'a')
+                outfile.write(self.islands.membersLine(self.CurrentStep-1))
+                outfile.close()
+
+        # write out lattice
+        if (self.CurrentStep-1)%self.params.latticeOutEvery == 0:
+            latticeNo = (self.CurrentStep-1)/self.params.latticeOutEvery
+            print "Writing lattice: KMC", latticeNo
+
+            Barrier = chosenBarrier
+            self.writeLattice(latticeNo,self.full_depo_list,self.surface_lattice,self.natoms,self.Time,Barrier)
+        print "Number of fully coordinated atoms: ", self.coordination.numFull()
+
+        # write out timers
+        if self.params.timingOutEvery:
+            if (self.CurrentStep-1)%self.params.timingOutEvery == 0:
+                self.timers.write(self.timingFile, self.CurrentStep-1, self.params.timingFormat)
+
+        print "-" * 80
+        return chosenEvent
+
+    # run n KMC steps (all remaining steps if n is None). The run is set up on
+    # the first call and finished once total_steps is reached
+    def run(self, n=None):
+        if not self.started:
+            self.setup()
+            self.initialDepositions()
+
+        count = 0
+        try:
+            while self.CurrentStep < (self.params.total_steps + 1):
+                if n is not None and count >= n:
+                    break
+                self.step()
+                count += 1
+        except:
+            self.flushStats()
+            raise
+        finally:
+            # never leave claims behind for other runs to wait on
+            if self.catalog is not None:
+                self.catalog.releaseAll()
+
+        if self.CurrentStep >= (self.params.total_steps + 1):
+            self.finish()
+        return count
+
+    # write the buffered statistics when the run stops early (eg. sys.exit)
+    def flushStats(self):
+        if self.runningStats is not None and self.runningStats.lines:
+            self.runningStats.flush(self.CurrentStep)
+
+    # stop profiling and print final output
+    def finish(self):
+        if self.finished:
+            return
+        self.finished = True
+        self.profiles.stop()
+
+        # last lines of output
+        print "====== Finished KMC run ========================================================"
+        print "Number of steps completed:	", (self.CurrentStep-1)
+        print "Number of depositions:		", len(self.full_depo_list)
+        print "="*80
+        print "Lattice KMC        Copyright (c) Adam Lloyd 2016 "
+        print "="*80
+
+        # Timer
+        FinalTimeSub = time.time() - self.startTimeSub
+        print "Time: ", FinalTimeSub
+        print "Average Time per step: ", FinalTimeSub/self.CurrentStep
+        print "Time per phase: "
+        print self.timers.report()
+        if self.params.timingOutEvery:
+            self.timers.write(self.timingFile, self.CurrentStep-1, self.params.timingFormat)
+        print "Number of basins: ", len(self.basinList)
+        if self.schedule.active:
+            print "Temperature changes: ", self.schedule.numChanges, " final temperature: ", self.params.temperature, " K"
+        if self.catalog is not None:
+            print "Shared catalog transitions read: ", self.catalog.numRead, " written: ", self.catalog.numWritten
+        if self.asyncNEB is not None:
+            if self.collectSearches() is not None:
+                print "Warning: run ended on steps that went ahead of a background search"
+            self.writeVolumes(self.volumes)
+            self.asyncNEB.close()
+            print "Background searches: ", self.asyncNEB.numSubmitted, " unfinished: ", len(self.asyncNEB.pending), " rollbacks: ", self.asyncNEB.numRollbacks, " (", self.asyncNEB.stepsRolledBack, " steps)"
+        if self.stateCache is not None:
+            print "Minimised states reused: ", self.stateCache.hits, "/", self.stateCache.hits + self.stateCache.misses, " (evicted: ", self.stateCache.evictions, ")"
+        print "Steps revisiting recent states: ", self.flicker.totalRevisits, "/", self.flicker.totalSteps
+        if self.params.flickerAutoTune:
+            print "Final basinBarrierTol: ", self.params.basinBarrierTol, "(raised %d times)" % self.flicker.numTuned
+
+        if self.params.statsOut:
+            self.runningStats.flush(self.CurrentStep-1)
+            AveRate = self.runningStats.stepRate.mean()
+            AveBarrier = self.runningStats.stepBarrier.mean()
+            AveEvents = self.runningStats.numEvents.mean()
+            print "Average Rate: ", AveRate, "\tAverage Barrier: ", AveBarrier, "\tAverage Number of events: ", AveEvents
+            print self.runningStats.report()
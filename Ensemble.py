@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Ensemble module.
+
+Runs several independent replicas of the same KMC run in a process pool.
+Each replica has its own random number stream (randomSeed + replica
+number) and writes its trajectory to its own Replica<n> directory. The
+transition catalog (Volumes.txt) is read once and shared by the replicas,
+and island statistics are streamed to Stats/Ensemble.txt while the
+replicas run.
+
+usage: python Ensemble.py   (from a directory containing lattice.dat, input.IN and lkmcInput.IN)
+
+"""
+
+import os
+import sys
+import copy
+import math
+import time
+import shutil
+import Queue
+import multiprocessing
+import Engine
+import Parameters
+
+# catalog and stats queue inherited by the pool workers
+sharedVolumes = None
+statsQueue = None
+
+def initReplica(volumes, queue):
+    global sharedVolumes, statsQueue
+    sharedVolumes = volumes
+    statsQueue = queue
+
+# island statistics of a replica. Monomers are not counted as islands
+def islandStats(sim):
+    sim.islands.sync(sim.full_depo_list)
+    area = sim.box_x * sim.box_z / 100.0
+    islands = sim.islands.numIslands()
+    return {"islands": islands, "monomers": sim.islands.numMonomers(), "density": islands / area, "meanSize": sim.islands.meanSize()}
+
+# run one replica in its own directory
+def runReplica(job):
+    replica, seed, baseDir, replicaDir, params = job
+    start = time.time()
+    result = {"replica": replica, "seed": seed, "dir": replicaDir, "status": 0}
+
+    # input files are copied so the replica directory can be rerun by hand
+    if not os.path.exists(replicaDir):
+        os.makedirs(replicaDir)
+    for name in ["lattice.dat", "lkmcInput.IN", "input.IN"]:
+        if os.path.isfile(os.path.join(baseDir, name)):
+            shutil.copy(os.path.join(baseDir, name), replicaDir)
+
+    stdout = sys.stdout
+    sys.stdout = open(os.path.join(replicaDir, "log.txt"), "a")
+    sim = None
+    try:
+        sim = Engine.Simulation(params=params, workDir=replicaDir, volumes=sharedVolumes)
+        sim.setup()
+        sim.initialDepositions()
+        while sim.CurrentStep < (params.total_steps + 1):
+            sim.step()
+            if (sim.CurrentStep-1) % params.ensembleStatsEvery == 0:
+                stats = islandStats(sim)
+                stats.update({"replica": replica, "step": sim.CurrentStep-1, "time": sim.Time, "adatoms": len(sim.full_depo_list)})
+                statsQueue.put(stats)
+        sim.writeVolumes(sim.volumes)
+        sim.finish()
+        result.update(islandStats(sim))
+        result["steps"] = sim.CurrentStep-1
+        result["time"] = sim.Time
+    except SystemExit:
+        # the engine exits on fatal errors, keep the rest of the ensemble running
+        result["status"] = 1
+        if sim is not None:
+            sim.flushStats()
+    finally:
+        # steps are run here rather than by sim.run(), so release the claims of
+        # a replica that died in a search or other replicas wait on them
+        if sim is not None and sim.catalog is not None:
+            sim.catalog.releaseAll()
+        sys.stdout.close()
+        sys.stdout = stdout
+    result["wall"] = time.time() - start
+    return result
+
+# mean and standard deviation of a list
+def meanStd(values):
+    mean = sum(values) / float(len(values))
+    var = sum([(v - mean)**2 for v in values]) / float(len(values))
+    return mean, math.sqrt(var)
+
+# writes each replica record and the ensemble average once all replicas reached a step
+class ensembleStats(object):
+    def __init__(self, statsDir, numReplicas):
+        self.numReplicas = numReplicas
+        self.pending = {}
+        if not os.path.exists(statsDir):
+            os.makedirs(statsDir)
+        self.replicaFile = open(os.path.join(statsDir, "EnsembleReplicas.txt"), "w")
+        self.replicaFile.write("Replica, Step, Time, No. Adatoms, No. Islands, Island density (nm^-2), Mean island size, Monomers\n")
+        self.meanFile = open(os.path.join(statsDir, "Ensemble.txt"), "w")
+        self.meanFile.write("Step, Replicas, Mean time, Mean island density (nm^-2), Std island density, Mean island size, Mean monomers\n")
+
+    def add(self, stats):
+        self.replicaFile.write("%d,%d,%e,%d,%d,%f,%f,%d\n" % (stats["replica"], stats["step"], stats["time"], stats["adatoms"],
+                                                           stats["islands"], stats["density"], stats["meanSize"], stats["monomers"]))
+        self.replicaFile.flush()
+        step = stats["step"]
+        self.pending.setdefault(step, []).append(stats)
+        if len(self.pending[step]) == self.numReplicas:
+            self.writeMean(step)
+
+    def writeMean(self, step):
+        records = self.pending.pop(step)
+        meanTime = sum([r["time"] for r in records]) / len(records)
+        density, densityStd = meanStd([r["density"] for r in records])
+        meanSize = sum([r["meanSize"] for r in records]) / len(records)
+        monomers = sum([r["monomers"] for r in records]) / float(len(records))
+        self.meanFile.write("%d,%d,%e,%f,%f,%f,%f\n" % (step, len(records), meanTime, density, densityStd, meanSize, monomers))
+        self.meanFile.flush()
+
+    # steps not reached by every replica (eg. a replica failed) are averaged over the rest
+    def close(self):
+        for step in sorted(self.pending):
+            self.writeMean(step)
+        self.replicaFile.close()
+        self.meanFile.close()
+
+# add transitions found by the replicas to the shared catalog
+def mergeCatalog(volumes, replicaVolumes):
+    added = 0
+    for hashkey in replicaVolumes:
+        if hashkey not in volumes:
+            volumes[hashkey] = replicaVolumes[hashkey]
+            added += 1
+            continue
+        vol = volumes[hashkey]
+        for direc in replicaVolumes[hashkey].directions:
+            vol.addDirection(direc)
+        for finalKey in replicaVolumes[hashkey].finalKeys:
+            if finalKey not in vol.finalKeys:
+                vol.finalKeys[finalKey] = replicaVolumes[hashkey].finalKeys[finalKey]
+                added += 1
+    return added
+
+def runEnsemble(baseDir=None):
+    if baseDir is None:
+        baseDir = os.getcwd()
+    baseDir = os.path.abspath(baseDir)
+    params = Parameters.getInput(os.path.join(baseDir, "input.IN"))
+    numReplicas = params.ensembleReplicas
+    numProcesses = params.ensembleProcesses
+    if numProcesses < 1:
+        numProcesses = multiprocessing.cpu_count()
+    numProcesses = min(numProcesses, numReplicas)
+
+    baseSeed = params.randomSeed
+    if baseSeed < 0:
+        baseSeed = int(time.time())
+
+    # read the catalog once, workers get it on fork
+    catalog = Engine.Simulation(params=params, workDir=baseDir)
+    volumes = catalog.readVolumes({})
+
+    print "="*80
+    print "Ensemble of %d replicas on %d processes" % (numReplicas, numProcesses)
+    print "Volumes in catalog: ", len(volumes)
+    print "Seeds: %d-%d" % (baseSeed, baseSeed + numReplicas - 1)
+    print "="*80
+    sys.stdout.flush()
+
+    jobs = []
+    for replica in xrange(numReplicas):
+        replicaDir = os.path.join(baseDir, "Replica" + str(replica))
+        replicaParams = copy.copy(params)
+        replicaParams.randomSeed = baseSeed + replica
+        if params.jobStatus == 'CNTIN' and not os.path.isdir(os.path.join(replicaDir, "Output")):
+            replicaParams.jobStatus = 'BEGIN'
+        jobs.append((replica, replicaParams.randomSeed, baseDir, replicaDir, replicaParams))
+
+    queue = multiprocessing.Queue()
+    stats = ensembleStats(os.path.join(baseDir, "Stats"), numReplicas)
+    pool = multiprocessing.Pool(numProcesses, initReplica, (volumes, queue))
+    results = pool.map_async(runReplica, jobs)
+    pool.close()
+
+    # stream replica stats while the pool is running
+    while 1:
+        try:
+            stats.add(queue.get(timeout=1))
+        except Queue.Empty:
+            if results.ready():
+                break
+    while 1:
+        try:
+            stats.add(queue.get(timeout=1))
+        except Queue.Empty:
+            break
+    pool.join()
+    stats.close()
+
+    # merge new transitions from each replica back into the shared catalog
+    added = 0
+    for result in results.get():
+        replicaCatalog = Engine.Simulation(params=params, workDir=result["dir"])
+        added += mergeCatalog(volumes, replicaCatalog.readVolumes({}))
+    catalog.writeVolumes(volumes)
+
+    for result in results.get():
+        if result["status"]:
+            print "Replica %d (seed %d): FAILED, see %s" % (result["replica"], result["seed"], os.path.join(result["dir"], "log.txt"))
+        else:
+            print "Replica %d (seed %d): %d steps, time %e, %d islands (%.4f nm^-2), wall %.1f s" % (result["replica"], result["seed"],
+                    result["steps"], result["time"], result["islands"], result["density"], result["wall"])
+    print "New volumes/transitions added to catalog: ", added
+    print "="*80
+    return results.get()
+
+if __name__ == "__main__":
+    runEnsemble()
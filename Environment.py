@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Local environment module.
+
+Fast lattice KMC lookups. The environment of an adatom is every atom
+within graphRad plus the longest hop of the adatom, found with a cell
+list and stored as a string of species and integer offsets (x and z in
+grid points, y in 0.01 A steps of the rounded heights), so float noise in
+the positions can not change it. Everything the adaptive path works out
+for an adatom (its volume hashkey, the final hashkey and validity of each
+hop and whether a new deposit relaxes away from its lattice site) only
+depends on this environment, so it is saved and looked up afterwards.
+
+The hashkeys are worked out from float positions by LKMC and can still
+differ between copies of the same environment, so a saved volume or final
+hashkey, or whether a deposit stayed on its site, is only looked up once it
+has been worked out again and found the same (confirmations), and an
+environment that gave two different values is never looked up. Runs with fastMode can still take a
+different path from runs without it where an environment is looked up
+that would have given another hashkey.
+
+"""
+
+import math
+import numpy as np
+
+# times a saved value has to be found again before it is looked up
+confirmations = 1
+
+# all hops used in the transition searches (in plane, down and up steps)
+hopVectors = [[2,0,0],[1,0,-1],[-1,0,-1],[1,0,1],[-1,0,1],[-2,0,0],
+              [4,-1,0],[2,-1,-2],[-2,-1,-2],[2,-1,2],[-2,-1,2],[-4,-1,0],
+              [4,1,0],[2,1,-2],[-2,1,-2],[2,1,2],[-2,1,2],[-4,1,0]]
+
+def maxHopDistance(params):
+    maxHop = 0.0
+    for hop in hopVectors:
+        dist = math.sqrt((hop[0]*params.x_grid_dist)**2 + (hop[1]*params.y_grid_dist2)**2 + (hop[2]*params.z_grid_dist)**2)
+        maxHop = max(maxHop, dist)
+    return maxHop
+
+class environmentTable(object):
+    def __init__(self, params, box_x, box_z):
+        self.box_x = box_x
+        self.box_z = box_z
+        self.radius = params.graphRad + maxHopDistance(params)
+        self.grid = np.asarray([params.x_grid_dist, 0.01, params.z_grid_dist], dtype=np.float64)
+        self.specieIds = {}
+
+        # cells in the x,z plane at least radius wide
+        self.ncx = max(1, int(box_x / self.radius))
+        self.ncz = max(1, int(box_z / self.radius))
+        self.cellx = box_x / self.ncx
+        self.cellz = box_z / self.ncz
+        self.cells = {}
+        self.pos = None
+        self.specie = None
+
+        # lookup tables: key -> [value, times found again]
+        self.volumes = {}
+        self.finals = {}
+        self.stableDepo = {}
+        # keys that gave different values
+        self.conflicts = set()
+        self.numConflicts = 0
+
+    # build cell list for a lattice (flat positions list and species list)
+    def build(self, lattice_positions, specie_list):
+        self.pos = np.asarray(lattice_positions, dtype=np.float64).reshape(-1, 3)
+        self.specie = np.asarray([self.specieIds.setdefault(s, len(self.specieIds)) for s in specie_list], dtype=np.int64)
+        cx = np.floor(self.pos[:,0] / self.cellx).astype(np.int64) % self.ncx
+        cz = np.floor(self.pos[:,2] / self.cellz).astype(np.int64) % self.ncz
+        cellId = cx * self.ncz + cz
+        order = np.argsort(cellId, kind='mergesort')
+        bounds = np.searchsorted(cellId[order], np.arange(self.ncx * self.ncz + 1))
+        self.cells = {}
+        for c in xrange(self.ncx * self.ncz):
+            if bounds[c+1] > bounds[c]:
+                self.cells[c] = order[bounds[c]:bounds[c+1]]
+
+    # atoms in the cells surrounding a point
+    def candidates(self, x, z):
+        cx = int(math.floor(x / self.cellx)) % self.ncx
+        cz = int(math.floor(z / self.cellz)) % self.ncz
+        cellIds = set()
+        for i in (-1, 0, 1):
+            for k in (-1, 0, 1):
+                cellIds.add(((cx + i) % self.ncx) * self.ncz + (cz + k) % self.ncz)
+        found = [self.cells[c] for c in cellIds if c in self.cells]
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(found)
+
+    # signature of the environment around a point
+    def signature(self, x, y, z):
+        index = self.candidates(x, z)
+        sep = self.pos[index] - np.array([x, y, z])
+        sep[:,0] -= self.box_x * np.round(sep[:,0] / self.box_x)
+        sep[:,2] -= self.box_z * np.round(sep[:,2] / self.box_z)
+        offsets = np.empty((len(index), 3), dtype=np.int64)
+        offsets[:,0] = np.rint(sep[:,0] / self.grid[0])
+        offsets[:,1] = np.rint(self.pos[index,1] * 100) - int(round(y * 100))
+        offsets[:,2] = np.rint(sep[:,2] / self.grid[2])
+        # distances from the integer offsets, the same for every copy of the environment
+        dist = offsets * self.grid
+        inside = np.einsum('ij,ij->i', dist, dist) < self.radius * self.radius
+        env = np.column_stack((self.specie[index[inside]], offsets[inside]))
+        env = env[np.lexsort(env.T[::-1])]
+        return env.tostring()
+
+    # saved value of a key in a table once it was confirmed (found, value)
+    def lookup(self, table, key):
+        entry = table.get(key)
+        if entry is None or entry[1] < confirmations:
+            return False, None
+        return True, entry[0]
+
+    # save a worked out value, or confirm or reject the saved one. Returns
+    # True if the value is not the saved one
+    def store(self, table, key, value):
+        if key in self.conflicts:
+            return False
+        entry = table.get(key)
+        if entry is None:
+            table[key] = [value, 0]
+        elif entry[0] == value:
+            entry[1] += 1
+        else:
+            del table[key]
+            self.conflicts.add(key)
+            self.numConflicts += 1
+            return True
+        return False
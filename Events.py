@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Event store module.
+
+The events of a step in parallel arrays: rate, atom, final grid position
+and barrier, with a mask of the events that can still be chosen. Rates and
+barriers that are "None", None or not numbers are stored as NaN when the
+store is built, so selection and statistics are array operations without
+per event type checks. Sums are cumulative sums in event order, so they
+are the same as summing the event list in a loop.
+
+An event is [rate, atom, final position, barrier(, reverse barrier)]. The
+final position is [x, y, z], ['Depo'] for a deposition or ['Island'] for
+an island escape, and superbasin events have a tuple of atoms and a list of
+final positions. These have atom -1 and/or NaN final positions in the
+arrays and are read back from the original records.
+
+"""
+
+import numpy as np
+
+# float value of a rate or barrier (NaN if there is none)
+def toFloat(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+# float array of rates or barriers (NaN where there is none)
+def toFloatArray(values):
+    values = np.array(values, dtype=object)
+    values[(values == None) | (values == 'None')] = np.nan
+    try:
+        return values.astype(np.float64)
+    except (TypeError, ValueError):
+        return np.array([toFloat(value) for value in values], dtype=np.float64)
+
+# grid position of a single atom event (NaN for depositions, island escapes and superbasins)
+def finalPosition(final):
+    if len(final) == 3 and not isinstance(final[0], (list, str)):
+        return final
+    return (np.nan, np.nan, np.nan)
+
+class eventStore(object):
+    def __init__(self, event_list=None):
+        self.events = []
+        self.rate = np.zeros(0, dtype=np.float64)
+        self.atom = np.zeros(0, dtype=np.int64)
+        self.finalPos = np.zeros((0, 3), dtype=np.float64)
+        self.barrier = np.zeros(0, dtype=np.float64)
+        self.valid = np.zeros(0, dtype=bool)
+        if event_list:
+            self.extend(event_list)
+
+    def extend(self, event_list):
+        rate = toFloatArray([event[0] for event in event_list])
+        barrier = toFloatArray([event[3] for event in event_list])
+        atom = np.array([-1 if isinstance(event[1], tuple) else event[1] for event in event_list], dtype=np.int64)
+        finalPos = np.array([finalPosition(event[2]) for event in event_list], dtype=np.float64).reshape(-1, 3)
+
+        self.events.extend(event_list)
+        self.rate = np.concatenate((self.rate, rate))
+        self.atom = np.concatenate((self.atom, atom))
+        self.finalPos = np.vstack((self.finalPos, finalPos))
+        self.barrier = np.concatenate((self.barrier, barrier))
+        # events without a rate (NaN) are never chosen
+        self.valid = np.concatenate((self.valid, np.nan_to_num(rate) > 0))
+
+    def append(self, event):
+        self.extend([event])
+
+    # the event (or events, an index array) can not be chosen any more
+    def invalidate(self, i):
+        self.valid[i] = False
+
+    # valid events of an atom
+    def atomEvents(self, atom):
+        return np.nonzero(self.valid & (self.atom == atom))[0]
+
+    def cumulative(self):
+        return np.cumsum(np.where(self.valid, self.rate, 0.0))
+
+    def total(self):
+        if not len(self.rate):
+            return 0.0
+        return float(self.cumulative()[-1])
+
+    # index of the event at fraction u of the cumulative rate and the total rate
+    def select(self, u):
+        cumulative = self.cumulative()
+        total = float(cumulative[-1])
+        i = int(np.searchsorted(cumulative, u * total, side='right'))
+        if i >= len(cumulative) or not self.valid[i]:
+            # u * total at the very end: last valid event
+            i = int(np.nonzero(self.valid)[0][-1])
+        return i, total
+
+    def numValid(self):
+        return int(np.count_nonzero(self.valid))
+
+    # mean rate and barrier over all events (events without a barrier count as 0)
+    def meanRate(self):
+        if not len(self.rate):
+            return 0.0
+        return float(np.cumsum(np.where(np.isnan(self.rate), 0.0, self.rate))[-1]) / len(self.rate)
+
+    def meanBarrier(self):
+        if not len(self.barrier):
+            return 0.0
+        return float(np.cumsum(np.where(np.isnan(self.barrier), 0.0, self.barrier))[-1]) / len(self.barrier)
+
+    def __getitem__(self, i):
+        return self.events[i]
+
+    def __len__(self):
+        return len(self.events)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Flicker detection module.
+
+Keeps the most recent (atom, position) visits in a ring buffer and counts
+how many KMC steps return an atom to a position it was in a short time
+ago. Optionally raises the basin barrier tolerance when one atom keeps
+oscillating so the flicker is absorbed by the basin method.
+
+"""
+
+import collections
+
+class flickerDetector(object):
+    def __init__(self, params):
+        self.params = params
+        self.visits = collections.deque(maxlen=max(1, params.flickerWindow))
+        self.counts = {}
+        self.atomRevisits = {}
+        self.windowRevisits = 0
+        self.totalSteps = 0
+        self.totalRevisits = 0
+        self.lastRevisit = False
+        self.numTuned = 0
+
+    # add a visit to the ring buffer. Returns True if it is a revisit
+    def record(self, atom, pos):
+        visit = (atom, round(pos[0],2), round(pos[1],2), round(pos[2],2))
+        revisit = self.counts.get(visit, 0) > 0
+
+        # drop oldest visit if buffer is full
+        if len(self.visits) == self.visits.maxlen:
+            old, oldRevisit = self.visits.popleft()
+            self.counts[old] -= 1
+            if not self.counts[old]:
+                del self.counts[old]
+            if oldRevisit:
+                self.windowRevisits -= 1
+                self.atomRevisits[old[0]] -= 1
+                if not self.atomRevisits[old[0]]:
+                    del self.atomRevisits[old[0]]
+
+        self.visits.append((visit, revisit))
+        self.counts[visit] = self.counts.get(visit, 0) + 1
+        if revisit:
+            self.windowRevisits += 1
+            self.totalRevisits += 1
+            self.atomRevisits[atom] = self.atomRevisits.get(atom, 0) + 1
+        return revisit
+
+    # record all atoms moved in a KMC step
+    def recordStep(self, atoms, positions):
+        revisit = False
+        for k in range(len(atoms)):
+            if self.record(atoms[k], positions[k]):
+                revisit = True
+        self.totalSteps += 1
+        self.lastRevisit = revisit
+        return revisit
+
+    # fraction of visits in the window that were revisits
+    def windowFraction(self):
+        if not len(self.visits):
+            return 0.0
+        return float(self.windowRevisits) / len(self.visits)
+
+    # atom with the most revisits in the window
+    def worstAtom(self):
+        worst = None
+        worstCount = 0
+        for atom in self.atomRevisits:
+            if self.atomRevisits[atom] > worstCount:
+                worst = atom
+                worstCount = self.atomRevisits[atom]
+        return worst, worstCount
+
+    # raise basinBarrierTol if one atom is oscillating. Returns True if changed
+    def tune(self):
+        params = self.params
+        if not params.flickerAutoTune:
+            return False
+        if len(self.visits) < self.visits.maxlen:
+            return False
+
+        worst, worstCount = self.worstAtom()
+        if float(worstCount) / len(self.visits) < params.flickerRevisitFrac:
+            return False
+
+        # never let internal basin transitions reach the escaping tolerance
+        maxTol = min(params.flickerTolMax, params.basinBarrierSubTol)
+        if params.basinBarrierTol >= maxTol:
+            return False
+        params.basinBarrierTol = min(params.basinBarrierTol + params.flickerTolStep, maxTol)
+        self.numTuned += 1
+
+        # start a new window so the change is judged on fresh visits
+        self.reset()
+        return True
+
+    def reset(self):
+        self.visits.clear()
+        self.counts = {}
+        self.atomRevisits = {}
+        self.windowRevisits = 0
+
+    # one line report for the KMC log
+    def report(self):
+        worst, worstCount = self.worstAtom()
+        text = "Flicker: revisits in window %d/%d (%.2f)" % (self.windowRevisits, len(self.visits), self.windowFraction())
+        if worst is not None:
+            text += ", worst atom %s (%d)" % (str(worst), worstCount)
+        return text
+
+    # line for Flicker.txt
+    def statsLine(self, step):
+        return "%d,%d,%d,%d,%f,%d,%f\n" % (step, int(self.lastRevisit), self.windowRevisits, len(self.visits),
+                                           self.windowFraction(), self.totalRevisits, self.params.basinBarrierTol)
+
+def statsHeader():
+    return "Step, Revisit, Window revisits, Window size, Window fraction, Total revisits, basinBarrierTol\n"
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Island escape table module.
+
+Escape rates of a single adatom from the top of a compact 2D island,
+read from the results table written by Scripts/mean.py --sweep. An adatom
+alone on top of an island of a tabulated size is given one coarse grained
+escape event with this rate instead of a basin over every site on the
+island. Islands within islandSizeTol (fraction of the number of atoms) of
+a tabulated size use the rate of the closest size. The hop and escape
+rates of the two basin state types the table was made with are kept to
+pick where the adatom leaves the island. The walks over the sites on top of
+islands are kept by local environment, so the exit sites of an island
+shape are only found and solved for once.
+
+"""
+
+import numpy as np
+
+try:
+    import scipy.sparse
+    import scipy.sparse.linalg
+except ImportError:
+    scipy = None
+
+# probability of a walk from site 0 to leave from each site (None if it can not leave).
+# neighbours are the in plane neighbour sites of each site, hopRate and escape the
+# hop rate to each neighbour and the escape rate of each site
+def exitDistribution(neighbours, hopRate, escape):
+    numSites = len(neighbours)
+    outRate = np.asarray([len(near) for near in neighbours]) * hopRate + escape
+    rows = np.asarray([i for i in xrange(numSites) for j in neighbours[i]], dtype=np.int64)
+    cols = np.asarray([j for near in neighbours for j in near], dtype=np.int64)
+    hopProb = (hopRate / outRate)[rows]
+    start_vec = np.zeros(numSites, dtype=np.float64)
+    start_vec[0] = 1.0
+
+    # expected visits v from the start site solve (I - T)^T v = e_start
+    if scipy is not None:
+        T = scipy.sparse.csr_matrix((hopProb, (rows, cols)), shape=(numSites, numSites))
+        matrix = (scipy.sparse.identity(numSites, format='csr') - T).T.tocsc()
+        visits = np.atleast_1d(scipy.sparse.linalg.spsolve(matrix, start_vec))
+    else:
+        T = np.zeros((numSites, numSites), dtype=np.float64)
+        np.add.at(T, (rows, cols), hopProb)
+        try:
+            visits = np.linalg.solve((np.identity(numSites) - T).T, start_vec)
+        except np.linalg.LinAlgError:
+            return None
+    if not np.all(np.isfinite(visits)):
+        return None
+    leave = np.clip(visits * escape / outRate, 0.0, None)
+    if not np.sum(leave) > 0:
+        return None
+    return leave
+
+class escapeTable(object):
+    def __init__(self, path, sizeTol):
+        self.sizeTol = sizeTol
+        rates = {}
+        rateSet = None
+        rateSets = set()
+        infile = open(path, 'r')
+        infile.readline()
+        for line in infile:
+            line = [v.strip() for v in line.split(',')]
+            if len(line) < 9:
+                continue
+            # tables of several rate sets: the first set in the file is used
+            rateSets.add(tuple(line[3:7]))
+            if rateSet is None:
+                rateSet = tuple(line[3:7])
+            if tuple(line[3:7]) == rateSet:
+                rates[int(line[2])] = float(line[8])
+        infile.close()
+
+        if len(rateSets) > 1:
+            print "Warning: island table has more than one set of rates, using ", rateSet
+        self.rateSet = rateSet
+        # type1_rate, type2_rate, type1_escapeRate, type2_escapeRate
+        self.hopRates = None
+        self.escapeRates = None
+        if rateSet is not None:
+            self.hopRates = (float(rateSet[0]), float(rateSet[1]))
+            self.escapeRates = (float(rateSet[2]), float(rateSet[3]))
+        self.sizes = np.asarray(sorted(rates), dtype=np.int64)
+        # walks on top of islands by local environment (see Engine.islandEscapeTarget)
+        self.walks = {}
+        self.rates = np.asarray([rates[s] for s in self.sizes], dtype=np.float64)
+
+    # escape rate for an island of numAtoms atoms (None = no size class close enough)
+    def rate(self, numAtoms):
+        if not len(self.sizes):
+            return None
+        i = int(np.argmin(np.abs(self.sizes - numAtoms)))
+        if abs(self.sizes[i] - numAtoms) > self.sizeTol * numAtoms:
+            return None
+        return self.rates[i]
+
+    def __len__(self):
+        return len(self.sizes)
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Island module.
+
+Islands of adatoms closer than bondDist, kept up to date as the run goes.
+The adatom positions are compared with the last ones at each sync and the
+bonds of the atoms that changed are updated. Bonded atoms are joined by
+union by size (the smaller island is relabelled, so the island of an atom
+is a single lookup) and the island an atom left is split again by a search
+over its own members only. Island count, size histogram and membership
+are read without going over the lattice, and are written to
+Stats/Islands.txt and Stats/IslandMembers.txt.
+
+"""
+
+import numpy as np
+
+class islandTracker(object):
+    def __init__(self, params, box_x, box_z):
+        self.bondDist = params.bondDist
+        self.cell = np.asarray([box_x, params.maxHeight, box_z], dtype=np.float64)
+
+        self.positions = []
+        self.pos = np.zeros((0, 3), dtype=np.float64)
+        self.present = np.zeros(0, dtype=bool)
+        # bonded adatoms of each adatom
+        self.bonds = []
+        # island (label) of each adatom and members of each island
+        self.root = []
+        self.members = {}
+        # number of islands of each size (monomers are size 1)
+        self.sizeCounts = {}
+
+    # minimum image distances of points from a position
+    def distances(self, points, centre):
+        sep = points - centre
+        sep -= self.cell * np.round(sep / self.cell)
+        return np.sqrt(np.einsum('ij,ij->i', sep, sep))
+
+    def addIsland(self, label, members):
+        self.members[label] = members
+        for i in members:
+            self.root[i] = label
+        self.sizeCounts[len(members)] = self.sizeCounts.get(len(members), 0) + 1
+
+    def removeIsland(self, label):
+        members = self.members.pop(label)
+        self.sizeCounts[len(members)] -= 1
+        if not self.sizeCounts[len(members)]:
+            del self.sizeCounts[len(members)]
+        return members
+
+    # join the islands of two atoms, relabelling the smaller one
+    def union(self, i, j):
+        a = self.root[i]
+        b = self.root[j]
+        if a == b:
+            return
+        if len(self.members[a]) < len(self.members[b]):
+            a, b = b, a
+        small = self.removeIsland(b)
+        large = self.removeIsland(a)
+        self.addIsland(a, large + small)
+
+    # split an island into its connected parts (atoms in detached are left out)
+    def split(self, label, detached):
+        members = [i for i in self.removeIsland(label) if i not in detached]
+        seen = set()
+        for i in members:
+            if i in seen:
+                continue
+            seen.add(i)
+            part = [i]
+            queue = [i]
+            while queue:
+                k = queue.pop()
+                for n in self.bonds[k]:
+                    if n not in seen:
+                        seen.add(n)
+                        part.append(n)
+                        queue.append(n)
+            self.addIsland(i, part)
+
+    # update bonds and islands of atoms that moved, were added or removed since the last call
+    def sync(self, full_depo_list):
+        positions = [(float(atom[1]), float(atom[2]), float(atom[3])) for atom in full_depo_list]
+        num = max(len(positions), len(self.positions))
+        if len(self.present) < num:
+            extra = num - len(self.present)
+            self.pos = np.vstack((self.pos, np.zeros((extra, 3), dtype=np.float64)))
+            self.present = np.concatenate((self.present, np.zeros(extra, dtype=bool)))
+            self.bonds.extend([set() for k in xrange(extra)])
+            self.root.extend([None] * extra)
+
+        changed = []
+        for i in xrange(num):
+            old = self.positions[i] if i < len(self.positions) else None
+            new = positions[i] if i < len(positions) else None
+            if old != new:
+                changed.append((i, old, new))
+        if not changed:
+            return 0
+
+        # detach atoms from their old sites and split the islands they left
+        detached = set()
+        left = set()
+        for i, old, new in changed:
+            if old is None:
+                continue
+            for n in self.bonds[i]:
+                self.bonds[n].discard(i)
+            self.bonds[i] = set()
+            self.present[i] = False
+            left.add(self.root[i])
+            detached.add(i)
+        for label in left:
+            self.split(label, detached)
+        for i in detached:
+            self.root[i] = None
+
+        # attach atoms at their new sites
+        for i, old, new in changed:
+            if new is None:
+                continue
+            near = self.present & (self.distances(self.pos, np.asarray(new, dtype=np.float64)) < self.bondDist)
+            self.pos[i] = new
+            self.present[i] = True
+            self.addIsland(i, [i])
+            for n in np.nonzero(near)[0]:
+                self.bonds[i].add(n)
+                self.bonds[n].add(i)
+                self.union(i, n)
+
+        self.positions = positions
+        return len(changed)
+
+    # label of the island of an adatom
+    def island(self, i):
+        return self.root[i]
+
+    def islandSize(self, i):
+        return len(self.members[self.root[i]])
+
+    # number of islands of 2 or more adatoms
+    def numIslands(self):
+        return len(self.members) - self.sizeCounts.get(1, 0)
+
+    def numMonomers(self):
+        return self.sizeCounts.get(1, 0)
+
+    def meanSize(self):
+        islands = self.numIslands()
+        if not islands:
+            return 0.0
+        return float(len(self.positions) - self.numMonomers()) / islands
+
+    def largest(self):
+        if not self.sizeCounts:
+            return 0
+        return max(self.sizeCounts)
+
+    def statsLine(self, step, time):
+        histogram = " ".join(["%d:%d" % (size, self.sizeCounts[size]) for size in sorted(self.sizeCounts)])
+        return "%d,%e,%d,%d,%d,%f,%d,%s\n" % (step, time, len(self.positions), self.numIslands(), self.numMonomers(),
+                                              self.meanSize(), self.largest(), histogram)
+
+    # island label of each adatom
+    def membersLine(self, step):
+        return "%d,%s\n" % (step, " ".join([str(self.root[i]) for i in xrange(len(self.positions))]))
+
+def statsHeader():
+    return "Step, Time, No. Adatoms, No. Islands, Monomers, Mean island size, Largest island, Size histogram (size:count)\n"
+
+def membersHeader():
+    return "Step, Island of each adatom\n"
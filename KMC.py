@@ -4,2032 +4,16 @@
 # TODO: make more general for any hexagonal surface
 # Assumes PBC in x and z directions and deposition in y
 # grid positions start at (0,0,0)
-
+#
+# The simulation itself lives in Engine.py. Run from a directory containing
+# lattice.dat, input.IN and lkmcInput.IN
 
 # copyright Adam Lloyd 2016
-import time
-import sys
-import os
-import shutil
-import random
-import math
-import copy
-from decimal import Decimal
-import numpy as np
-from LKMC import Graphs, NEB, Lattice, Minimise, Input, Vectors
-import Parameters
-
-# Defined some useful functions
-
-# classes used in hashkey calculation from LKMC
-class lattice(object):
-    def __init__(self):
-        self.pos = []
-        self.specie = []
-        self.cellDims = [box_x,0,0,0,box_y,0,0,0,box_z]
-        self.specieList = ['O_','Zn','Ag']
-        self.NAtoms = 0
-        self.charge = 0
-
-class LKMCParams(object):
-    def __init__(self):
-        self.graphRadius = 5.9
-
-class volume(object):
-    def __init__(self):
-        self.hashkey = None
-        self.directions = []
-        self.finalKeys = {}
-        self.pos = []
-        self.specie = []
-        self.volumeAtoms = []
-
-    def addTrans(self, direction, finalKey, barrier, rate, reverseBarrier):
-        if direction not in self.directions:
-            self.directions.append(direction)
-
-        if finalKey not in self.finalKeys:
-            newKey = key()
-            newKey.barrier = barrier
-            newKey.rate = rate
-            newKey.reverseBarrier = reverseBarrier
-            # newKey.hashkey = finalKey
-            self.finalKeys[finalKey] = newKey
-
-    def addDirection(self, direction):
-        if direction not in self.directions:
-            self.directions.append(direction)
-
-    # store new volume atoms in memory
-    def addVolumeAtoms(self, volumeAtoms,lattice_positions,specie_list):
-        if len(self.volumeAtoms) < 1:
-            for i in xrange(len(lattice_positions)):
-                self.pos.append(lattice_positions[i])
-            for i in xrange(len(specie_list)):
-                self.specie.append(specie_list[i])
-            for i in xrange(len(volumeAtoms)):
-                self.volumeAtoms.append(volumeAtoms)
-
-class key(object):
-    def __init__(self):
-        self.barrier = None
-        self.rate = None
-        self.reverseBarrier = None
-        # self.hashkey = None
-
-# transition object for the basin
-class basinTransition(object):
-    def __init__(self,finPos,rate,barrier,reverseBarrier):
-        self.finPos = finPos
-        self.rate = rate
-        self.barrier = barrier
-        self.reverseBarrier = reverseBarrier
-        self.finRef = None
-
-# basinPosition object for basinPos list (similar to basin DV in LAKMC)
-class basinPosition(object):
-    def __init__(self):
-        self.transitionList = []
-        self.explored = 0
-        self.iniPos = None
-
-# basin type object
-class basin(object):
-    def __init__(self):
-        self.atomNum = None
-        self.currentPos = None
-        self.positions = []
-        self.basinPos = []
-        self.exploredList = []
-        # self.transitionList = []
-        self.connectivity = None
-
-    # add transition to basin
-    def addTransition(self,iniPos,finPos,rate,barrier,reverseBarrier):
-        # is this an internal event or escaping?
-        if barrier < params.basinBarrierSubTol and reverseBarrier < params.basinBarrierSubTol:
-            if barrier < params.basinBarrierTol or reverseBarrier < params.basinBarrierTol:
-                flag = 0
-            else:
-                flag = 1
-        else:
-            flag = 1
-
-        # if PBCdistance(iniPos[0],iniPos[1],iniPos[2],finPos[0],finPos[1],finPos[2]) < params.basinDistTol:
-        #     return
-
-        createFlagF = 1
-        i=0
-        # check if initial position exists in the basin
-        for i in range(len(self.basinPos)):
-            pos = self.basinPos[i].iniPos
-            if PBCdistance(iniPos[0],iniPos[1],iniPos[2],pos[0],pos[1],pos[2]) < params.basinDistTol:
-                createFlagF = 0
-                break
-        # if does not exist, add
-        if createFlagF:
-            i = len(self.basinPos)
-            newTrans = basinTransition(finPos,rate,barrier,reverseBarrier)
-            newTrans.finRef = None
-            newPos = basinPosition()
-            newPos.explored = 1
-            newPos.iniPos = iniPos
-            newPos.transitionList.append(newTrans)
-            self.basinPos.append(newPos)
-        else:
-            # check if this transition already exists in the basin
-            createFlagF = 1
-            for trans in self.basinPos[i].transitionList:
-                if PBCdistance(finPos[0],finPos[1],finPos[2],trans.finPos[0],trans.finPos[1],trans.finPos[2]) < params.basinDistTol:
-                    createFlagF = 0
-            # if not, add transition
-            if createFlagF:
-                newTrans = basinTransition(finPos,rate,barrier,reverseBarrier)
-                newTrans.finRef = None
-                self.basinPos[i].transitionList.append(newTrans)
-                self.basinPos[i].explored = 1
-
-
-        j=0
-        createFlag = 1
-        finalInBasin = 0
-        # check final position exists in the basin
-        for j in range(len(self.basinPos)):
-            pos = self.basinPos[j].iniPos
-            if PBCdistance(finPos[0],finPos[1],finPos[2],pos[0],pos[1],pos[2]) < params.basinDistTol:
-                createFlag = 0
-                finalInBasin = 1
-                break
-
-        # if does not exist, add
-        if createFlag and not flag:
-            j = len(self.basinPos)
-            revRate = calcRate(reverseBarrier)
-            newTransR = basinTransition(iniPos,revRate,reverseBarrier,barrier)
-            newTransR.finRef = i
-            newPosR = basinPosition()
-            newPosR.explored = 0
-            newPosR.iniPos = finPos
-            newPosR.transitionList.append(newTransR)
-            self.basinPos.append(newPosR)
-            finalInBasin = 1
-
-        elif not createFlag and not flag:
-            # check transition exists in the basin
-            createFlag = 1
-            for trans in self.basinPos[j].transitionList:
-                if PBCdistance(iniPos[0],iniPos[1],iniPos[2],trans.finPos[0],trans.finPos[1],trans.finPos[2]) < params.basinDistTol:
-                    createFlag = 0
-            # add transition if not
-            if createFlag:
-                newTransR = basinTransition(iniPos,rate,reverseBarrier,barrier)
-                newTransR.finRef = i
-                self.basinPos[j].transitionList.append(newTransR)
-
-        elif not createFlag and flag:
-            createFlag = 1
-            for trans in self.basinPos[j].transitionList:
-                if PBCdistance(iniPos[0],iniPos[1],iniPos[2],trans.finPos[0],trans.finPos[1],trans.finPos[2]) < params.basinDistTol:
-                    createFlag = 0
-            # add transition if not
-            if createFlag:
-                newTransR = basinTransition(iniPos,rate,reverseBarrier,barrier)
-                newTransR.finRef = i
-                self.basinPos[j].transitionList.append(newTransR)
-
-        # assign ref to positions
-        if createFlagF and finalInBasin:
-            self.basinPos[i].transitionList[-1].finRef = j
-            # print "Adding transition: ",i,j
-
-            # change previously found escaping transitions to internal
-            for basPos in self.basinPos:
-                for trans in basPos.transitionList:
-                    tPos = trans.finPos
-                    if trans.finRef is None:
-                        if PBCdistance(tPos[0],tPos[1],tPos[2],finPos[0],finPos[1],finPos[2]) < params.basinDistTol:
-                            trans.finRef = j
-                            rate = calcRate(trans.reverseBarrier)
-                            newTransM = basinTransition(basPos.iniPos,rate,trans.reverseBarrier,trans.barrier)
-                            print "MATCH MADE WITH FINAL POS"
-
-    # build connectivity matrix. All elements are transition numbers
-    def buildConnectivity(self):
-        N = len(self.basinPos)
-        self.connectivity = [[[] for i in range(N)] for j in range(N)]
-
-        # create connectivity matrix
-        for i in range(len(self.basinPos)):
-            pos = self.basinPos[i]
-            cPos = self.currentPos
-            if PBCdistance(pos.iniPos[0],pos.iniPos[1],pos.iniPos[2],cPos[0],cPos[1],cPos[2]) < params.basinDistTol:
-                cDV = i
-            for j in range(len(pos.transitionList)):
-                trans = pos.transitionList[j]
-                # if trans.barrier is not None and trans.barrier != 'None':
-                # print trans.barrier, pos.iniPos, trans.finRef
-                # if trans.finRef is not None:
-                #     print self.basinPos[trans.finRef].explored
-                if trans.finRef is not None:
-                    if len(self.connectivity[i][trans.finRef]) == 0:
-                        self.connectivity[i][trans.finRef].append(j)
-                    else:
-                        print "Warning! Two same transitions! State: ", i, "Transitions: ", j, self.connectivity[i][trans.finRef][0]
-                        self.basinReport("Faulty")
-                        sys.exit()
-
-        # check symmetry of matrix
-        for i in range(len(self.connectivity)):
-            for j in range(len(self.connectivity)):
-                if j != i:
-                    if len(self.connectivity[i][j]) != len(self.connectivity[j][i]):
-                        print "Warning! Basin is non-symmetric"
-                        return False
-
-        # print connectivty matrix
-        if len(self.connectivity) > 1:
-            print "Connectivity matrix for atom %d:" % self.atomNum
-            for i in range(N):
-                text = '['
-                for j in range(N):
-                    text += str(len(self.connectivity[i][j])) + ' '
-                text += ']'
-                print text
-                # print self.connectivity[i]
-
-        return True
-        # print "Current DV explored: ", self.basinPos[cDV].explored
-        # explor = []
-        # for i in range(N):
-        #     explor.append(self.basinPos[i].explored)
-        # print "Explored states: ", explor
-
-
-    # check if position is in this basin
-    def thisBasin(self, pos, step):
-        # cPos = self.currentPos
-        # if PBCdistance(cPos[0],cPos[1],cPos[2],pos[0],pos[1],pos[2]) < params.basinDistTol:
-        #     return True
-
-        for basPos in self.basinPos:
-            bPos = basPos.iniPos
-            if PBCdistance(bPos[0],bPos[1],bPos[2],pos[0],pos[1],pos[2]) < params.basinDistTol:
-                # self.basinReport(step)
-                basPos.explored = 1
-                return True
-
-        # for basPos in self.basinPos:
-        #     for trans in basPos.transitionList:
-        #         tPos = trans.finPos
-        #         if PBCdistance(tPos[0],tPos[1],tPos[2],pos[0],pos[1],pos[2]) < params.basinDistTol:
-        #             # print "pos: ", pos, "CurrentPos: ", self.currentPos
-        #             print "MATCH MADE WITH FINAL POS"
-        #             # self.basinReport(step)
-
-        return False
-
-    # calculate mean rates within the basin
-    def meanRate(self):
-        result = []
-        barriers = []
-        stateNum = 0
-        stateMapping = []
-
-        # find all fully explored basin states
-        for i in range(len(self.basinPos)):
-            if self.basinPos[i].explored:
-                stateNum +=1
-                stateMapping.append(i)
-
-        if stateNum == 1:
-            return result
-
-        transMatrix = np.zeros([stateNum, stateNum])
-        tao1 = np.zeros(stateNum, np.float64)
-        transNum = np.zeros(stateNum,dtype=np.int)
-
-        # find tao for each state
-        for j in range(stateNum):
-            transNum[j] = len(self.basinPos[stateMapping[j]].transitionList)
-            sum = 0.0
-            for i in range(transNum[j]):
-                sum += self.basinPos[stateMapping[j]].transitionList[i].rate
-                barriers.append(self.basinPos[stateMapping[j]].transitionList[i].barrier)
-            if sum == 0.0:
-                print "Error: Sum of rates for State %d (%d trans) is zero!"%(j, transNum[j])
-                return result
-            tao1[j] = 1 / sum
-
-        # find all trans matrix entries
-        for i in range(stateNum):
-            for j in range(stateNum):
-                for k in self.connectivity[stateMapping[i]][stateMapping[j]]:
-                    transMatrix[j][i] += tao1[i] * self.basinPos[stateMapping[i]].transitionList[k].rate
-
-        occupVect0 = np.zeros(stateNum)
-
-        # set original entry point of basin as initial state
-        occupVect0[0] = 1.0
-
-        matrix2bInv = np.matrix(np.identity(stateNum)) - transMatrix
-
-        # invert matrix
-        try:
-            occupVect = np.linalg.inv(matrix2bInv)
-        except np.linalg.LinAlgError:
-            print "Error: Transition Matrix not invertible."
-            return None
-        occupVect = np.inner(occupVect, occupVect0)
-        occupVect = np.squeeze(np.asarray(occupVect))
-
-        tao = np.zeros(stateNum, np.float64)
-        taoSum = 0.0
-        for j in range(stateNum):
-            tao[j] = tao1[j] * occupVect[j]
-            taoSum += tao[j]
-
-
-        negRate = False
-        # find new rates
-        for i in range(stateNum):
-            for j in range(transNum[i]):
-                finalDV = self.basinPos[stateMapping[i]].transitionList[j].finRef
-                if finalDV is not None:
-                    if self.basinPos[finalDV].explored:
-                        result.append(0.0)
-                    else:
-                        localRate = tao[i]/taoSum*self.basinPos[stateMapping[i]].transitionList[j].rate
-                        result.append(localRate)
-                else:
-                    localRate = tao[i]/taoSum*self.basinPos[stateMapping[i]].transitionList[j].rate
-                    result.append(localRate)
-                    if localRate < 0.0:
-                        print "WARNING: got a negative mean rate!! %r"%localRate
-                        negRate = True
-
-        # print "Mean rate results: ", result
-        # print "barriers: ", barriers
-
-        if not negRate:
-            return result
-        else:
-            return None
-
-    # if basin is being deleted, create normal event list
-    def addUnchangedEvents(self,atomNum):
-        event_list = []
-        # barriers = []
-        if len(self.basinPos):
-            for trans in self.basinPos[0].transitionList:
-                event = [trans.rate,atomNum,trans.finPos,trans.barrier]
-                event_list.append(event)
-                # barriers.append(trans.barrier)
-        # print barriers
-        return event_list
-
-    # update rates within the basin and create new events
-    def addChangedEvents(self,atomNum):
-        event_list = []
-        result = self.meanRate()
-        keepBasin = True
-
-        if result is not None:
-            if len(result):
-                k=0
-                for i in range(len(self.basinPos)):
-                    if self.basinPos[i].explored:
-                        for j in range(len(self.basinPos[i].transitionList)):
-                            trans = self.basinPos[i].transitionList[j]
-                            newRate = result[k]
-                            event = [newRate,atomNum,trans.finPos,trans.barrier]
-                            event_list.append(event)
-                            k += 1
-                    # else:
-                    #     for j in range(len(self.basinPos[i].transitionList)):
-                    #         trans = self.basinPos[i].transitionList[j]
-                    #         event = [trans.rate,atomNum,trans.finPos,trans.barrier]
-                    #         event_list.append(event)
-                if len(result) > k:
-                    print "WARNING, not all mean rates are assigned!", len(result), k
-            else:
-                for i in range(len(self.basinPos)):
-                    if self.basinPos[i].explored:
-                        for j in range(len(self.basinPos[i].transitionList)):
-                            trans = self.basinPos[i].transitionList[j]
-                            event = [trans.rate,atomNum,trans.finPos,trans.barrier]
-                            event_list.append(event)
-        else:
-            keepBasin = False
-            for i in range(len(self.basinPos)):
-                if self.basinPos[i].explored:
-                    for j in range(len(self.basinPos[i].transitionList)):
-                        trans = self.basinPos[i].transitionList[j]
-                        event = [trans.rate,atomNum,trans.finPos,trans.barrier]
-                        event_list.append(event)
-        return event_list, keepBasin
-
-    # optional report output for debugging
-    def basinReport(self,index):
-
-        # create a report file
-        report = basin_dir + "/BasinAtom"+str(self.atomNum)+"Step"+str(index) + '.txt'
-        outf = open(report, 'w')
-        outf.write("Number of states in basin: "+str(len(self.basinPos))+"\n\n")
-
-        # write out connectivity matrix
-        for i in range(len(self.connectivity)):
-            outf.write(str(self.connectivity[i])+"\n")
-        outf.write("\n")
-
-        # write all states and transitions
-        for i in range(len(self.basinPos)):
-            outf.write("State " + str(i)+  "\t position " + str(self.basinPos[i].iniPos) + "\t Explored " + str(self.basinPos[i].explored)+ "\n")
-            for j in range(len(self.basinPos[i].transitionList)):
-                trans = self.basinPos[i].transitionList[j]
-                outf.write("\t Trans " + str(j) + "\t Barrier " + str(trans.barrier)+"\t RevBarrier " + str(trans.reverseBarrier)+ "\t final position " + str(trans.finPos)+"\t finalState "+str(trans.finRef)+ "\n")
-            outf.write("\n")
-        outf.close()
-
-# calculate the rate of an event given barrier height (Arrhenius eq.)
-def calcRate(barrier):
-    rate = params.prefactor * math.exp(- barrier / (params.boltzmann * params.temperature))
-    return rate
-
-# find barrier height given rate
-def findBarrierHeight(rate):
-    barrier = round(- math.log(rate / params.prefactor) * (params.boltzmann * params.temperature),6)
-    return barrier
-
-# read lattice header at input filename
-def readLatticeHeader(input_lattice_path):
-    file = open(input_lattice_path, 'r')
-    latline = file.readline()
-    line = latline.split()
-    atoms = int(line[0])
-    latline = file.readline()
-    line = latline.split()
-    box_x = float(line[0])
-    box_y = float(line[1])
-    box_z = float(line[2])
-    file.close()
-    return atoms,box_x,box_y,box_z
-
-# read in lattice file
-def readLattice(lattice,m):
-    if (os.path.isfile(lattice)):
-        input_file = open(lattice, 'r')
-        for i in range(0,m):
-            line = input_file.readline()
-        latticeLines = []
-        while 1:
-            latline = input_file.readline()
-            line = latline.split()
-            if len(line) < 5:
-                break
-            latticeLines.append([str(line[0]),float(line[1]),float(line[2]),float(line[3]),float(line[4])])
-            #latticeLines.append(line)
-        input_file.close()
-        return latticeLines
-    else:
-        print "Cannot read lattice"
-        print input_lattice_path
-        sys.exit()
-    input_file.close()
-
-# function reads of lattice, and finds the maximum y-coordinate
-def findMaxHeight(input_lattice_path):
-    max_height = 0.0
-    if (os.path.isfile(input_lattice_path)):
-        input_file = open(input_lattice_path, 'r')
-        for i in range(0,2):
-            line = input_file.readline()
-            #print i, line
-        while 1:
-            line = input_file.readline()
-            if not line: break
-            #print line
-            line = line.split()
-            if(float(line[2]) > max_height):
-                max_height = float(line[2])
-        input_file.close()
-        return max_height
-    else:
-        print " Input file not found in findMaxHeight(input_filename) function"
-        print input_lattice_path
-        sys.exit()
-
-# find max height and species of max atom at a point in the x,z plane
-def findMaxHeightAtPoints(surface_lattice, full_depo_index, x, z):
-    max_height = 0.0
-    max_height_atom = None
-    full_lattice = surface_lattice + full_depo_index
-
-    # check each x value in lattice against given x
-    for i in xrange(len(full_lattice)):
-        line = full_lattice[i]
-        new_x = round(PBCpos(float(line[1])-x,box_x),2)
-        if new_x == 0 or new_x == round(box_x,2):
-            new_z = round(PBCpos(float(line[3])-z,box_z),2)
-
-            # if x value is the same, check z value
-            if new_z == 0 or new_z == round(box_z,2):
-                if(float(line[2]) > max_height):
-                    max_height = float(line[2])
-                    max_height_atom = str(line[0])
-
-    del full_lattice
-    return max_height, max_height_atom
-
-
-# find how many grid points in each direction
-def gridSize(box_x,box_y,box_z):
-    #assuming first atom starts at 0,0,0
-    x_grid_points = round(box_x/params.x_grid_dist)
-    y_grid_points = round(box_y/params.y_grid_dist)
-    z_grid_points = round(box_z/params.z_grid_dist)
-
-    box_x = x_grid_points * params.x_grid_dist
-    box_z = z_grid_points * params.z_grid_dist
-
-    return x_grid_points,y_grid_points,z_grid_points, box_x, box_z
-
-# find random position in x,z plane to deposit
-def deposition_xz(box_x,box_z,x_grid_dist,z_grid_dist):
-	x_random = random.random()
-	z_random = random.random()
-
-    # check if row is even or odd
-	x_coordinate = round((x_random * box_x)/x_grid_dist)
-	even = x_coordinate % 2
-
-	# case where deposit on far edge
-	if x_coordinate == x_grid_points:
-		even = 0
-
-	x_2 = x_coordinate * x_grid_dist
-	x_coordinate = PBCpos(x_coordinate * x_grid_dist, box_x)
-
-
-	z_coordinate = round((z_random * box_z * 0.5)/z_grid_dist)
-	z_coordinate = PBCpos(z_coordinate * z_grid_dist * 2 + even * z_grid_dist, box_z)
-
-	return x_coordinate ,z_coordinate
-
-# returns height of and species of neighbour atoms
-def deposition_y(full_depo_index,x_coord,z_coord):
-    # max height at single point
-    #y_max_0, atom_below = findMaxHeight_at_point(lattice_path,x_coord,z_coord)
-    y_max_0, atom_below = findMaxHeightAtPoints(surface_lattice, full_depo_index,x_coord, z_coord)
-
-    # check height at surrounding points
-    neighbour_pos, neighbour_species = findNeighbours(x_coord,z_coord,atom_below,y_max_0,full_depo_index)
-    neighbour_heights = []
-
-    i = 0
-    while i < 7:
-    	neighbour_heights.append(round(neighbour_pos[i*3+1],6))
-    	i += 1
-#     print neighbour_heights
-
-
-    # find max height of local points
-    y_max = max(neighbour_heights)
-
-    # add y dist to max height found
-    y_coordinate = round(y_max,6)
-    return y_coordinate, neighbour_species, neighbour_heights
-
-# do deposition
-def deposition(box_x,box_z,x_grid_dist,z_grid_dist,full_depo_index,natoms):
-    x_coord, z_coord = deposition_xz(box_x,box_z,x_grid_dist,z_grid_dist)
-    y_coord, nlist, hlist = deposition_y(full_depo_index,x_coord,z_coord)
-
-    # Potential Deposition erros for ZnO-Ag system
-    maxAg = []
-    nAg = nlist.count('Ag')
-    nH = hlist.count(y_coord)
-    if nlist[0] != 'Ag':
-        for i in xrange(len(nlist)):
-            if nlist[i] == 'Ag' and hlist[i] == y_coord:
-                maxAg.append(i)
-                if len(maxAg) == 3:
-                    print "landed on top of 3 Ag atoms"
-
-    # check if y_coord is at least surface height
-    if (y_coord < initial_surface_height):
-        print "ERROR: y height is less than initial surface height", y_coord
-        sys.exit()
-        return
-
-    # if y_coord is initial surface height
-    if round(y_coord - initial_surface_height,2) == 0:
-        y_coord += params.y_grid_dist
-
-    # if y_coord > initial surface height
-    else:
-        y_coord += params.y_grid_dist2
-
-
-    # print "Trying to deposit %s atom at %f, %f, %f" % (params.atom_species, x_coord, y_coord, z_coord)
-    #print nlist
-    if len(maxAg) != 3:
-        for x in nlist:
-            if x == 'Ag':
-                # print "deposited near Ag, redo deposition"
-                return None
-        if nlist[0] == 'O_':
-        	# print "deposited on top of surface Oxygen: unstable position"
-        	return None
-        # if nlist[0] == 'Zn':
-        # 	# print "deposited on top of surface Zinc: unstable position"
-        # 	return None
-
-
-    natoms += 1
-
-    print "SUCCESS: Number of atoms: ", natoms
-
-    deposition_list = [params.atom_species, x_coord, y_coord, z_coord, natoms]
-    return deposition_list
-
-# allign minimised lattice back to lattice positions
-def setToLattice(full_depo_index):
-    for i in range(len(full_depo_index)):
-        atom = full_depo_index[i]
-        try:
-            new_x = round(atom[1]/params.x_grid_dist)*params.x_grid_dist
-        except TypeError:
-            print "full_depo_list[i]: ", atom
-        new_z = round(atom[3]/params.z_grid_dist)*params.z_grid_dist
-        y_compare = initial_surface_height + params.y_grid_dist
-        new_y = round((atom[2]-y_compare)/params.y_grid_dist2)
-        new_y = new_y*params.y_grid_dist2 + y_compare
-
-        full_depo_index[i][1] = new_x
-        full_depo_index[i][2] = new_y
-        full_depo_index[i][3] = new_z
-
-    return full_depo_index
-
-
-# find PBC position in one direction
-def PBCpos(x,box_x):
-	x = round(x,6)
-	box_x = round(box_x,6)
-	if x >= box_x:
-		while x >= box_x:
-			x = x - box_x
-	if x < 0:
-		while x < 0:
-			x = x + box_x
-	return x
-
-# find distance between 2 points inlcuding PBC
-def PBCdistance(x1,y1,z1,x2,y2,z2):
-
-    pos1 = np.empty(3, np.float64)
-    pos1[0] = x1
-    pos1[1] = y1
-    pos1[2] = z1
-
-    pos2 = np.empty(3, np.float64)
-    pos2[0] = x2
-    pos2[1] = y2
-    pos2[2] = z2
-
-    cellDims = np.asarray([box_x,0,0,0,params.maxHeight,0,0,0,box_z],dtype=np.float64)
-    sepVec = Vectors.separationVector(pos1,pos2,cellDims)
-    mag = Vectors.magnitude(sepVec)
-
-    return mag
-
-# find x and z of the 6 positions surrounding points (1-6)
-def findNeighbours(x,z,atom_below,y_max_0,full_depo_index):
-    n_x = PBCpos(x + 2 * params.x_grid_dist,box_x)
-    n_z = z
-
-    nw_x = PBCpos(x + 1 * params.x_grid_dist,box_x)
-    nw_z = PBCpos(z - 1 * params.z_grid_dist,box_z)
-
-    sw_x = PBCpos(x - 1 * params.x_grid_dist,box_x)
-    sw_z = PBCpos(z - 1 * params.z_grid_dist,box_z)
-
-    s_x = PBCpos(x - 2 * params.x_grid_dist,box_x)
-    s_z = z
-
-    se_x = PBCpos(x - 1 * params.x_grid_dist,box_x)
-    se_z = PBCpos(z + 1 * params.z_grid_dist,box_z)
-
-    ne_x = PBCpos(x + 1 * params.x_grid_dist,box_x)
-    ne_z = PBCpos(z + 1 * params.z_grid_dist,box_z)
-
-    n_y, n = findMaxHeightAtPoints(surface_lattice,full_depo_index,n_x,n_z)
-    nw_y, nw = findMaxHeightAtPoints(surface_lattice,full_depo_index,nw_x,nw_z)
-    sw_y, sw = findMaxHeightAtPoints(surface_lattice,full_depo_index,sw_x,sw_z)
-    s_y, s = findMaxHeightAtPoints(surface_lattice,full_depo_index,s_x,s_z)
-    se_y, se = findMaxHeightAtPoints(surface_lattice,full_depo_index,se_x,se_z)
-    ne_y, ne = findMaxHeightAtPoints(surface_lattice,full_depo_index,ne_x,ne_z)
-
-    neighbour_species = [atom_below,n,nw,sw,ne,se,s]
-    #print neighbour_species
-    neighbour_pos = [x,y_max_0,z,n_x,n_y,n_z,nw_x,nw_y,nw_z,sw_x,sw_y,sw_z,s_x,s_y,s_z,se_x,se_y,se_z,ne_x,ne_y,ne_z]
-
-    return neighbour_pos, neighbour_species
-
-# find list of second neighbours (1-12)
-# returns coordinates and species
-def findSecondNeighbours(x,z,full_depo_index):
-    nb2 = []
-    nb2_species = []
-
-    # find x and z coordinates
-    nx = PBCpos(x + 4 * params.x_grid_dist,box_x)
-    nz = z
-    nb2.append([nx, nz])
-    nx = PBCpos(x + 3 * params.x_grid_dist,box_x)
-    nz = PBCpos(z - 1 * params.z_grid_dist,box_z)
-    nb2.append([nx, nz])
-    nx = PBCpos(x + 2 * params.x_grid_dist,box_x)
-    nz = PBCpos(z - 2 * params.z_grid_dist,box_z)
-    nb2.append([nx, nz])
-    nx = x
-    nz = PBCpos(z - 2 * params.z_grid_dist,box_z)
-    nb2.append([nx, nz])
-    nx = PBCpos(x - 2 * params.x_grid_dist,box_x)
-    nz = PBCpos(z - 2 * params.z_grid_dist,box_z)
-    nb2.append([nx, nz])
-    nx = PBCpos(x - 3 * params.x_grid_dist,box_x)
-    nz = PBCpos(z - 1 * params.z_grid_dist,box_z)
-    nb2.append([nx, nz])
-
-    nx = PBCpos(x - 4 * params.x_grid_dist,box_x)
-    nz = z
-    nb2.append([nx, nz])
-    nx = PBCpos(x - 3 * params.x_grid_dist,box_x)
-    nz = PBCpos(z + 1 * params.z_grid_dist,box_z)
-    nb2.append([nx, nz])
-    nx = PBCpos(x - 2 * params.x_grid_dist,box_x)
-    nz = PBCpos(z + 2 * params.z_grid_dist,box_z)
-    nb2.append([nx, nz])
-    nx = x
-    nz = PBCpos(z + 2 * params.z_grid_dist,box_z)
-    nb2.append([nx, nz])
-    nx = PBCpos(x + 2 * params.x_grid_dist,box_x)
-    nz = PBCpos(z + 2 * params.z_grid_dist,box_z)
-    nb2.append([nx, nz])
-    nx = PBCpos(x + 3 * params.x_grid_dist,box_x)
-    nz = PBCpos(z + 1 * params.z_grid_dist,box_z)
-    nb2.append([nx, nz])
-
-    # find y and species
-    for k in xrange(len(nb2)):
-        nx, nz = nb2[k]
-        ny, species = findMaxHeightAtPoints(surface_lattice,full_depo_index,nx,nz)
-        nb2[k] = [nx, ny, nz]
-        nb2_species.append(species)
-
-    return nb2, nb2_species
-
-# write out new lattice
-def writeLattice(index,full_depo_index,surface_lattice,natoms,time,barrier):
-    new_lattice = output_dir_name_prefac + '/KMC' + str(index) + '.dat'
-    outfile = open(new_lattice, 'w')
-    line = str(natoms)
-    outfile.write(line + '\n')
-    line = str(time)
-    outfile.write(line + '\n')
-    line = str(barrier)
-    outfile.write(line + '\n')
-
-    outfile.write(str(box_x)+'  '+str(box_y)+'  '+str(box_z)+'  ' + '\n')
-
-    # write surface lattice first (does not change)
-    for j in xrange(len(surface_lattice)):
-        #outfile.write(str(latticeLines[x]))
-        outfile.write(str(surface_lattice[j][0]) + '   ' + str(surface_lattice[j][1])+ '    '+str(surface_lattice[j][2])+ '   '+ str(surface_lattice[j][3])+'  '+str(surface_lattice[j][4])+'\n')
-
-    # write all deposited atom positions
-    for i in xrange(len(full_depo_index)):
-    	line = full_depo_index[i]
-    	outfile.write(str(params.atom_species) + '	' + str(line[1]) + '   ' + str(line[2])+ '    '+ str(line[3]) + '   ' +  '0' + '\n')
-    outfile.close
-
-    return
-
-# write temp lattice.dat file
-def writeLatticeLKMC(index,full_depo_index,surface_lattice,natoms):
-    new_lattice = NEB_dir_name_prefac + str(index) + '.dat'
-    outfile = open(new_lattice, 'w')
-    line = str(natoms)
-    outfile.write(line + '\n')
-    outfile.write(str(box_x)+'  '+str(30)+'  '+str(box_z)+'  ' + '\n')
-
-    # write surface lattice first (does not change)
-    for j in xrange(len(surface_lattice)):
-        #outfile.write(str(latticeLines[x]))
-        outfile.write(str(surface_lattice[j][0]) + '   ' + str(surface_lattice[j][1])+ '    '+str(surface_lattice[j][2])+ '   '+ str(surface_lattice[j][3])+'  '+str(surface_lattice[j][4])+'\n')
-
-    # write all deposited atom positions
-    for i in xrange(len(full_depo_index)):
-    	line = full_depo_index[i]
-    	outfile.write(str(params.atom_species) + '	' + str(line[1]) + '   ' + str(line[2])+ '    '+ str(line[3]) + '   ' +  '0' + '\n')
-    outfile.close
-
-    return
-
-# move event
-def moveAtom(depo_list, dir_vector ,full_depo_index):
-    moved_list = None
-    x = depo_list[1]
-    y = depo_list[2]
-    z = depo_list[3]
-
-    x = round(PBCpos(x+dir_vector[0]*params.x_grid_dist,box_x),6)
-    y = round(y+dir_vector[1]*params.y_grid_dist2,6)
-    z = round(PBCpos(z+dir_vector[2]*params.z_grid_dist,box_z),6)
-
-    y2, neighbour_species, neighbour_heights = deposition_y(full_depo_index,x,z)
-    #print neighbour_species
-
-    # check if large up/down move has taken place. Then check for tripod of atoms
-    if (np.abs(dir_vector[0])+np.abs(dir_vector[1])+np.abs(dir_vector[2])) > 3:
-        if round(y-y2,2) > (params.y_grid_dist2*1.1):
-            nH = neighbour_heights.count(round(y2,6))
-            if nH < 3:
-                #print "Moved to 'floating' unstable position", nH
-                return None
-    else:
-        nH = neighbour_heights.count(round(y-params.y_grid_dist2,6))
-        if nH < 3:
-            nH = neighbour_heights.count(round(y-params.y_grid_dist,6))
-            if nH < 3:
-                #print "Moved to 'floating' unstable position", nH
-                return None
-
-
-
-    # check for move fails
-    if round(y-params.y_grid_dist-neighbour_heights[0],2) == 0:
-        #print "Moved to unstable position", neighbour_species[0]
-        # print x,y,z
-        return None
-    if round(y-params.y_grid_dist2-neighbour_heights[0],2) == 0:
-        #print "Moved to unstable position", neighbour_species[0]
-        # print x,y,z
-        return None
-
-    if round(y-neighbour_heights[0],2) == 0:
-        #print "Moved into existing atom!"
-        # print x,y,z
-        return None
-
-    AdNeighbours = 0
-    for i in xrange(len(neighbour_species)):
-            if round(neighbour_heights[0]-y,2) == 0:
-                AdNeighbours += 1
-
-    # if near neighbours exist in plane fail move
-    if dir_vector[1] == 0:
-        # will always be at least 1 as it includes self pre-move
-        if AdNeighbours > 1:
-            #print "Moved too close to existing atoms"
-            # print x,y,z
-            return None
-    else:
-        if AdNeighbours > 0:
-            #print "Moved too close to existing atoms"
-            # print x,y,z
-            return None
-
-    new_full_list = copy.deepcopy(full_depo_list)
-    new_full_list.pop((depo_list[4]-len(surface_lattice)-1))
-
-
-    for atom in new_full_list:
-        x2 = atom[1]
-        y2 = atom[2]
-        z2 = atom[3]
-        if y > initial_surface_height:
-            if PBCdistance(x,y,z,x2,y2,z2) < params.checkMoveDist:
-                del new_full_list
-                return None
-
-    #print "Moved atom"
-    del new_full_list
-    moved_list = [params.atom_species,x,y,z,depo_list[4]]
-
-    return moved_list
-
-
-# pick an event from an event list
-def selectEvent(event_list,Time):
-    # add on deposition event
-
-    # print "Choose event from event list:"
-    # print event_list
-
-    # create cumulative function
-    R = []
-    TotalRate = 0
-    TotalBarrier = 0
-    num = len(event_list)
-    for i in xrange(num):
-        if event_list[i][0] > 0 and event_list[i][0] != 'None':
-            try:
-                TotalRate += event_list[i][0]
-                TotalBarrier += float(event_list[i][3])
-                R.append([TotalRate,event_list[i][1],event_list[i][2],event_list[i][3]])
-            except TypeError:
-                print "WARNING! Type error in selectEvent: "
-                print "Rate: ",  event_list[i][0], "\tBarrier: ", event_list[i][3]
-                sys.exit()
-            except ValueError:
-                print "WARNING! Value error in selectEvent: "
-                print "Rate: ",  event_list[i][0], "\tBarrier: ", event_list[i][3]
-                sys.exit()
-    TotalRate
-
-    numEvents = len(event_list)
-
-
-    # Debug
-    #print R
-
-    # find random number
-    u = random.random()
-    Q = u*TotalRate
-    #print "DEBUG: random number: ", Q
-
-    # choose event
-    for i in xrange(len(R)):
-        if Q < R[i][0]:
-            chosenRate = R[i][0]
-            chosenEvent = R[i][2]
-            chosenAtom = R[i][1]
-            chosenBarrier = R[i][3]
-            print "Chosen event:",R[i][2],"on atom:",R[i][1]
-            print "Rate:", R[i][0]
-            break
-
-    # increase time
-    u = random.random()
-    Time += (np.log(1/u)/TotalRate)*1E15
-
-    print "Number of events to choose from: ", len(event_list)
-    return chosenRate, chosenEvent, chosenAtom, Time, chosenBarrier, i
-
-# check that chosen move is reasonable
-def checkMove(chosenEvent, chosenAtom, full_depo_list):
-    new_full_list = copy.deepcopy(full_depo_list)
-    new_full_list.pop(chosenAtom)
-
-    for atom in new_full_list:
-        x = atom[1]
-        y = atom[2]
-        z = atom[3]
-        if y > initial_surface_height:
-            if PBCdistance(x,y,z,chosenEvent[0],chosenEvent[1],chosenEvent[2]) < params.checkMoveDist:
-                return False
-
-    return True
-
-# calcuate list of atoms with graph radius of defect
-def findVolumeAtoms(lattice_pos,x,y,z):
-    volume_atoms = []
-    countBonds = 0
-
-    for i in xrange(len(lattice_pos)/3):
-        # find distance squared between 2 atoms
-        dist = PBCdistance(lattice_pos[3*i],lattice_pos[3*i+1],lattice_pos[3*i+2],x,y,z)
-        if dist < params.graphRad:
-            volume_atoms.append(i)
-            if dist < params.bondDist:
-                countBonds += 1
-    if countBonds > params.maxCoordNum:
-        return volume_atoms, True
-    else:
-        return volume_atoms, False
-
-# calculate hashkey for a defect
-def hashkey(lattice_positions,specie_list,volumeAtoms):
-    # set up parameters for hashkey calculation
-
-    #lattice.pos = np.asarray(lattice_positions,dtype=np.float64)
-    Lattice1 = lattice()
-    Lattice1.pos = []
-    species = []
-    for i in volumeAtoms:
-        Lattice1.pos.append(lattice_positions[3*i])
-        Lattice1.pos.append(lattice_positions[3*i+1])
-        Lattice1.pos.append(lattice_positions[3*i+2])
-        species.append(specie_list[i])
-    Lattice1.pos = np.asarray(Lattice1.pos,dtype=np.float64)
-
-    for i in xrange(len(species)):
-        if species[i] == 'O_':
-            species[i] = 0
-        elif species[i] == 'Zn':
-            species[i] = 1
-        elif species[i] == 'Ag':
-            species[i] = 2
-
-    for i in xrange(len(specie_list)):
-        if specie_list[i] == 'O_':
-            specie_list[i] = 0
-        elif specie_list[i] == 'Zn':
-            specie_list[i] = 1
-        elif specie_list[i] == 'Ag':
-            specie_list[i] = 2
-        # else:
-        #     specie_list[i] = 3
-
-    # set lattice object values for hashkey
-    Lattice1.specie = np.asarray(species,np.int32)
-    Lattice1.cellDims = np.asarray([box_x,0,0,0,params.maxHeight,0,0,0,box_z],dtype=np.float64)
-    Lattice1.specieList = np.asarray(['O_','Zn','Ag'],dtype=np.character)
-    Lattice1.pos = np.around(Lattice1.pos,decimals = 5)
-
-    volumeAtoms = np.arange(len(volumeAtoms),dtype=np.int32)
-
-    LKMCParams.graphRadius = params.graphRad
-
-    # get hashkey
-    hashkey = Graphs.getHashKeyForAVolume(LKMCParams,volumeAtoms,Lattice1)
-
-    del Lattice1
-    return hashkey
-
-
-# save defect volume to compare against
-# - stores lattice + volume atom indices
-def SaveVolume(hashkey,volumeAtoms,lattice_positions,specie_list):
-    VolumeFile = Volumes_dir + '/'+str(hashkey)+'.txt'
-
-    # check if file already exist for hashkey
-    if (os.path.isfile(VolumeFile)):
-        return
-
-    else:
-        outfile = open(VolumeFile, 'w')
-        outfile.write(str(len(specie_list))+'\n')
-        for i in xrange(len(specie_list)):
-            outfile.write(str(specie_list[i]) + '   ' + str(lattice_positions[3*i])+ '    '+str(lattice_positions[3*i+1])+ '   '+ str(lattice_positions[3*i+2])+'\n')
-        # print "length of volume atoms is", len(volumeAtoms)
-        for j in xrange(len(volumeAtoms)):
-            outfile.write(str(volumeAtoms[j]) +'\n')
-        outfile.close()
-        return
-
-
-# find the final hashkey for a given defect and transition
-def findFinal(dir_vector,atom_index,full_depo_index,surface_positions):
-    adatom_positions = []
-    adatom_specie = []
-    full_depo = copy.deepcopy(full_depo_index)
-    depo_list = full_depo[atom_index]
-
-    # move atom to final position
-    moved_list = moveAtom(depo_list, dir_vector ,full_depo)
-
-    if moved_list:
-        full_depo[atom_index] = moved_list
-        depo_list = full_depo[atom_index]
-
-        for i in xrange(len(full_depo)):
-            adatom_specie.append(full_depo[i][0])
-            adatom_positions.append(full_depo[i][1])
-            adatom_positions.append(full_depo[i][2])
-            adatom_positions.append(full_depo[i][3])
-        lattice_positions = surface_positions + adatom_positions
-        specie_list = surface_specie + adatom_specie
-
-        # find atoms in defect volume
-        volumeAtoms, _ = findVolumeAtoms(lattice_positions,depo_list[1],depo_list[2],depo_list[3])
-
-        # create hashkey
-        final_key = hashkey(lattice_positions,specie_list,volumeAtoms)
-
-        #writeLattice(1000,full_depo_index,surface_lattice,401,0,0)
-        del full_depo
-        return final_key, [float(depo_list[1]),float(depo_list[2]),float(depo_list[3])]
-    else:
-        return None, None
-
-# create the list of possible events
-def createEventsList(full_depo_index,surface_lattice, volumes, fullyCoordList, failedCount=0):
-
-    event_list = []
-    adatom_positions = []
-    adatom_specie = []
-    initialMinimised = False
-
-    # move to global parameters
-    trans_dir = initial_dir + '/Transitions/'
-
-    # add all deposited atoms to list of positions + species
-    for i in xrange(len(full_depo_list)):
-        adatom_specie.append(full_depo_list[i][0])
-        adatom_positions.append(full_depo_list[i][1])
-        adatom_positions.append(full_depo_list[i][2])
-        adatom_positions.append(full_depo_list[i][3])
-    lattice_positions = surface_positions + adatom_positions
-    specie_list = surface_specie + adatom_specie
-
-    # find transitions for each adatom
-    for j in xrange(len(full_depo_list)):
-
-        if j in fullyCoordList:
-            continue
-
-        final_keys = []
-        directions = []
-        depo_list = full_depo_list[j]
-        hashkeyExists = []
-
-        # find atoms in volume
-        volumeAtoms, fullyCoord = findVolumeAtoms(lattice_positions,depo_list[1],depo_list[2],depo_list[3])
-
-        if fullyCoord:
-            fullyCoordList.append(j)
-            continue
-
-        # create hashkey for each adatom + store volume
-        vol_key = hashkey(lattice_positions,specie_list,volumeAtoms)
-        # print vol_key
-        try:
-            vol = volumes[vol_key]
-        except KeyError:
-            volumes[vol_key] = volume()
-            vol = volumes[vol_key]
-
-        if params.useBasin:
-            basinExists = False
-            iniPos = [depo_list[1],depo_list[2],depo_list[3]]
-            # check if a basin exists for this state
-            for whichB in range(len(basinList)):
-                basId = basinList[whichB]
-                if basId.atomNum == j:
-                    if basId.thisBasin(iniPos,CurrentStep):
-                        bas = basId
-                        bas.currentPos = iniPos
-                        basinExists = True
-                        keepBasin = True
-                        break
-
-            if not basinExists:
-                bas = basin()
-                bas.atomNum = j
-                bas.currentPos = iniPos
-                basinList.append(bas)
-                whichB = len(basinList)-1
-                keepBasin = False
-
-
-
-        if len(vol.directions) != 0:
-            vol = volumes[vol_key]
-            # vol.hashkey = vol_key
-            #print "Finding trans for atom ", j, vol_key
-            for direc in vol.directions:
-                final_key, final_pos = findFinal(direc,j,full_depo_index,surface_positions)
-                if final_key is not None:
-                    try:
-                        trans = vol.finalKeys[final_key]
-                        if params.useBasin:
-                            if trans.barrier is not None and trans.barrier != 'None':
-                                bas.addTransition(iniPos,final_pos,trans.rate,trans.barrier,trans.reverseBarrier)
-                                if trans.barrier < params.basinBarrierTol or trans.reverseBarrier < params.basinBarrierTol:
-                                    keepBasin = True
-                        else:
-                            trans.hashkey = final_key
-                            event_list.append([trans.rate,j,final_pos,trans.barrier,trans.reverseBarrier])
-                    except KeyError:
-                        result, vol = singleNEB(direc,full_depo_index,surface_lattice,j,vol_key,final_key,natoms,vol,initialMinimised)
-                        if result == 1:
-                            if failedCount == 0:
-                                # attempt to reset to lattice
-                                print "Attempting to reset to lattice positions post minimisation. Restarting create events list."
-                                new_full_depo = readLattice(NEB_dir_name_prefac+"/Reset.dat",len(surface_lattice)+2)
-                                print new_full_depo[0]
-                                newfulldepo = setToLattice(new_full_depo)
-                                full_depo_index = []
-                                for q in range(len(newfulldepo)):
-                                    nfp = newfulldepo[q]
-                                    full_depo_index.append([nfp[0],nfp[1],nfp[2],nfp[3],len(surface_lattice)+q])
-                                print full_depo_index[0]
-                                event_list, volumes, fullyCoordList, full_depo_index = createEventsList(full_depo_index, surface_lattice, volumes, fullyCoordList, failedCount=1)
-                                break
-                            else:
-                                sys.exit()
-                        if result:
-                            if result[2] != "None":
-                                rate = calcRate(float(result[2]))
-                                if params.useBasin:
-                                    bas.addTransition(iniPos,final_pos,rate,float(result[2]),vol.finalKeys[final_key].reverseBarrier)
-                                    if float(result[2]) < params.basinBarrierTol or vol.finalKeys[final_key].reverseBarrier < params.basinBarrierTol:
-                                        keepBasin = True
-                                else:
-                                    event_list.append([rate,j,final_pos,float(result[2]),vol.finalKeys[final_key].reverseBarrier])
-
-
-        else:
-            print "Cannot find volume transitions. Doing searches now ", vol_key
-            # do searches on volume and save to new trans file
-            if params.useBasin:
-                status, result, vol, keepBasin, initialMinimised = autoNEB(full_depo_index,surface_lattice,j,vol_key,natoms,vol,bas)
-            else:
-                status, result, vol, _, initialMinimised = autoNEB(full_depo_index,surface_lattice,j,vol_key,natoms,vol,None)
-            if status:
-                if failedCount == 0:
-                    # attempt to reset to lattice
-                    print "Attempting to reset to lattice positions post minimisation. Restarting create events list."
-                    new_full_depo = readLattice(NEB_dir_name_prefac+"/Reset.dat",len(surface_lattice)+2)
-                    newfulldepo = setToLattice(new_full_depo)
-                    full_depo_index = []
-                    for q in range(len(newfulldepo)):
-                        nfp = newfulldepo[q]
-                        full_depo_index.append([nfp[0],nfp[1],nfp[2],nfp[3],len(surface_lattice)+q])
-                    print full_depo_index[0]
-                    event_list, volumes, fullyCoordList, full_depo_index = createEventsList(full_depo_index, surface_lattice, volumes, fullyCoordList, failedCount=1)
-                    break
-                else:
-                    sys.exit()
-            else:
-                event_list = event_list + result
-                volumes[vol_key] = vol
-
-
-        del volumeAtoms
-
-        # add basin events to events list
-        if params.useBasin:
-            if not keepBasin:
-                events = bas.addUnchangedEvents(j)
-                event_list = event_list + events
-                try:
-                    basinList.pop(whichB)
-                except:
-                    pass
-            else:
-                basinGood = bas.buildConnectivity()
-                if basinGood:
-                    events, keepBasin = bas.addChangedEvents(j)
-                    event_list = event_list + events
-
-                    # remove small basins
-                    if len(bas.basinPos) < 2 or not keepBasin:
-                        basinList.pop(whichB)
-                else:
-                    events = bas.addUnchangedEvents(j)
-                    event_list = event_list + events
-                    basinList.pop(whichB)
-
-    del initialMinimised
-    del lattice_positions
-    del adatom_positions
-
-    return event_list, volumes, fullyCoordList, full_depo_index
-
-# run NEB to find barriers that are not known
-def autoNEB(full_depo_index,surface_lattice,atom_index,hashkey,natoms,vol,bas):
-    print "AUTO NEB", "="*60
-
-    barrier = []
-    final_keys = []
-    results = []
-
-    keepBasin = False
-
-    # create initial lattice
-    writeLatticeLKMC('/initial',full_depo_index,surface_lattice,natoms)
-    ini = Lattice.readLattice(NEB_dir_name_prefac+"/initial.dat")
-    iniMin = copy.deepcopy(ini)
-    iniMin.calcForce(correctTE=1)
-    iniMin.writeLattice(NEB_dir_name_prefac+"/Reset.dat")
-    # print "ini energy:", iniMin.totalEnergy
-
-    # create cell dimensions
-    cellDims = np.asarray([box_x,0,0,0,params.maxHeight,0,0,0,box_z],dtype=np.float64)
-
-    # minimise lattice
-    minimiser = Minimise.getMinimiser(LKMCParams)
-    status = minimiser.run(iniMin)
-    if status:
-        print " Warning: failed to minimise initial lattice"
-        sys.exit()
-
-    # check max movement
-    Index, maxMove, avgMove, Sep = Vectors.maxMovement(ini.pos, iniMin.pos, cellDims)
-
-    if maxMove < params.maxMoveCriteria:
-        #ini.writeLattice("initialMin.dat")
-        full_depo = copy.deepcopy(full_depo_index)
-        depo_list = full_depo[atom_index]
-
-        # check 6 initial directions
-        dir_vector = []
-        dir_vector.append([2,0,0])
-        dir_vector.append([1,0,-1])
-        dir_vector.append([-1,0,-1])
-        dir_vector.append([1,0,1])
-        dir_vector.append([-1,0,1])
-        dir_vector.append([-2,0,0])
-
-        # include down transitions
-        if params.includeDownTrans:
-            # if atom if above first layer
-            atom_height = full_depo_index[atom_index][2]
-            if atom_height > (initial_surface_height + params.y_grid_dist*1.1):
-                print "Adding move down transitions"
-                dir_vector.append([4,-1,0])
-                dir_vector.append([2,-1,-2])
-                dir_vector.append([-2,-1,-2])
-                dir_vector.append([2,-1,2])
-                dir_vector.append([-2,-1,2])
-                dir_vector.append([-4,-1,0])
-
-        # include up transitions
-        if params.includeUpTrans:
-            #check if surrounds atom
-            AdNeighbours = 0
-            nb_pos, nb_species = findSecondNeighbours(full_depo_index[atom_index][1],full_depo_index[atom_index][3],full_depo_index)
-            for j in xrange(len(nb_pos)):
-                if round(nb_pos[j][1] - atom_height,2) == 0:
-                    if nb_species[j] == params.atom_species:
-                        AdNeighbours += 1
-
-            # if 2 or more atoms surround current atom, look at up moves
-            if AdNeighbours > 1:
-                print "Adding move up transitions"
-                dir_vector.append([4,1,0])
-                dir_vector.append([2,1,-2])
-                dir_vector.append([-2,1,-2])
-                dir_vector.append([2,1,2])
-                dir_vector.append([-2,1,2])
-                dir_vector.append([-4,1,0])
-
-
-        for i in xrange(len(dir_vector)):
-            # move atom
-            moved_list = moveAtom(depo_list, dir_vector[i] ,full_depo_index)
-            print "Trying direction: ", dir_vector[i]
-            vol.addDirection(dir_vector[i])
-
-            if moved_list:
-                full_depo[atom_index] = moved_list
-
-                # create initial lattice and Minimise
-                writeLatticeLKMC('/'+str(i),full_depo,surface_lattice,natoms)
-                fin = Lattice.readLattice(NEB_dir_name_prefac+"/" + str(i) +".dat")
-                finMin = copy.deepcopy(fin)
-
-                finMin.calcForce(correctTE=1)
-                # print "fin energy: ", finMin.totalEnergy
-
-                # minimise lattice
-                mini_fin = Minimise.getMinimiser(LKMCParams)
-                status = mini_fin.run(finMin)
-                if status:
-                    continue
-
-                final_key, final_pos = findFinal(dir_vector[i],atom_index,full_depo_index,surface_positions)
-
-                # check that initial and final are different
-                Index, maxMove, avgMove, Sep = Vectors.maxMovement(iniMin.pos, finMin.pos, cellDims)
-                if maxMove < 0.4:
-                    print " difference between ini and fin is too small:", maxMove
-                    barrier = str("None")
-                    results.append([0,atom_index, final_pos, barrier])
-                    vol.addTrans(dir_vector[i], final_key, barrier, 0, str("None"))
-                    continue
-
-                # check max movement
-                Index, maxMove, avgMove, Sep = Vectors.maxMovement(fin.pos, finMin.pos, cellDims)
-                if maxMove < params.maxMoveCriteria:
-                    # run NEB on initial and final lattices
-                    neb = NEB.NEB(LKMCParams)
-                    status = neb.run(iniMin, finMin)
-
-                    if status:
-                        print "WARNING: NEB failed to converge"
-                        print "Try changing parameters in lkmcInput.IN"
-                        barrier = str("None")
-
-                        results.append([0,atom_index, final_pos, barrier])
-                        vol.addTrans(dir_vector[i], final_key, barrier, str("None"),str("None"))
-                        continue
-
-                    neb.barrier = round(neb.barrier,6)
-                    reverseBarrier = round((iniMin.totalEnergy-finMin.totalEnergy)+neb.barrier,6)
-                    print "Reverse barrier: ", reverseBarrier
-
-                    # reverse barrier is too small, transition would immediately come back
-                    if params.reverseBarrierTol is not None:
-                        if reverseBarrier < params.reverseBarrierTol:
-                            barrier = str("None")
-                            results.append([0,atom_index, final_pos, barrier])
-                            vol.addTrans(dir_vector[i], final_key, barrier, str("None"),str("None"))
-                            continue
-
-                    # do not allow any negative barriers
-                    if neb.barrier < 0 or reverseBarrier < 0:
-                        barrier = str("None")
-                        results.append([0,atom_index, final_pos, barrier])
-                        vol.addTrans(dir_vector[i], final_key, barrier, str("None"),str("None"))
-                        continue
-
-                    # find final hashkey
-                    final_key, final_pos = findFinal(dir_vector[i],atom_index,full_depo_index,surface_positions)
-                    rate = calcRate(neb.barrier)
-                    results.append([rate, atom_index, final_pos, neb.barrier])
-                    vol.addTrans(dir_vector[i], final_key, neb.barrier, rate, reverseBarrier)
-
-                    # add result to basin
-                    if params.useBasin:
-                        iniPos = copy.copy(full_depo_index[atom_index])
-                        iniPos.pop(0)
-                        iniPos.pop()
-                        bas.addTransition(iniPos,final_pos,rate,neb.barrier,reverseBarrier)
-                        if neb.barrier < params.basinBarrierTol or reverseBarrier < params.basinBarrierTol :
-                            keepBasin = True
-
-                else:
-                    print "WARNING: maxMove too large in final lattice:", maxMove
-                    barrier = str("None")
-                    results.append([0,atom_index, final_pos, barrier])
-                    vol.addTrans(dir_vector[i], final_key, barrier, 0, str("None"))
-
-            else:
-                barrier = str("None")
-                results.append([0,atom_index, str("None"), barrier])
-
-        if results:
-            print results
-            #write_trans_file(hashkey,results)
-            return 0, results, vol, keepBasin, iniMin
-    else:
-        print "WARNING: maxMove too large in initial lattice: ", maxMove
-        del ini, iniMin
-        #del fin, finMin
-        del Sep
-        return 2, results, vol, keepBasin, False;
-
-    del ini, iniMin
-    #del fin, finMin
-    del Sep
-
-    return 1, results, vol, keepBasin, False;
-
-# do a single NEB and add transition to trans files
-def singleNEB(direction,full_depo_index,surface_lattice,atom_index,hashkey,final_key,natoms,vol,initialMinimised):
-    print "SINGLE NEB", "="*60
-
-    barrier = []
-    final_keys = []
-    results = None
-
-    print natoms
-    # create initial lattice
-
-    if initialMinimised == False:
-        writeLatticeLKMC('/initial',full_depo_index,surface_lattice,natoms)
-        ini = Lattice.readLattice(NEB_dir_name_prefac+"/initial.dat")
-        iniMin = copy.deepcopy(ini)
-
-        # minimise lattice
-        minimiser = Minimise.getMinimiser(LKMCParams)
-        status = minimiser.run(iniMin)
-        if status:
-            print " WARNING! failed to minimise initial lattice"
-            iniMin.writeLattice(NEB_dir_name_prefac+"/Reset.dat")
-            return 1, vol
-    else:
-        iniMin = initialMinimised
-        ini = Lattice.readLattice(NEB_dir_name_prefac+"/initial.dat")
-
-    # create cell dimensions
-    cellDims = np.asarray([box_x,0,0,0,params.maxHeight,0,0,0,box_z],dtype=np.float64)
-
-    # check max movement
-    Index, maxMove, avgMove, Sep = Vectors.maxMovement(ini.pos, iniMin.pos, cellDims)
-
-    if maxMove < params.maxMoveCriteria:
-        #ini.writeLattice("initialMin.dat")
-        full_depo = copy.deepcopy(full_depo_index)
-        depo_list = full_depo[atom_index]
-
-        # move atom
-        moved_list = moveAtom(depo_list, direction ,full_depo_index)
-
-        if moved_list:
-            full_depo[atom_index] = moved_list
-
-            # create initial lattice and Minimise
-            writeLatticeLKMC('/6',full_depo,surface_lattice,natoms)
-            fin = Lattice.readLattice(NEB_dir_name_prefac+"/" + '6' +".dat")
-            finMin = copy.deepcopy(fin)
-            Index, maxMove, avgMove, Sep = Vectors.maxMovement(iniMin.pos, finMin.pos, cellDims)
-            if maxMove < 0.4:
-                print " difference between ini and fin is too small", maxMove
-                barrier = str("None")
-                results = [direction, final_key, barrier]
-                results[0] = map(int,results[0])
-                del ini, iniMin
-                del fin, finMin
-                vol.addTrans(results[0], final_key, barrier, 0, str("None"))
-                # add_to_trans_file(hashkey,results)
-                return results, vol
-
-            # minimise final lattice
-            mini_fin = Minimise.getMinimiser(LKMCParams)
-            status = mini_fin.run(finMin)
-            if status:
-                print " Failed to minimise final"
-                barrier = str("None")
-                results = [direction, final_key, barrier]
-                results[0] = map(int,results[0])
-                del ini, iniMin
-                del fin, finMin
-                vol.addTrans(results[0], final_key, barrier, 0, str("None"))
-                # add_to_trans_file(hashkey,results)
-                return results, vol
-
-            # check max movement
-            Index, maxMove, avgMove, Sep = Vectors.maxMovement(fin.pos, finMin.pos, cellDims)
-            if maxMove < params.maxMoveCriteria:
-                # run NEB on initial and final lattices
-                neb = NEB.NEB(LKMCParams)
-                status = neb.run(iniMin, finMin)
-
-                if status:
-                    print "WARNING: NEB failed to converge"
-                    print "Try changing parameters in lkmcInput.IN"
-                    barrier = str("None")
-                    results = [direction, final_key, barrier]
-                    results[0] = map(int,results[0])
-                    del ini, iniMin
-                    del fin, finMin
-                    vol.addTrans(results[0], final_key, barrier, 0, str("None"))
-                    #add_to_trans_file(hashkey,results)
-                    return results, vol
-
-                print neb.barrier
-                barrier = round(neb.barrier,6)
-                reverseBarrier = round((iniMin.totalEnergy-finMin.totalEnergy)+neb.barrier,6)
-                print "Reverse barrier: ", reverseBarrier
-
-                # do not allow transitions with tiny reverse barriers
-                if params.reverseBarrierTol is not None:
-                    if reverseBarrier < params.reverseBarrierTol:
-                        barrier = str("None")
-                        results = [direction, final_key, barrier]
-                        results[0] = map(int,results[0])
-                        vol.addTrans(results[0], final_key, barrier, str("None"),str("None"))
-                        return results, vol
-
-                # do not allow any negative barriers
-                if neb.barrier < 0 or reverseBarrier < 0:
-                    barrier = str("None")
-                    results = [direction, final_key, barrier]
-                    results[0] = map(int,results[0])
-                    vol.addTrans(results[0], final_key, barrier, str("None"),str("None"))
-                    return results, vol
-
-
-                results = [direction, final_key, barrier]
-                results[0] = map(int,results[0])
-                rate = calcRate(barrier)
-                vol.addTrans(results[0], final_key, barrier, rate, reverseBarrier)
-                print direction
-            else:
-                print "WARNING: maxMove too large in final lattice"
-                barrier = str("None")
-                results = [direction, final_key, barrier]
-                results[0] = map(int,results[0])
-                del ini, iniMin
-                del fin, finMin
-                vol.addTrans(results[0], final_key, barrier, 0, str("None"))
-                #add_to_trans_file(hashkey,results)
-                return results, vol
-        else:
-            print "WARNING: move atom failed"
-            barrier = str("None")
-            results = [direction, final_key, barrier]
-            results[0] = map(int,results[0])
-            del ini, iniMin
-            vol.addTrans(results[0], final_key, barrier, 0 , str("None"))
-            #add_to_trans_file(hashkey,results)
-            return results, vol
-
-        # if results:
-        #     add_to_trans_file(hashkey,results)
-    else:
-        print "WARNING: maxMove too large in initial lattice ", maxMove
-        print " WARNING! failed to minimise initial lattice"
-        iniMin.writeLattice(NEB_dir_name_prefac+"/Reset.dat")
-        return 1, vol
-
-    del ini, iniMin
-    del Sep
-    print "Finished SINGlE NEB", "="*60
-    return results, vol
-
-# write out all volumes and transitions to a file
-def writeVolumes(volumes):
-    volfile = initial_dir + '/Volumes.txt'
-
-    out = open(volfile, 'w')
-    for i, vol in enumerate(volumes):
-        # print "vol:", vol
-        numDir = len(volumes[vol].directions)
-        numTrans = len(volumes[vol].finalKeys)
-        out.write(str(vol)+'\t'+str(numDir)+'\t'+str(numTrans)+'\n')
-        for j in range(numDir):
-            direc = volumes[vol].directions[j]
-            out.write(str(direc[0])+'\t'+str(direc[1])+'\t'+str(direc[2])+'\n')
-        for j, trans in enumerate(volumes[vol].finalKeys):
-            out.write(str(trans)+'\t'+str(volumes[vol].finalKeys[trans].barrier)+'\t'+str(volumes[vol].finalKeys[trans].rate)+'\t'+str(volumes[vol].finalKeys[trans].reverseBarrier)+'\n')
-
-    # writeVolAtoms(volumes)
-    return
-
-# write out volume atom positions to a file
-def writeVolAtoms(volumes):
-    volfile = initial_dir + '/VolumeAtoms.txt'
-
-    out = open(volfile, 'w')
-    for i, vol in enumerate(volumes):
-        numAtoms = len(volumes[vol].volumeAtoms)
-        out.write(str(vol)+'\t'+str(numAtoms)+'\n')
-        cV = volumes[vol]
-        for j in range(numAtoms):
-            out.write(str(cV.specie[j]) + '   ' + str(cV.pos[3*j])+ '    '+str(cV.pos[3*j+1])+ '   '+ str(cV.pos[3*j+2])+'\n')
-    return
-
-# read volumes from file
-def readVolumes(volumes):
-
-    # read in transitions
-    volPath = initial_dir + '/Volumes.txt'
-    if (os.path.isfile(volPath)):
-        input_file = open(volPath, 'r')
-        while 1:
-            latline = input_file.readline()
-            line = latline.split()
-            if len(line) < 3:
-                break
-            key = str(line[0])
-            numDir = int(line[1])
-            numTrans = int(line[2])
-            vol = volume()
-            for i in range(numDir):
-                latline = input_file.readline()
-                line = latline.split()
-                if len(line) < 3:
-                    break
-                direc = [int(line[0]),int(line[1]),int(line[2])]
-                vol.directions.append(direc)
-            for i in range(numTrans):
-                latline = input_file.readline()
-                line = latline.split()
-                if len(line) < 3:
-                    break
-                if line[1]!= "None":
-                    vol.addTrans(direc, str(line[0]), float(line[1]), float(line[2]), float(line[3]))
-                else:
-                    vol.addTrans(direc, str(line[0]), str(line[1]), float(0.0), str(line[3]))
-            volumes[key]=vol
-
-    return volumes
-
-# write stats to a file
-def statsOutput(event_list,CurrentStep,numAdatoms):
-    statsFile = Stats_dir + '/Stats.txt'
-    if (os.path.isfile(statsFile)):
-        outfile = open(statsFile, 'a')
-        TotalRate = 0
-        TotalBarrier = 0
-        num = len(event_list)
-        for i in xrange(num):
-            TotalRate += float(event_list[i][0])
-            if event_list[i][3] is not None and event_list[i][3] != 'None':
-                try:
-                    TotalBarrier += float(event_list[i][3])
-                except ValueError:
-                    continue
-
-        AveRate = TotalRate/num
-        AveBarrier = TotalBarrier/num
-        outfile.write(str(AveRate)+','+str(AveBarrier)+','+str(len(event_list))+','+str(numAdatoms)+','+str(CurrentStep)+'\n')
-        outfile.close()
-    else:
-        print "Warning! Could not find Stats.txt"
-    return
-
-
-
-
-
-
-# ============================================================================
-# ============================================================================
-# ============================================================================
-# ============================================================================
-# ====================== MAIN SCRIPT =========================================
-# ============================================================================
-# ============================================================================
-# ============================================================================
-# ============================================================================
-
-
-# set initial values
-Time = 0
-full_depo_list = []
-surface_specie= []
-surface_positions = []
-startTimeSub = time.time()
-CurrentStep = 0
-volumes = {}
-basinList = []
-fullyCoordList = []
-
-print "="*80
-print "~~~~~~~~ Starting lattice KMC ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~"
-print "~~~~~~~~ Copyright (c) Adam Lloyd 2016 ~~~~~~~~~~~~~~~~~~~~~~~"
-print "="*80
-
-
-# directory setup
-initial_dir = os.getcwd()
-output_dir_name_prefac = initial_dir + '/Output'
-Trans_dir = initial_dir + '/Transitions'
-Volumes_dir = initial_dir + '/Volumes'
-NEB_dir_name_prefac = initial_dir + '/Temp'
-Stats_dir = initial_dir + '/Stats'
-basin_dir = initial_dir + '/Basin'
-
-print " Current directory           : ", initial_dir
-print " Output directory params.prefactor  : ", output_dir_name_prefac
-
-# determine if all input files are present
-# check we have lattice.dat
-if (os.path.isdir(initial_dir)):
-    # check for required files
-    # lattice.dat
-    check_path = initial_dir + '/lattice.dat'
-    input_lattice_path = check_path
-    if not (os.path.isfile(check_path)):
-        print "lattice.dat: ", check_path, " not found, exiting ..."
-        sys.exit()
-
-# check if volumes and output directories exists, if not: creates them
-if not os.path.exists(Volumes_dir):
-    os.makedirs(Volumes_dir)
-if not os.path.exists(output_dir_name_prefac):
-    os.makedirs(output_dir_name_prefac)
-if not os.path.exists(NEB_dir_name_prefac):
-    os.makedirs(NEB_dir_name_prefac)
-if not os.path.exists(Trans_dir):
-    os.makedirs(Trans_dir)
-
-
-# read lattice header
-natoms,box_x,box_y,box_z = readLatticeHeader(input_lattice_path)
-print "Initial atoms  : ",natoms
-print "Lattice size: ",box_x,box_y,box_z, " Angstroms"
-sys.stdout.flush()
-
-# Y-height of initial lattice
-initial_surface_height = findMaxHeight(input_lattice_path)
-print "initial_surface_height: ", initial_surface_height
-
-# store whole surface lattice first
-surface_lattice = readLattice(input_lattice_path,2)
-for i in xrange(len(surface_lattice)):
-    surface_specie.append(surface_lattice[i][0])
-    surface_positions.append(round(surface_lattice[i][1],6))
-    surface_positions.append(round(surface_lattice[i][2],6))
-    surface_positions.append(round(surface_lattice[i][3],6))
-
-# set up temp initial and final lattices.dat
-LKMCParams = Input.getLKMCParams(1, "", "lkmcInput.IN")
-Input.readGlobals("lkmcInput.IN")
-volumes = readVolumes(volumes)
-params = Parameters.getInput()
-
-if params.useBasin:
-    if not os.path.exists(basin_dir):
-        os.makedirs(basin_dir)
-if params.statsOut:
-    if not os.path.exists(Stats_dir):
-        os.makedirs(Stats_dir)
-    statsFile = Stats_dir + '/Stats.txt'
-    outfile = open(statsFile, 'w')
-    outfile.write('Average Rate'+', Average Barrier'+', No. Events'+', No. Adatoms'+', Step'+'\n')
-    outfile.close()
-print "~"*80
-
-# find size of gridSize
-x_grid_points, y_grid_points, z_grid_points, box_x, box_z = gridSize(box_x,initial_surface_height,box_z)
-print "grid size: %d * %d * %d" % (x_grid_points,y_grid_points,z_grid_points)
-if (x_grid_points%6):
-    print " WARNING WARNING: x grid points must be a multiple of 6 for PBC to work"
-    sys.exit()
-if (z_grid_points%2):
-    print " WARNING WARNING: z grid points must be a multiple of 2 for PBC to work"
-    sys.exit()
-print "New lattice size: ",box_x,box_y,box_z, " Angstroms"
-print "-" * 80
-
-# check if continue or begin run
-if params.jobStatus == 'CNTIN':
-    num = 0
-    orig_len = len(surface_lattice)
-    while 1:
-        kmcFile = output_dir_name_prefac + '/KMC' + str(num) + '.dat'
-
-        # read in last KMC file
-        if not os.path.exists(kmcFile):
-            input_file = open(output_dir_name_prefac + '/KMC' + str(num-1) + '.dat', 'r')
-            # skip first line
-            latline = input_file.readline()
-            latline = input_file.readline()
-            Time = float(latline)
-            input_file.close()
-
-            full_depo_list = readLattice(output_dir_name_prefac + '/KMC' + str(num-1) + '.dat',orig_len+4)
-
-            # add adatoms to full_depo_list
-            for i in xrange(len(full_depo_list)):
-                full_depo_list[i][4] = orig_len + 1 + i
-
-            natoms += len(full_depo_list)
-            full_depo_list = setToLattice(full_depo_list)
-            CurrentStep = (num-1) * params.latticeOutEvery
-            break
-        num += 1
-
-# do initial consecutive depositions
-while CurrentStep < (params.numberDepos):
-    depo_list = []
-    depo_list = deposition(box_x,box_z,params.x_grid_dist,params.z_grid_dist,full_depo_list,natoms)
-    if depo_list:
-        print "Current Step: ", CurrentStep
-        natoms = depo_list[4]
-        full_depo_list.append(depo_list)
-        writeLattice(CurrentStep,full_depo_list,surface_lattice,natoms,0,0)
-        print "Writing lattice: KMC 0"
-        CurrentStep += 1
-
-print "-" * 80
-print "Number of initial adatoms: " , len(full_depo_list)
-index = CurrentStep
-
-
-# ============================================================================
-# ================== do KMC run ==============================================
-# ============================================================================
-
-while CurrentStep < (params.total_steps + 1):
-    # TODO: include a verbosity level
-    print "Current Step: ", CurrentStep
-
-    # check if in same position as 2 steps ago
-    event_list, volumes, fullyCoordList, full_depo_list = createEventsList(full_depo_list,surface_lattice, volumes,  fullyCoordList)
-
-
-    # write out volumes file
-    if CurrentStep%params.volumesOutEvery == 0 or CurrentStep == params.total_steps:
-        writeVolumes(volumes)
-
-    # write out stats
-    if params.statsOut:
-        statsOutput(event_list,CurrentStep,len(full_depo_list))
-
-    bar = findBarrierHeight(params.depoRate )
-    event_list.append([params.depoRate ,0,['Depo'],bar])
-
-    # choose event
-    while 1:
-        chosenRate, chosenEvent, chosenAtom, Time, chosenBarrier, i = selectEvent(event_list, Time)
-
-        if chosenEvent[0] == 'Depo':
-            break
-
-        # check final position of atom
-        status = checkMove(chosenEvent,chosenAtom,full_depo_list)
-        if status:
-            break
-        else:
-            print "Problem with chosen event %d. Removing event from list" %i
-            print event_list[i]
-            for e in range(len(event_list)):
-                eventl = event_list[e]
-                if eventl[1] == chosenAtom:
-                    if eventl[2] == chosenEvent:
-                        event_list.pop(e)
-                        break
-
-            # event_list.pop(i)
-
-    # do deposition
-    if chosenEvent[0] == 'Depo':
-        while index < (CurrentStep+1):
-            depo_list = []
-            depo_list = deposition(box_x,box_z,params.x_grid_dist,params.z_grid_dist,full_depo_list,natoms)
-            if depo_list:
-                natoms = depo_list[4]
-                full_depo_backup = copy.deepcopy(full_depo_list)
-                full_depo_list.append(depo_list)
-
-                # Minimise after each deposition
-                writeLatticeLKMC('/initial',full_depo_list,surface_lattice,natoms)
-                ini = Lattice.readLattice(NEB_dir_name_prefac+"/initial.dat")
-                iniMin = copy.deepcopy(ini)
-                # create cell dimensions
-                cellDims = np.asarray([box_x,0,0,0,params.maxHeight,0,0,0,box_z],dtype=np.float64)
-                # minimise lattice
-                minimiser = Minimise.getMinimiser(LKMCParams)
-                status = minimiser.run(iniMin)
-                if status:
-                    print "Warning: failed to minimise initial lattice"
-                    full_depo_list = full_depo_backup
-                    sys.exit()
-                else:
-                    # check max movement
-                    Index, maxMove, avgMove, Sep = Vectors.maxMovement(ini.pos, iniMin.pos, cellDims)
-
-                    if maxMove < params.maxMoveCriteria:
-                        index += 1
-                        # delete basins if deposition occurs
-                        basinList = []
-                        writeLatticeLKMC('/reset',full_depo_list,surface_lattice,natoms)
-                        # sys.exit()
-                    else:
-                        full_depo2 = setToLattice(full_depo_list)
-                        writeLatticeLKMC('/reset',full_depo2,surface_lattice,natoms)
-                        full_depo_list = full_depo2
-                        index += 1
-                        # sys.exit()
-        CurrentStep += 1
-
-    # do move
-    else:
-        while index < (CurrentStep+1):
-            full_depo_list[chosenAtom] = [full_depo_list[chosenAtom][0], chosenEvent[0],chosenEvent[1],chosenEvent[2],full_depo_list[chosenAtom][4]]
-            index += 1
-        CurrentStep += 1
-
-
-    # write out lattice
-    if (CurrentStep-1)%params.latticeOutEvery == 0:
-        latticeNo = (CurrentStep-1)/params.latticeOutEvery
-        print "Writing lattice: KMC", latticeNo
-
-        Barrier = chosenBarrier
-        writeLattice(latticeNo,full_depo_list,surface_lattice,natoms,Time,Barrier)
-    print "Number of fully coordinated atoms: ", len(fullyCoordList)
-
-    print "-" * 80
-
-
-# last lines of output
-print "====== Finished KMC run ========================================================"
-print "Number of steps completed:	", (CurrentStep-1)
-print "Number of depositions:		", len(full_depo_list)
-print "="*80
-print "Lattice KMC        Copyright (c) Adam Lloyd 2016 "
-print "="*80
-
-# Timer
-FinalTimeSub = time.time() - startTimeSub
-print "Time: ", FinalTimeSub
-print "Average Time per step: ", FinalTimeSub/CurrentStep
-print "Number of basins: ", len(basinList)
+import Engine
 
-if params.statsOut:
-    if (os.path.isfile(statsFile)):
-        input_file = open(statsFile, 'r')
-        # skip first line
-        line = input_file.readline()
-        AveRate = 0
-        AveBarrier = 0
-        AveEvents = 0
-        while 1:
-            line = input_file.readline()
-            if not line: break
-            #print line
-            line = line.split(',')
-            AveRate += float(line[0])
-            AveBarrier += float(line[1])
-            AveEvents += float(line[2])
-        input_file.close()
-        AveRate = AveRate/(CurrentStep-params.numberDepos)
-        AveBarrier = AveBarrier/(CurrentStep-params.numberDepos)
-        AveEvents = AveEvents/(CurrentStep-params.numberDepos)
-        print "Average Rate: ", AveRate, "\tAverage Barrier: ", AveBarrier, "\tAverage Number of events: ", AveEvents
+def main():
+    sim = Engine.Simulation()
+    sim.run()
 
-del basinList
-del volumes
-del full_depo_list
-del surface_lattice
+if __name__ == "__main__":
+    main()
@@ -20,17 +20,66 @@ class Input(object):
         self.temperature = 300           # system temperature in Kelvin
         self.prefactor = 1.00E+13        # fixed prefactor for Arrhenius eq. (typically 1E+12 or 1E+13)
         self.boltzmann = 8.62E-05        # Boltzmann constant (8.62E-05)
+        self.temperatureSchedule = 'none' # temperature breakpoints 'x1:T1,x2:T2,...' on the schedule axis ('none' = fixed temperature)
+        self.scheduleAxis = 'step'      # schedule breakpoints are KMC steps ('step') or simulated time ('time')
+        self.scheduleInterp = 'linear'  # 'linear' ramps between breakpoints or 'step' holds each temperature until the next breakpoint
+        self.scheduleTempTol = 0.5      # rates are re-evaluated when the temperature changes by more than this (K)
         self.graphRad = 5.9                # graph radius of defect volumes (Angstroms)
         self.depoRate = 5184              # deposition rate
+        self.randomSeed = -1            # seed for the random number generator (-1 = not seeded)
+        self.depoSiteMap = 0            # Booleon: keep a map of valid deposition sites and pick from it (no rejected attempts)
+        self.depoBatchSize = 1          # max number of atoms deposited in one step when deposition dominates (1 = off)
+        self.depoBatchMinFrac = 0.9     # batch depositions only while depoRate is at least this fraction of the total rate
         self.maxMoveCriteria = 0.87        # maximum distance an atom can move after relaxation (pre NEB)
+        self.relaxRadius = 0.0          # after deposition only relax atoms within this distance of the deposit (A, 0 = whole system)
+        self.relaxShell = 3.0           # shell of atoms around relaxRadius held fixed in the local relaxation (A)
+        self.nebClusterRadius = 0.0     # run minimisation and NEB on a cluster of atoms within this distance of the hop (A, 0 = whole system, not with asyncNEB)
+        self.nebClusterShell = 4.0      # frozen boundary shell around the NEB cluster (A)
+        self.nebClusterCheckEvery = 50  # compare every n cluster NEBs with a full system NEB (0 = never, output in Stats/ClusterNEB.txt)
+        self.nebClusterTol = 0.05       # use full system NEBs once a comparison is off by more than this (eV)
         self.maxHeight = 30              # Dimension of cell in y direction (A)
         self.includeUpTrans = 0          # Booleon: Include transitions up step edges (turning off speeds up simulation)
         self.includeDownTrans = 1        # Booleon: Include transitions down step edges
         self.statsOut = 0              # Recieve extra information from your run
+        self.statsFlushEvery = 100      # write buffered Stats.txt lines and RunningStats.json every n steps
+        self.timingOutEvery = 0         # write cumulative phase timers and catalog counters every n steps (0 = off)
+        self.timingFormat = 'json'      # format of timing output ('json' or 'csv')
+        self.profileSteps = 'none'      # windows of KMC steps to profile, eg. '5000-5100' or '100-200,5000-5100' ('none' = off)
+        self.profileCPU = 1             # Booleon: run cProfile during profile windows
+        self.profileMemory = 0          # Booleon: take tracemalloc snapshots during profile windows
+        self.profileTop = 25            # number of functions/allocations listed in profile reports
+        self.fastMode = 0               # Booleon: look up volumes, hops and deposit relaxation by local environment once confirmed (approximate)
+        self.stateCacheSize = 200       # number of minimised states kept for reuse (0 = off)
+        self.surrogateModel = 'none'    # cheap barrier estimate to rank and defer NEBs (none, bondcount or fitted)
+        self.surrogateRateFrac = 1E-06  # defer NEBs with estimated rate < surrogateRateFrac * total rate of the last step
+        self.surrogateBarrier0 = 0.2    # bond counting barrier of an isolated adatom hop (eV)
+        self.surrogateBondBarrier = 0.25  # bond counting barrier per in plane adatom neighbour (eV)
+        self.surrogateStepBarrier = 0.1   # extra bond counting barrier for hops up or down a step (eV)
+        self.surrogateMinFit = 20       # NEB barriers needed before the fitted model replaces bond counting
+        self.asyncNEB = 0               # Booleon: search new volumes in background processes and keep stepping (not with useBasin)
+        self.asyncProcesses = 0         # number of background search processes (0 = number of cores)
+        self.asyncRateFrac = 0.01       # only step past pending searches while their rate bound < asyncRateFrac * total rate
+        self.asyncMinBarrier = 0.3      # lower bound of barriers used to bound the rates of pending searches without a surrogate model (eV)
+        self.islandTable = 'none'       # table of island escape rates from Scripts/mean.py --sweep ('none' = off, not with temperatureSchedule)
+        self.islandSizeTol = 0.1        # islands within this fraction of a tabulated size use its escape rate
         self.useBasin = 1           # Booleon: use the basin method or not
         self.basinBarrierTol = 0.25      # barriers below this are considered in a basin (eV)
         self.basinBarrierSubTol = 0.40   # if one barrier is above this, it is considered an escaping transition not internal
         self.basinDistTol = 0.6         # distance between states to be considered the same state (A)
+        self.useSuperBasin = 0          # Booleon: group neighbouring adatoms into superbasins of cluster configurations (needs useBasin)
+        self.superBasinMaxAtoms = 2     # max number of adatoms in a superbasin cluster
+        self.superBasinRad = 3.4        # adatoms closer than this are grouped into the same superbasin (A)
+        self.flickerWindow = 100        # number of recent (atom, position) visits kept to detect flickering
+        self.flickerAutoTune = 0        # Booleon: raise basinBarrierTol when one atom keeps revisiting the same states
+        self.flickerRevisitFrac = 0.5   # fraction of the window spent revisiting states on one atom to trigger tuning
+        self.flickerTolStep = 0.02      # increase in basinBarrierTol each time it is tuned (eV)
+        self.flickerTolMax = 0.35       # basinBarrierTol is never raised above this or basinBarrierSubTol (eV)
+        self.catalogDir = 'none'        # directory of a transition catalog shared with other runs ('none' = off)
+        self.catalogPollTime = 1.0      # seconds between checks while another run searches the same volume
+        self.catalogClaimTimeout = 3600 # claims on a volume older than this (s) are considered stale
+        self.ensembleReplicas = 4       # number of replicas run by Ensemble.py (seeds randomSeed + replica)
+        self.ensembleProcesses = 0      # number of processes in the ensemble pool (0 = number of cores)
+        self.ensembleStatsEvery = 10    # stream island statistics of each replica every n steps
         self.checkMoveDist = 2          # distance used in checkMoveDist. Do not allow an atom to move within this distance of another atom. Needed for basin method
         self.reverseBarrierTol = 0.03   # Tolerance to allow transitions with reverse barriers greater than this only
         self.maxCoordNum = 9            # max coordination to be considered a Defects
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Profiling module.
+
+Turns cProfile and/or tracemalloc on for windows of KMC steps given in the
+input file (eg. profileSteps = 5000-5100) and dumps the results of each
+window into the Profile directory.
+
+"""
+
+import os
+import cProfile
+import pstats
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+# parse windows of the form 'a-b,c-d' (single steps 'a' are allowed)
+def parseWindows(text):
+    windows = []
+    text = str(text).strip()
+    if text.lower() in ('', 'none', '0'):
+        return windows
+    for part in text.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+        else:
+            start = end = part
+        start = int(start)
+        end = int(end)
+        if end < start:
+            start, end = end, start
+        windows.append((start, end))
+    windows.sort()
+    return windows
+
+class profileWindows(object):
+    def __init__(self, params, profileDir):
+        self.windows = parseWindows(params.profileSteps)
+        self.profileDir = profileDir
+        self.cpu = params.profileCPU
+        self.memory = params.profileMemory
+        self.top = params.profileTop
+        self.active = None
+        self.profiler = None
+        self.snapshot = None
+
+        if self.memory and tracemalloc is None:
+            print "WARNING: tracemalloc is not available, memory profiling is off"
+            self.memory = 0
+
+        if self.windows and not os.path.exists(self.profileDir):
+            os.makedirs(self.profileDir)
+
+    # call at the start of every KMC step
+    def update(self, step):
+        if self.active is not None and step > self.active[1]:
+            self.stop()
+        if self.active is None:
+            for window in self.windows:
+                if window[0] <= step <= window[1]:
+                    self.start(window)
+                    break
+
+    def start(self, window):
+        self.active = window
+        print "Profiling KMC steps %d-%d" % window
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self.snapshot = tracemalloc.take_snapshot()
+        if self.cpu:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    # stop profiling and dump the current window
+    def stop(self):
+        if self.active is None:
+            return
+        prefix = self.profileDir + '/KMC_%d-%d' % self.active
+
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(prefix + '.pstats')
+            outfile = open(prefix + '_cpu.txt', 'w')
+            stats = pstats.Stats(self.profiler, stream=outfile)
+            stats.sort_stats('cumulative').print_stats(self.top)
+            outfile.close()
+            self.profiler = None
+
+        if self.memory:
+            snapshot = tracemalloc.take_snapshot()
+            outfile = open(prefix + '_memory.txt', 'w')
+            outfile.write("Top %d allocations at end of window\n" % self.top)
+            for stat in snapshot.statistics('lineno')[:self.top]:
+                outfile.write(str(stat) + '\n')
+            outfile.write("\nTop %d allocation changes during window\n" % self.top)
+            for stat in snapshot.compare_to(self.snapshot, 'lineno')[:self.top]:
+                outfile.write(str(stat) + '\n')
+            outfile.close()
+            self.snapshot = None
+            tracemalloc.stop()
+
+        print "Profile written: ", prefix
+        self.active = None
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Running statistics module.
+
+Statistics of the event lists kept in memory as the run goes: running
+means and variances (Welford) of the rates of all events that can be
+chosen (rate > 0), of the barriers of all events, of the per step
+averages written to Stats.txt, of the number of events and of the number
+of adatoms, with histograms of rates (log10), barriers and event counts.
+The Stats.txt lines are buffered and written with a JSON record of the
+aggregates to Stats/RunningStats.json every statsFlushEvery steps and
+when the run stops early, and the final averages are reported from memory
+instead of reading Stats.txt back.
+
+"""
+
+import json
+import math
+import numpy as np
+
+class runningStat(object):
+    def __init__(self):
+        self.n = 0
+        self.total = 0.0
+        self.runMean = 0.0
+        self.M2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, x):
+        x = float(x)
+        self.n += 1
+        self.total += x
+        delta = x - self.runMean
+        self.runMean += delta / self.n
+        self.M2 += delta * (x - self.runMean)
+        self.min = x if self.min is None else min(self.min, x)
+        self.max = x if self.max is None else max(self.max, x)
+
+    # add an array of values at once (merged as a second set of statistics)
+    def addArray(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        n = len(values)
+        mean = float(values.mean())
+        M2 = float(((values - mean) ** 2).sum())
+        total = self.n + n
+        delta = mean - self.runMean
+        self.runMean += delta * n / total
+        self.M2 += M2 + delta * delta * self.n * n / total
+        self.n = total
+        self.total += float(values.sum())
+        self.min = float(values.min()) if self.min is None else min(self.min, float(values.min()))
+        self.max = float(values.max()) if self.max is None else max(self.max, float(values.max()))
+
+    def mean(self):
+        if not self.n:
+            return 0.0
+        return self.total / self.n
+
+    def variance(self):
+        if self.n < 2:
+            return 0.0
+        return self.M2 / (self.n - 1)
+
+    def std(self):
+        return math.sqrt(self.variance())
+
+    def record(self):
+        return {"n": self.n, "mean": self.mean(), "std": self.std(), "min": self.min, "max": self.max}
+
+# fixed width bins from low to high, with counts below and above
+class histogram(object):
+    def __init__(self, low, high, width):
+        self.low = low
+        self.width = width
+        self.counts = np.zeros(int(round((high - low) / width)), dtype=np.int64)
+        self.under = 0
+        self.over = 0
+
+    def add(self, values):
+        index = np.floor((np.asarray(values, dtype=np.float64) - self.low) / self.width).astype(np.int64)
+        self.under += int(np.count_nonzero(index < 0))
+        self.over += int(np.count_nonzero(index >= len(self.counts)))
+        index = index[(index >= 0) & (index < len(self.counts))]
+        self.counts += np.bincount(index, minlength=len(self.counts))
+
+    def record(self):
+        return {"low": self.low, "width": self.width, "counts": self.counts.tolist(), "under": self.under, "over": self.over}
+
+# counts of integer values
+class countHistogram(object):
+    def __init__(self):
+        self.counts = {}
+
+    def add(self, value):
+        self.counts[value] = self.counts.get(value, 0) + 1
+
+    def record(self):
+        return dict([(str(value), self.counts[value]) for value in self.counts])
+
+class runningStats(object):
+    def __init__(self, statsFile, recordFile):
+        self.statsFile = statsFile
+        self.recordFile = recordFile
+        # all events of all steps
+        self.eventRate = runningStat()
+        self.eventBarrier = runningStat()
+        self.rateHist = histogram(0.0, 16.0, 0.25)
+        self.barrierHist = histogram(0.0, 2.0, 0.05)
+        # once per step
+        self.stepRate = runningStat()
+        self.stepBarrier = runningStat()
+        self.numEvents = runningStat()
+        self.numAdatoms = runningStat()
+        self.eventsHist = countHistogram()
+        # Stats.txt lines not written yet
+        self.lines = []
+
+    # statistics of the event store of a step
+    def addStep(self, events, numAdatoms, step):
+        AveRate = events.meanRate()
+        AveBarrier = events.meanBarrier()
+        self.lines.append(str(AveRate)+','+str(AveBarrier)+','+str(len(events))+','+str(numAdatoms)+','+str(step)+'\n')
+        self.stepRate.add(AveRate)
+        self.stepBarrier.add(AveBarrier)
+        self.numEvents.add(len(events))
+        self.numAdatoms.add(numAdatoms)
+        self.eventsHist.add(len(events))
+
+        rates = events.rate[np.nan_to_num(events.rate) > 0]
+        self.eventRate.addArray(rates)
+        self.rateHist.add(np.log10(rates))
+        barriers = events.barrier[~np.isnan(events.barrier)]
+        self.eventBarrier.addArray(barriers)
+        self.barrierHist.add(barriers)
+
+    def record(self, step):
+        return {"step": step,
+                "eventRate": self.eventRate.record(), "eventBarrier": self.eventBarrier.record(),
+                "stepRate": self.stepRate.record(), "stepBarrier": self.stepBarrier.record(),
+                "numEvents": self.numEvents.record(), "numAdatoms": self.numAdatoms.record(),
+                "log10RateHistogram": self.rateHist.record(), "barrierHistogram": self.barrierHist.record(),
+                "numEventsHistogram": self.eventsHist.record()}
+
+    # write buffered Stats.txt lines and a record of the aggregates
+    def flush(self, step):
+        outfile = open(self.statsFile, 'a')
+        outfile.writelines(self.lines)
+        outfile.close()
+        self.lines = []
+        outfile = open(self.recordFile, 'a')
+        outfile.write(json.dumps(self.record(step), sort_keys=True) + "\n")
+        outfile.close()
+
+    # human readable summary
+    def report(self):
+        lines = []
+        for name, stat in [("Event rate", self.eventRate), ("Event barrier", self.eventBarrier),
+                           ("Events per step", self.numEvents), ("Adatoms", self.numAdatoms)]:
+            lines.append(" %-16s mean %14.6e  std %14.6e  min %14.6e  max %14.6e" % (name, stat.mean(), stat.std(),
+                                                                                   stat.min or 0.0, stat.max or 0.0))
+        return "\n".join(lines)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Temperature schedule module.
+
+Temperature as a function of KMC step or simulated time, given in the
+input file as breakpoints (eg. temperatureSchedule = 0:300,5000:600).
+Between breakpoints the temperature is interpolated linearly (ramps,
+anneal and quench) or held until the next breakpoint (steps). Before the
+first and after the last breakpoint it is constant.
+
+"""
+
+import sys
+
+# parse breakpoints of the form 'x1:T1,x2:T2' ('none' = no schedule)
+def parseSchedule(text):
+    points = []
+    text = str(text).strip()
+    if text.lower() in ('', 'none', '0'):
+        return points
+    for part in text.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            x, temp = part.split(':')
+            points.append((float(x), float(temp)))
+        except ValueError:
+            print "temperatureSchedule breakpoints must be step:temperature (or time:temperature): ", part, ", exiting ..."
+            sys.exit()
+    points.sort()
+    return points
+
+class temperatureSchedule(object):
+    def __init__(self, params):
+        self.points = parseSchedule(params.temperatureSchedule)
+        self.axis = params.scheduleAxis
+        self.interp = params.scheduleInterp
+        self.tol = params.scheduleTempTol
+        self.active = len(self.points) > 0
+        self.current = params.temperature
+        self.numChanges = 0
+
+        if self.axis not in ('step', 'time'):
+            print "scheduleAxis must be 'step' or 'time': ", self.axis, ", exiting ..."
+            sys.exit()
+        if self.interp not in ('linear', 'step'):
+            print "scheduleInterp must be 'linear' or 'step': ", self.interp, ", exiting ..."
+            sys.exit()
+
+    # temperature at a point on the schedule axis
+    def temperature(self, x):
+        points = self.points
+        if x <= points[0][0]:
+            return points[0][1]
+        for i in xrange(1, len(points)):
+            if x < points[i][0]:
+                x0, t0 = points[i-1]
+                x1, t1 = points[i]
+                if self.interp == 'step':
+                    return t0
+                return t0 + (t1 - t0) * (x - x0) / (x1 - x0)
+        return points[-1][1]
+
+    # new temperature if it changed by more than the tolerance, else None
+    def update(self, step, time):
+        if not self.active:
+            return None
+        if self.axis == 'time':
+            temp = self.temperature(time)
+        else:
+            temp = self.temperature(step)
+        if abs(temp - self.current) < self.tol:
+            return None
+        self.current = temp
+        self.numChanges += 1
+        return temp
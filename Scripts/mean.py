@@ -9,9 +9,19 @@
 
 import os
 import sys
+import argparse
+import itertools
+import multiprocessing
 import numpy as np
 from LKMC import Lattice
 
+try:
+    import scipy.sparse
+    import scipy.sparse.linalg
+    from scipy.spatial import cKDTree
+except ImportError:
+    scipy = None
+
 # input parameters
 x_grid_dist = 0.9497411251   # distance in x direction between each atom in lattice
 z_grid_dist = 1.6449999809   # distance in z direction between each atom in lattice
@@ -22,9 +32,17 @@ type2_escapeRate = 1.37E7    # rate to escape basin from type2 basin state
 start = 12                    # length on hexagon edge lengths for islands to consider
 finish = 14
 nbdist = 2                   # distance(Ang)
+use_sparse = 1               # sparse LU solve (needs scipy), 0 = dense inverse
+
 
 
 
+# results table of the sweep mode
+sweep_header = "Size, Basin states, Island atoms, type1_rate, type2_rate, type1_escapeRate, type2_escapeRate, Mean time (s), Escape rate (1/s)"
+
+# rates of the input parameters (type1_rate, type2_rate, type1_escapeRate, type2_escapeRate)
+def default_rates():
+    return (type1_rate, type2_rate, type1_escapeRate, type2_escapeRate)
 
 # Make ZnO (000-1) island (edit for your system)
 def make_lattice(length,x,z):
@@ -112,7 +130,10 @@ def find_neighbours(lattice,n):
     return nblist
 
 # find T matrix (connectivity + associated rates)
-def connectivity(lattice):
+def connectivity(lattice, rates=None):
+    if rates is None:
+        rates = default_rates()
+    rate1, rate2, escape1, escape2 = rates
     #conMat = [0]*len(lattice)
     Matrix = np.zeros([len(lattice), len(lattice)])
     tao1 = np.zeros(len(lattice))
@@ -127,12 +148,12 @@ def connectivity(lattice):
             if len(nblist) == 2:
 
                 if lattice[i][0] == 'O_':
-                    escape = type1_escapeRate
-                    Matrix[i][j] += np.float64(type1_rate/(2*type1_rate+escape))
+                    escape = escape1
+                    Matrix[i][j] += np.float64(rate1/(2*rate1+escape))
 
                 elif lattice[i][0] == 'Zn':
-                    escape = type2_escapeRate
-                    Matrix[i][j] += np.float64(type2_rate/(2*type2_rate+escape))
+                    escape = escape2
+                    Matrix[i][j] += np.float64(rate2/(2*rate2+escape))
                 else:
                     print "Error, atom not recognised 1"
                     print lattice[i][0]
@@ -146,13 +167,13 @@ def connectivity(lattice):
         if len(nblist) == 2:
 
             if lattice[i][0] == 'O_':
-                escape = type1_escapeRate
-                tao1[i] = np.float64(1/(2*type1_rate+escape))
+                escape = escape1
+                tao1[i] = np.float64(1/(2*rate1+escape))
                 boundaryAtoms.append(['O_',i])
 
             elif lattice[i][0] == 'Zn':
-                escape = type2_escapeRate
-                tao1[i] = np.float64(1/(2*type2_rate+escape))
+                escape = escape2
+                tao1[i] = np.float64(1/(2*rate2+escape))
                 boundaryAtoms.append(['Zn',i])
 
             else:
@@ -161,10 +182,10 @@ def connectivity(lattice):
                 sys.exit()
         else:
             if lattice[i][0] == 'O_':
-                tao1[i] = np.float64(1/(3*type1_rate))
+                tao1[i] = np.float64(1/(3*rate1))
 
             elif lattice[i][0] == 'Zn':
-                tao1[i] = np.float64(1/(3*type2_rate))
+                tao1[i] = np.float64(1/(3*rate2))
 
         if len(nblist) > 3:
             print "Error, more than 3 neighbours"
@@ -178,60 +199,264 @@ def connectivity(lattice):
 
 
 
-# ========================================================================
-# ============= MAIN SCRIPT ==============================================
-# ========================================================================
+# find neighbour pairs (i < j) closer than nbdist with a KD tree
+def neighbour_pairs(pos):
+    tree = cKDTree(pos)
+    pairs = tree.query_pairs(nbdist, output_type='ndarray').reshape(-1, 2)
+
+    # same strict test as find_neighbours
+    sep = pos[pairs[:,0]] - pos[pairs[:,1]]
+    dist = np.sqrt(np.einsum('ij,ij->i', sep, sep))
+    return pairs[(dist < nbdist) & (dist > 0)]
+
+# sparse T matrix (connectivity + associated rates), vectorised over basin states
+def sparse_connectivity(lattice, rates=None):
+    if rates is None:
+        rates = default_rates()
+    rate1, rate2, escape1, escape2 = rates
+    n = len(lattice)
+    pos = np.array([[atom[1], atom[2], atom[3]] for atom in lattice], dtype=np.float64)
+    species = np.array([atom[0] for atom in lattice])
+
+    pairs = neighbour_pairs(pos)
+    rows = np.concatenate((pairs[:,0], pairs[:,1]))
+    cols = np.concatenate((pairs[:,1], pairs[:,0]))
+    numNb = np.bincount(rows, minlength=n)
+
+    if numNb.max() > 3:
+        print "Error, more than 3 neighbours"
+        sys.exit()
+    if numNb.min() < 2:
+        print "Error, less than 2 neighbours"
+        sys.exit()
+
+    isType1 = species == 'O_'
+    if not np.all(isType1 | (species == 'Zn')):
+        print "Error, atom not recognised 1"
+        sys.exit()
+    rate = np.where(isType1, rate1, rate2)
+    escape = np.where(isType1, escape1, escape2)
+
+    # boundary basin states (2 neighbours) can escape, others assume 3 fold symmetry
+    boundary = numNb == 2
+    weight = np.where(boundary, rate/(2*rate+escape), 1.0/3)
+    tao1 = np.where(boundary, 1/(2*rate+escape), 1/(3*rate))
+    Matrix = scipy.sparse.csr_matrix((weight[rows], (rows, cols)), shape=(n, n))
+    boundaryAtoms = [[species[i], i] for i in np.where(boundary)[0]]
 
+    return Matrix, tao1, boundaryAtoms
 
-# compute mean exit rates for varying island sizes
-for t in range(start,finish):
+# mean time in the island from every start state. The occupation vector from
+# state w solves (I-T) occ = e_w and its time is tao1.occ, so the times from
+# all start states are the solution of the single system (I-T)^T y = tao1
+def mean_times_sparse(conMat, tao1):
+    n = len(tao1)
+    matrix = (scipy.sparse.identity(n, format='csr') - conMat).T.tocsc()
+    try:
+        lu = scipy.sparse.linalg.splu(matrix)
+    except RuntimeError:
+        print "Error: Transition Matrix not invertible."
+        sys.exit()
+    return lu.solve(tao1)
 
-    # creat lattice
-    x_values, z_values, lattice = make_lattice(t,2,300)
+# as mean_times_sparse with the dense inverse
+def mean_times_dense(conMat, tao1):
+    matrix2bInv = np.identity(len(tao1)) - conMat
+    try:
+        occupVect1 = np.linalg.inv(matrix2bInv)
+    except np.linalg.LinAlgError:
+        print "Error: Transition Matrix not invertible."
+        sys.exit()
+    return np.dot(tao1, occupVect1)
 
-    # find number of atoms in island (not basin states)
+# number of atoms in island (not basin states) with hexagon edge length t
+def island_atoms(t):
     numAg = 0
     for q in range(t-1):
         numAg += t+q
     numAg = 2*numAg
     numAg += 2*t-1
+    return numAg
 
-    #print numAg
-
-    # find T matrix
-    conMat, tao1, boundAtoms = connectivity(lattice)
+# number of basin states and mean exit rate averaged over start states for one island size
+def island_mean_rate(t, sparse=use_sparse, rates=None):
+    x_values, z_values, lattice = make_lattice(t,2,300)
+    if sparse and scipy is not None:
+        conMat, tao1, boundAtoms = sparse_connectivity(lattice, rates)
+        meanRates = mean_times_sparse(conMat, tao1)
+    else:
+        conMat, tao1, boundAtoms = connectivity(lattice, rates)
+        meanRates = mean_times_dense(conMat, tao1)
+    return len(lattice), np.mean(meanRates)
+
+
+# read final hashkeys and barriers of volumes from a KMC transition catalog (Volumes.txt)
+def read_catalog(path):
+    catalog = {}
+    input_file = open(path, 'r')
+    while 1:
+        line = input_file.readline().split()
+        if len(line) < 3:
+            break
+        transitions = []
+        for i in range(int(line[1])):
+            input_file.readline()
+        for i in range(int(line[2])):
+            trans = input_file.readline().split()
+            if trans[1] == "None":
+                transitions.append((trans[0], None))
+            else:
+                transitions.append((trans[0], float(trans[1])))
+        catalog[line[0]] = transitions
+    input_file.close()
+    return catalog
+
+# rates of the two basin state types at a temperature from catalog barriers. The hop
+# rate is the rate of a transition to the other type of state, the escape rate
+# is the sum of the rates of all transitions to other states
+def catalog_rates(catalog, type1Key, type2Key, temperature, prefactor, boltzmann):
+    rates = []
+    escapes = []
+    for hashkey, other in ((type1Key, type2Key), (type2Key, type1Key)):
+        if hashkey not in catalog:
+            sys.exit("Error, volume " + hashkey + " not in catalog")
+        hops = []
+        escape = 0.0
+        for finalKey, barrier in catalog[hashkey]:
+            if barrier is None:
+                continue
+            rate = prefactor * np.exp(-barrier / (boltzmann * temperature))
+            if finalKey == other:
+                hops.append(rate)
+            elif finalKey != hashkey:
+                escape += rate
+        if not hops:
+            sys.exit("Error, no transition from " + hashkey + " to " + other + " in catalog")
+        rates.append(sum(hops) / len(hops))
+        escapes.append(escape)
+    return (rates[0], rates[1], escapes[0], escapes[1])
+
+# parse sizes of the form 'a-b,c' (ranges include both ends)
+def parse_sizes(text):
+    sizes = []
+    for part in text.split(','):
+        part = part.strip()
+        if '-' in part:
+            first, last = part.split('-')
+            sizes.extend(range(int(first), int(last)+1))
+        elif part:
+            sizes.append(int(part))
+    return sizes
+
+def parse_floats(text):
+    return [float(v) for v in text.split(',') if v.strip()]
+
+# key of a sweep point, rates are compared as written in the results table
+def point_key(size, rates):
+    return (str(size),) + tuple(['%.6e' % r for r in rates])
+
+# points already in the results table
+def read_results(path):
+    results = {}
+    if os.path.isfile(path):
+        input_file = open(path, 'r')
+        input_file.readline()
+        for line in input_file:
+            line = [v.strip() for v in line.split(',')]
+            if len(line) < 9:
+                continue
+            results[(line[0],) + tuple(line[3:7])] = line
+        input_file.close()
+    return results
+
+def sweep_point(job):
+    size, rates, sparse = job
+    numStates, meanTime = island_mean_rate(size, sparse, rates)
+    return size, rates, numStates, meanTime
+
+# evaluate every island size for every set of rates in a process pool. Points
+# already in the results table are not computed again
+def sweep(sizes, rateGrid, processes, output, sparse):
+    results = read_results(output)
+    jobs = []
+    for rates in rateGrid:
+        # rates are used as written in the table so repeat sweeps give the same points
+        rates = tuple([float(r) for r in point_key(0, rates)[1:]])
+        for size in sizes:
+            if point_key(size, rates) not in results:
+                jobs.append((size, rates, sparse))
+    print " Sweep points: ", len(sizes)*len(rateGrid), " in table: ", len(sizes)*len(rateGrid)-len(jobs), " to compute: ", len(jobs)
+    if not jobs:
+        return results
+
+    if processes < 1:
+        processes = multiprocessing.cpu_count()
+    newFile = not os.path.isfile(output)
+    outfile = open(output, 'a')
+    if newFile:
+        outfile.write(sweep_header + '\n')
+
+    # largest islands first so the pool is not left waiting on one big island
+    jobs.sort(key=lambda job: -job[0])
+    pool = multiprocessing.Pool(processes)
+    for size, rates, numStates, meanTime in pool.imap_unordered(sweep_point, jobs):
+        line = [str(size), str(numStates), str(island_atoms(size))] + list(point_key(size, rates)[1:]) + ['%.10e' % meanTime, '%.10e' % (1.0/meanTime)]
+        outfile.write(','.join(line) + '\n')
+        outfile.flush()
+        results[point_key(size, rates)] = line
+        print " Average rate: ", numStates, meanTime, " (size ", size, ")"
+    pool.close()
+    pool.join()
+    outfile.close()
+    return results
 
-    # prepare matrix to be inversed
-    matrix2bInv = np.matrix(np.identity(len(lattice))) - conMat
+# ========================================================================
+# ============= MAIN SCRIPT ==============================================
+# ========================================================================
 
-    # attempt inverse
-    try:
-        occupVect1 = np.linalg.inv(matrix2bInv)
-    except np.linalg.LinAlgError:
-        print "Error: Transition Matrix not invertible."
-    
-    meanRates = []
-    for w in xrange(len(lattice)):
-            
-        # assume current state is 0 (try others)
-        occupVect0 = np.zeros(len(lattice))
-        occupVect0[w] = 1.0
-        occupVect = np.inner(occupVect1, occupVect0)
-        occupVect = np.squeeze(np.asarray(occupVect))
-    
-        #print occupVect
-        #print "Basin states: " , len(lattice)
-    
-        # mean residence time in basin state i before leaving the basin
-        tao = np.zeros(len(lattice), np.float64)
-        taoSum = 0.0
-        for j in range(len(lattice)):
-            tao[j] = tao1[j] * occupVect[j]
-            taoSum += tao[j]
-        meanRates.append(taoSum)
-        #print len(lattice),taoSum
-        
-    print " Average rate: ",len(lattice), sum(meanRates)/len(meanRates)
-
-    # optional write out lattice
-    #write_lattice(lattice)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mean exit rates from 2D islands")
+    parser.add_argument('--sweep', action='store_true', help="evaluate a grid of island sizes and rates in a process pool")
+    parser.add_argument('--sizes', default='%d-%d' % (start, finish-1), help="island hexagon edge lengths eg. 12-40 or 12,20,30")
+    parser.add_argument('--type1_rate', default=repr(type1_rate), help="comma separated values")
+    parser.add_argument('--type2_rate', default=repr(type2_rate), help="comma separated values")
+    parser.add_argument('--type1_escapeRate', default=repr(type1_escapeRate), help="comma separated values")
+    parser.add_argument('--type2_escapeRate', default=repr(type2_escapeRate), help="comma separated values")
+    parser.add_argument('--catalog', default=None, help="take rates from this Volumes.txt instead of the rate options")
+    parser.add_argument('--type1Key', default=None, help="hashkey of the type1 basin state volume in the catalog")
+    parser.add_argument('--type2Key', default=None, help="hashkey of the type2 basin state volume in the catalog")
+    parser.add_argument('--temperatures', default='300', help="temperatures (K) for catalog rates, comma separated")
+    parser.add_argument('--prefactor', type=float, default=1.00E+13, help="Arrhenius prefactor for catalog rates")
+    parser.add_argument('--boltzmann', type=float, default=8.62E-05, help="Boltzmann constant")
+    parser.add_argument('--processes', type=int, default=0, help="processes in the pool (0 = number of cores)")
+    parser.add_argument('--output', default='meanSweep.csv', help="results table, existing points are reused")
+    args = parser.parse_args()
+
+    if use_sparse and scipy is None:
+        print "WARNING: scipy is not available, using the dense inverse"
+
+    if not args.sweep:
+        # compute mean exit rates for varying island sizes
+        for t in range(start,finish):
+            numStates, meanRate = island_mean_rate(t)
+            print " Average rate: ", numStates, meanRate
+
+            # optional write out lattice
+            #x_values, z_values, lattice = make_lattice(t,2,300)
+            #write_lattice(lattice)
+        sys.exit()
+
+    if args.catalog is not None:
+        if args.type1Key is None or args.type2Key is None:
+            sys.exit("Error, --type1Key and --type2Key are needed with --catalog")
+        catalog = read_catalog(args.catalog)
+        rateGrid = []
+        for temperature in parse_floats(args.temperatures):
+            rates = catalog_rates(catalog, args.type1Key, args.type2Key, temperature, args.prefactor, args.boltzmann)
+            print " Catalog rates at ", temperature, " K: ", rates
+            rateGrid.append(rates)
+    else:
+        rateGrid = list(itertools.product(parse_floats(args.type1_rate), parse_floats(args.type2_rate),
+                                          parse_floats(args.type1_escapeRate), parse_floats(args.type2_escapeRate)))
+
+    sweep(parse_sizes(args.sizes), rateGrid, args.processes, args.output, use_sparse)
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Minimised state cache module.
+
+Relaxed structures keyed by a fingerprint of the unrelaxed lattice they
+were minimised from (species and positions rounded to 0.01 A). The final
+state of each hop is minimised during the transition searches and the same
+lattice is written as the initial state of the next step when that hop is
+chosen, so its relaxed positions and energy are reused instead of being
+minimised again. The least recently used states are evicted once
+stateCacheSize states are stored.
+
+"""
+
+import hashlib
+import collections
+import numpy as np
+
+# fingerprint of an unrelaxed lattice
+def fingerprint(lattice):
+    pos = np.rint(np.asarray(lattice.pos, dtype=np.float64) * 100).astype(np.int64)
+    specie = np.asarray(lattice.specie, dtype=np.int64)
+    return hashlib.sha1(specie.tostring() + pos.tostring()).digest()
+
+class stateCache(object):
+    def __init__(self, maxSize):
+        self.maxSize = maxSize
+        self.states = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # relaxed positions and energy of a state, or None
+    def get(self, key):
+        try:
+            state = self.states.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self.states[key] = state
+        self.hits += 1
+        return state
+
+    def add(self, key, latMin):
+        if key in self.states:
+            del self.states[key]
+        self.states[key] = (np.array(latMin.pos, dtype=np.float64, copy=True), latMin.totalEnergy)
+        while len(self.states) > self.maxSize:
+            self.states.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self.states)
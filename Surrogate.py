@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Surrogate barrier module.
+
+Cheap barrier estimates for hops that have not been searched yet. They are
+used to rank the directions searched for a new volume (lowest estimate
+first) and to defer the NEBs of hops that cannot matter: a hop whose
+estimated rate is below surrogateRateFrac of the total rate of the last
+step is not searched and is left out of the catalog, so it is estimated
+again each time the volume is met and searched once its rate is no longer
+negligible.
+
+Models (surrogateModel):
+ bondcount - barrier0 + bondBarrier * (in plane adatom neighbours before the hop)
+             + stepBarrier (hops up or down a step)
+ fitted    - least squares fit of the barriers found by NEB in this run over
+             the same features, bond counting until surrogateMinFit are known
+
+"""
+
+import sys
+import numpy as np
+
+# features of a hop: [1, in plane neighbours before, in plane neighbours after, up/down step]
+FEATURES = 4
+
+class bondCounting(object):
+    def __init__(self, params):
+        self.barrier0 = params.surrogateBarrier0
+        self.bondBarrier = params.surrogateBondBarrier
+        self.stepBarrier = params.surrogateStepBarrier
+
+    def estimate(self, features):
+        return self.barrier0 + self.bondBarrier * features[1] + self.stepBarrier * features[3]
+
+    # barrier found by NEB for a hop
+    def observe(self, features, barrier):
+        pass
+
+class fittedModel(bondCounting):
+    def __init__(self, params):
+        bondCounting.__init__(self, params)
+        self.minFit = max(params.surrogateMinFit, FEATURES)
+        self.features = []
+        self.barriers = []
+        self.coef = None
+
+    def estimate(self, features):
+        if len(self.barriers) < self.minFit:
+            return bondCounting.estimate(self, features)
+        if self.coef is None:
+            self.coef = np.linalg.lstsq(np.asarray(self.features, dtype=np.float64),
+                                        np.asarray(self.barriers, dtype=np.float64), rcond=-1)[0]
+        return float(np.dot(self.coef, features))
+
+    def observe(self, features, barrier):
+        self.features.append(list(features))
+        self.barriers.append(float(barrier))
+        self.coef = None
+
+# available models, new estimators only need estimate() and observe()
+models = {'bondcount': bondCounting, 'fitted': fittedModel}
+
+# surrogate model selected in the input file (None = off)
+def getModel(params):
+    name = str(params.surrogateModel).lower()
+    if name in ('', 'none', '0'):
+        return None
+    if name not in models:
+        print "surrogateModel must be one of none, " + ", ".join(sorted(models)) + ": ", params.surrogateModel, ", exiting ..."
+        sys.exit()
+    return models[name](params)
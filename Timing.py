@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Timing module.
+
+Cumulative wall time and call counts for the phases of a KMC step plus
+simple event counters (eg. catalog hits and misses). Records are written
+as JSON lines or CSV so a run can be profiled without an external tool.
+
+Phases can be nested (eg. minimise inside NEB) or recursive (eg.
+createEventsList restarting after a reset). The inclusive time of a phase
+only counts its outermost call, and the exclusive time leaves out the time
+spent in nested phases, so exclusive times add up to at most the wall time.
+
+"""
+
+import time
+import json
+import functools
+
+class phaseTimers(object):
+    def __init__(self):
+        self.times = {}
+        self.exclusive = {}
+        self.calls = {}
+        self.counters = {}
+        # phases running now: [name, time spent in nested phases]
+        self.active = []
+        self.startTime = time.time()
+
+    def start(self, name):
+        self.active.append([name, 0.0])
+
+    # end the innermost running phase
+    def stop(self, name, elapsed):
+        nested = self.active.pop()[1]
+        self.exclusive[name] = self.exclusive.get(name, 0.0) + elapsed - nested
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self.active:
+            self.active[-1][1] += elapsed
+        # recursive calls are already inside the time of the outermost call
+        if name not in [phase[0] for phase in self.active]:
+            self.times[name] = self.times.get(name, 0.0) + elapsed
+
+    # increase a counter
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    # machine readable record of all timers
+    def record(self, step):
+        phases = {}
+        for name in self.times:
+            phases[name] = {"time": round(self.times[name], 6), "exclusiveTime": round(self.exclusive[name], 6),
+                            "calls": self.calls[name]}
+        return {"step": step, "wallTime": round(time.time() - self.startTime, 6),
+                "phases": phases, "counters": dict(self.counters)}
+
+    # append record to file as a JSON line or CSV rows
+    def write(self, filename, step, fileFormat="json"):
+        record = self.record(step)
+        outfile = open(filename, 'a')
+        if fileFormat == "csv":
+            for name in sorted(record["phases"]):
+                phase = record["phases"][name]
+                outfile.write("%d,%f,phase,%s,%f,%d,%f\n" % (step, record["wallTime"], name, phase["time"], phase["calls"],
+                                                             phase["exclusiveTime"]))
+            for name in sorted(record["counters"]):
+                outfile.write("%d,%f,counter,%s,,%d,\n" % (step, record["wallTime"], name, record["counters"][name]))
+        else:
+            outfile.write(json.dumps(record, sort_keys=True) + "\n")
+        outfile.close()
+
+    # human readable summary (percentages of exclusive time)
+    def report(self):
+        lines = []
+        total = time.time() - self.startTime
+        for name in sorted(self.times, key=lambda n: -self.exclusive[n]):
+            frac = 100.0 * self.exclusive[name] / total if total > 0 else 0.0
+            lines.append(" %-20s %12.4f s %12.4f s excl. %10d calls %6.1f %%" % (name, self.times[name], self.exclusive[name],
+                                                                             self.calls[name], frac))
+        for name in sorted(self.counters):
+            lines.append(" %-20s %12d" % (name, self.counters[name]))
+        return "\n".join(lines)
+
+# decorator timing every call of a method with the timers of its object
+def timedMethod(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            self.timers.start(name)
+            t0 = time.time()
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                self.timers.stop(name, time.time() - t0)
+        return wrapper
+    return decorator
+
+def csvHeader():
+    return "Step,Wall time,Type,Name,Time,Count,Exclusive time\n"